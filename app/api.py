@@ -15,20 +15,41 @@ API 端点:
 
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, Request, Depends, Response, HTTPException, Query, Security
-from typing import Dict, Any, Optional, List
-from pydantic import BaseModel
+import asyncio  # 并发健康检查
+import secrets  # 密钥生成
+import time  # 单调时钟 (健康检查缓存)
+from pathlib import Path  # 模板路径
+from urllib.parse import quote  # 文件名编码
+
+import orjson  # 预序列化配置 / 上传响应
+from fastapi import APIRouter, UploadFile, File, Form, Request, Depends, Response, HTTPException, Query, Body
+from typing import Dict, Any, List
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
+
+# Fernet 密钥生成 (cryptography 为可选依赖时降级)
+try:
+    from cryptography.fernet import Fernet as _FERNET
+except ImportError:
+    _FERNET = None
 
 # ========== 内部模块导入 ==========
 # 数据模型
 from app.models import (
     UploadResponse,
+    make_upload_response,
     TimeLimit,
     ConfigUpdateRequest,
+    ConfigUpdateResponse,
+    ConfigCategory,
+    HealthResponse,
+    SystemStats,
+    StorageStats,
+    MetricsResponse,
 )
 # 业务逻辑
 from app.services import (
     process_file_upload,
+    get_file_metadata,
     retrieve_file_content,
     get_file_list,
     get_file_detail,
@@ -41,13 +62,16 @@ from app.services import (
     get_prometheus_metrics,
 )
 # 安全模块
-from app.core.security import limiter, verify_api_key
+from app.core.security import token_bucket
 # 应用配置
 from app.core.config import Config
 # 配置管理
 from app.core.config_manager import ConfigManager, CATEGORIES
 # 数据库
-from app.database import get_db_connection
+from app.database import get_db_connection, fetch_one
+# 组件状态 (健康检查)
+from app.core.crypto import CryptoEngine
+from app.core.oss_client import OSSClient
 # 日志模块
 from app.core.logger import log
 
@@ -68,14 +92,14 @@ router = APIRouter(
 
 @router.post(
     "/upload",
-    response_model=UploadResponse,
+    # 接口直接返回序列化好的 Response，不经 response_model 校验；UploadResponse 只用于生成 API 文档
+    response_model=None,
+    responses={200: {"model": UploadResponse}},
     summary="上传文件",
-    description="上传 JSON 文件到服务器，支持加密、压缩、去重"
+    description="上传 JSON 文件到服务器，支持加密、压缩、去重",
+    dependencies=[Depends(token_bucket("upload"))],  # 应用限流
 )
-@limiter.limit(Config.rate_limit)  # 应用限流
 async def upload_endpoint(
-    request: Request,                           # 请求对象 (用于限流)
-    _: bool = Security(verify_api_key),         # 鉴权检查
     file: UploadFile = File(...),               # 上传的文件 (必填)
     time_limit: TimeLimit = Form(TimeLimit.PERMANENT)  # 有效期 (默认永久)
 ):
@@ -83,7 +107,7 @@ async def upload_endpoint(
     📤 文件上传接口
 
     处理流程:
-        1. 鉴权检查 (如启用)
+        1. 鉴权检查 (如启用，由 APIKeyMiddleware 在进入路由前完成)
         2. 文件大小和格式校验
         3. JSON 内容验证
         4. 哈希查重 (秒传)
@@ -92,7 +116,6 @@ async def upload_endpoint(
         7. 返回文件访问 URL
 
     Args:
-        request: FastAPI 请求对象
         file: 上传的文件对象
         time_limit: 文件有效期 (1天/7天/1月/永久)
 
@@ -120,22 +143,53 @@ async def upload_endpoint(
     # 调用核心业务逻辑处理上传
     result = await process_file_upload(file, time_limit)
 
-    # 返回统一格式的响应
-    return {"code": 200, "msg": "✅ 上传成功", "data": result}
+    # 返回统一格式的响应 (直接序列化字典，结构与 UploadResponse 的一致性由测试保证)
+    return Response(content=orjson.dumps(make_upload_response(**result)), media_type="application/json")
 
 
 # ==========================================
 # 📥 文件下载接口
 # ==========================================
 
+# 下载内容类型
+_JSON_MEDIA_TYPE = "application/json; charset=utf-8"
+
+
+def _inline_disposition(filename: str) -> str:
+    """
+    生成 inline 的 Content-Disposition 头
+
+    与 FileResponse 规则一致: 非 ASCII 文件名使用 RFC 5987 编码
+    """
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"inline; filename*=utf-8''{quoted}"
+    return f'inline; filename="{filename}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    判断 If-None-Match 是否命中 ETag
+
+    支持 "*"、逗号分隔的多个 ETag 以及弱校验前缀 W/
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
 @router.get(
     "/f/{file_id}",
     summary="获取文件",
-    description="根据文件 ID 获取文件内容，自动处理解密和解压"
+    description="根据文件 ID 获取文件内容，自动处理解密和解压",
+    dependencies=[Depends(token_bucket("download"))],  # 应用限流
 )
-@limiter.limit(Config.rate_limit)  # 应用限流
 async def get_file(
-    request: Request,   # 请求对象 (用于限流)
+    request: Request,   # 请求对象 (读取条件请求头)
     file_id: str        # 文件 ID (8 位十六进制)
 ):
     """
@@ -160,31 +214,94 @@ async def get_file(
         500: 文件损坏或解密失败
     """
 
+    # 查询元数据 (带缓存)，不存在时直接 404
+    metadata = await get_file_metadata(file_id)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="🔍 文件不存在或已过期")
+
+    headers = {
+        "Cache-Control": "public, max-age=3600"  # 缓存 1 小时
+    }
+
+    # 文件内容不可变且以内容哈希去重，哈希即强 ETag
+    if metadata["file_hash"]:
+        etag = f'"{metadata["file_hash"]}"'
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "public, max-age=3600, immutable"
+        # 缓存命中: 不读磁盘、不解密解压，直接 304
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
     # 调用核心业务逻辑获取文件内容
-    content_bytes, filename = await retrieve_file_content(file_id)
+    stored = await retrieve_file_content(file_id)
 
     # 检查文件是否存在
-    if content_bytes is None:
+    if stored is None:
         log.warning(f"🔍 文件不存在: {file_id}")
         raise HTTPException(status_code=404, detail="🔍 文件不存在或已过期")
 
-    # 返回文件内容
-    return Response(
-        content=content_bytes,
-        media_type="application/json; charset=utf-8",
-        headers={
-            "Content-Disposition": f'inline; filename="{filename}"',
-            "Cache-Control": "public, max-age=3600"  # 缓存 1 小时
-        }
-    )
+    # 磁盘内容即原始 JSON: 直接发送文件 (Linux 下走 sendfile)
+    if stored.path is not None:
+        return FileResponse(
+            stored.path,
+            media_type=_JSON_MEDIA_TYPE,
+            filename=stored.filename,
+            content_disposition_type="inline",
+            headers=headers,
+        )
+
+    # 需要解密/解压: 分块流式返回，内存占用与文件大小无关
+    headers["Content-Disposition"] = _inline_disposition(stored.filename)
+    return StreamingResponse(stored.chunks, media_type=_JSON_MEDIA_TYPE, headers=headers)
 
 
 # ==========================================
 # 🏥 健康检查接口
 # ==========================================
 
+# 健康检查结果缓存时间 (秒)
+# 存活/就绪探针可能每秒请求多次，组件状态在短时间内几乎不变
+_HEALTH_TTL = 2.0
+
+# 健康检查结果缓存: at 为 time.monotonic() 时间戳，payload 为上次结果
+_health_cache: Dict[str, Any] = {"at": 0.0, "payload": None}
+
+
+async def _check_db() -> str:
+    """🗄️ 检查数据库连接"""
+    try:
+        async with get_db_connection() as conn:
+            await conn.execute("SELECT 1")
+    except Exception as e:
+        # 记录详细错误到日志
+        log.error(f"数据库健康检查失败: {e}")
+        # 返回脱敏的错误信息
+        return "🔴 异常"
+    return "🟢 正常"
+
+
+async def _check_crypto() -> str:
+    """🔐 检查加密引擎"""
+    if not Config.ENCRYPTION_ENABLED:
+        return "🔴 未启用"
+    return "🟢 已启用" if CryptoEngine.is_enabled() else "🔴 异常"
+
+
+async def _check_oss() -> str:
+    """☁️ 检查 OSS"""
+    if not Config.ENABLE_OSS:
+        return "🔴 未启用"
+    return "🟢 已启用" if OSSClient.is_enabled() else "🔴 异常"
+
+
+async def _check_redis() -> str:
+    """🔴 检查 Redis"""
+    return "🟢 已连接" if Config.REDIS_URL else "🔴 未启用"
+
+
 @router.get(
     "/health",
+    response_model=HealthResponse,
     summary="健康检查",
     description="检查服务及各组件的健康状态"
 )
@@ -211,46 +328,38 @@ async def health_check() -> Dict[str, Any]:
             }
         }
         ```
-    """
 
-    # ========== 检查数据库连接 ==========
-    db_status = "🟢 正常"
-    try:
-        conn = await get_db_connection()
-        await conn.execute("SELECT 1")
-        await conn.close()
-    except Exception as e:
-        # 记录详细错误到日志
-        log.error(f"数据库健康检查失败: {e}")
-        # 返回脱敏的错误信息
-        db_status = "🔴 异常"
+    注意:
+        结果缓存 _HEALTH_TTL 秒，探针风暴下每个窗口只做一次真实检查
+    """
 
-    # ========== 检查加密引擎 ==========
-    if Config.ENCRYPTION_ENABLED:
-        from app.core.crypto import CryptoEngine
-        crypto_status = "🟢 已启用" if CryptoEngine.is_enabled() else "🔴 异常"
-    else:
-        crypto_status = "🔴 未启用"
+    # ========== 命中缓存直接返回 ==========
+    now = time.monotonic()
+    if _health_cache["payload"] is not None and now - _health_cache["at"] < _HEALTH_TTL:
+        return _health_cache["payload"]
 
-    # ========== 检查压缩 ==========
+    # ========== 并发检查各组件 ==========
+    # 总耗时取决于最慢的一项，而不是各项之和
     compression_status = "🟢 已启用" if Config.COMPRESSION_ENABLED else "🔴 未启用"
-
-    # ========== 检查 OSS ==========
-    if Config.ENABLE_OSS:
-        from app.core.oss_client import OSSClient
-        oss_status = "🟢 已启用" if OSSClient.is_enabled() else "🔴 异常"
-    else:
-        oss_status = "🔴 未启用"
-
-    # ========== 检查 Redis ==========
-    redis_status = "🟢 已连接" if Config.REDIS_URL else "🔴 未启用"
+    results = await asyncio.gather(
+        _check_db(),
+        _check_crypto(),
+        asyncio.sleep(0, result=compression_status),
+        _check_oss(),
+        _check_redis(),
+        return_exceptions=True,
+    )
+    # 单项检查抛出异常时只标记该组件异常，不影响整个接口
+    db_status, crypto_status, compression_status, oss_status, redis_status = (
+        "🔴 异常" if isinstance(r, BaseException) else r for r in results
+    )
 
     # ========== 汇总状态 ==========
     # 只有 "异常" 状态才算异常，"未启用" 是正常状态
     all_components = [db_status, crypto_status, compression_status, oss_status, redis_status]
     overall_status = "🟢 健康" if all("异常" not in s for s in all_components) else "🟡 降级"
 
-    return {
+    payload = {
         "status": overall_status,
         "version": "1.0.0",
         "components": {
@@ -262,13 +371,45 @@ async def health_check() -> Dict[str, Any]:
         }
     }
 
+    # ========== 写入缓存 ==========
+    _health_cache["payload"] = payload
+    _health_cache["at"] = now
+
+    return payload
+
 
 # ==========================================
 # 📊 管理员统计接口
 # ==========================================
 
+def _build_config_status() -> Dict[str, bool]:
+    """构建功能开关状态快照"""
+    return {
+        "auth": Config.AUTH_ENABLED,
+        "encryption": Config.ENCRYPTION_ENABLED,
+        "compression": Config.COMPRESSION_ENABLED,
+        "oss": Config.ENABLE_OSS,
+        "redis": bool(Config.REDIS_URL)
+    }
+
+
+# 功能开关状态快照 (只在配置变化时重建)
+_config_status: Dict[str, bool] = _build_config_status()
+
+
+def _refresh_config_status(*_) -> None:
+    """重建功能开关状态快照 (可直接作为配置重载回调)"""
+    global _config_status
+    _config_status = _build_config_status()
+
+
+# 配置热重载后重建
+Config.add_reload_callback(_refresh_config_status)
+
+
 @router.get(
     "/admin/stats",
+    response_model=SystemStats,
     summary="系统统计",
     description="获取文件总数和系统配置状态 (需要鉴权)"
 )
@@ -299,23 +440,15 @@ async def admin_stats():
         - 如果开启鉴权，需要提供有效的 API Key
     """
 
-    # 查询文件总数
-    conn = await get_db_connection()
-    cursor = await conn.execute("SELECT count(*) as count FROM files")
-    res = await cursor.fetchone()
-    count = res['count'] if res else 0
-    await conn.close()
+    # 查询文件总数 (触发器维护的计数器，O(1))
+    async with get_db_connection() as conn:
+        res = await fetch_one(conn, "SELECT total_files FROM stats WHERE id = 1")
+    count = res['total_files'] if res else 0
 
     # 返回统计信息
     return {
         "total_files": count,
-        "config_status": {
-            "auth": Config.AUTH_ENABLED,
-            "encryption": Config.ENCRYPTION_ENABLED,
-            "compression": Config.COMPRESSION_ENABLED,
-            "oss": Config.ENABLE_OSS,
-            "redis": bool(Config.REDIS_URL)
-        }
+        "config_status": _config_status,
     }
 
 
@@ -323,11 +456,6 @@ async def admin_stats():
 # 📋 管理后台 API
 # ==========================================
 
-class BatchDeleteRequest(BaseModel):
-    """批量删除请求"""
-    file_ids: List[str]
-
-
 @router.get("/admin/files", summary="文件列表", description="获取文件列表（分页、搜索、排序）")
 async def admin_files_list(
     page: int = Query(1, ge=1, description="页码"),
@@ -349,6 +477,15 @@ async def admin_file_detail(file_id: str):
     return result
 
 
+# 注意: 必须声明在 /admin/files/{file_id} 之前，否则 "batch" 会被当作文件 ID 匹配
+@router.delete("/admin/files/batch", summary="批量删除", description="批量删除文件")
+async def admin_batch_delete(
+    file_ids: List[str] = Body(..., embed=True, description="文件 ID 列表")  # 请求体: {"file_ids": [...]}
+):
+    """批量删除文件"""
+    return await batch_delete_files(file_ids)
+
+
 @router.delete("/admin/files/{file_id}", summary="删除文件", description="删除指定文件")
 async def admin_delete_file(file_id: str):
     """删除文件"""
@@ -358,14 +495,7 @@ async def admin_delete_file(file_id: str):
     return {"message": "删除成功"}
 
 
-@router.delete("/admin/files/batch", summary="批量删除", description="批量删除文件")
-async def admin_batch_delete(request: BatchDeleteRequest):
-    """批量删除文件"""
-    result = await batch_delete_files(request.file_ids)
-    return result
-
-
-@router.get("/admin/stats/storage", summary="存储统计", description="获取存储使用统计")
+@router.get("/admin/stats/storage", response_model=StorageStats, summary="存储统计", description="获取存储使用统计")
 async def admin_storage_stats():
     """获取存储统计"""
     return await get_storage_stats()
@@ -393,29 +523,35 @@ async def admin_cleanup():
 # ⚙️ 配置管理 API
 # ==========================================
 
-@router.get("/admin/config", summary="获取配置", description="获取系统所有配置项")
-async def admin_get_config():
-    """
-    ⚙️ 获取系统配置
+# 预序列化的配置响应 (None 表示需要重建)
+# 配置只在 POST /admin/config 或 .env 热重载时变化
+_config_cache_json: bytes | None = None
 
-    返回所有可配置的配置项及其当前值
 
-    Returns:
-        ConfigListResponse: 按分类组织的配置项列表
-    """
-    manager = ConfigManager()
-    items = manager.get_config_items()
+def _invalidate_config_cache(*_) -> None:
+    """清除预序列化的配置响应 (可直接作为配置重载回调)"""
+    global _config_cache_json
+    _config_cache_json = None
+
+
+# 共享的配置管理器 (复用其 .env 解析缓存)
+_config_manager = ConfigManager()
+
+
+def _build_config_response() -> dict:
+    """构建按分类组织的配置项列表"""
+    items = _config_manager.get_config_items()
 
     # 按分类组织
     category_items: dict[str, list] = {cat: [] for cat in CATEGORIES}
     for item in items:
         if item.category not in category_items:
             category_items[item.category] = []
-        category_items[item.category].append(item.model_dump())
+        category_items[item.category].append(item)
 
-    from app.models import ConfigCategory
+    # 配置项已是 ConfigItem 实例，跳过重复验证
     categories = [
-        ConfigCategory(name=cat, items=category_items.get(cat, []))
+        ConfigCategory.model_construct(name=cat, items=category_items[cat])
         for cat in CATEGORIES
         if category_items.get(cat)
     ]
@@ -427,6 +563,42 @@ async def admin_get_config():
     }
 
 
+# 配置热重载后重建
+Config.add_reload_callback(_invalidate_config_cache)
+
+
+@router.get("/admin/config", summary="获取配置", description="获取系统所有配置项")
+async def admin_get_config():
+    """
+    ⚙️ 获取系统配置
+
+    返回所有可配置的配置项及其当前值
+
+    Returns:
+        ConfigListResponse: 按分类组织的配置项列表
+
+    注意:
+        - 响应在首次请求时构建并序列化，配置更新或热重载后失效
+    """
+    global _config_cache_json
+    if _config_cache_json is None:
+        _config_cache_json = orjson.dumps(_build_config_response())
+    return Response(content=_config_cache_json, media_type="application/json")
+
+
+# 支持生成的密钥类型
+_KEY_TYPES = ("api_key", "encryption_key")
+
+
+def _generate_key(key_type: str) -> str:
+    """生成密钥 (同步，在线程池中执行)"""
+    if key_type == "api_key":
+        # 生成随机 API Key
+        return secrets.token_urlsafe(32)
+    # 生成 Fernet 加密密钥
+    return _FERNET.generate_key().decode()
+
+
 @router.post("/admin/config/generate/{key_type}", summary="生成密钥", description="生成指定类型的密钥")
 async def admin_generate_key(key_type: str):
     """
@@ -439,25 +611,19 @@ async def admin_generate_key(key_type: str):
 
     Returns:
         dict: 包含生成的密钥值
+
+    Raises:
+        400: 不支持的密钥类型
+        500: cryptography 库未安装
     """
-    import secrets
-    try:
-        from cryptography.fernet import Fernet
-    except ImportError:
-        Fernet = None
+    if key_type not in _KEY_TYPES:
+        raise HTTPException(status_code=400, detail=f"不支持的密钥类型: {key_type}")
+    if key_type == "encryption_key" and _FERNET is None:
+        raise HTTPException(status_code=500, detail="cryptography 库未安装")
 
-    if key_type == "api_key":
-        # 生成随机 API Key
-        generated_key = secrets.token_urlsafe(32)
-        return {"key": generated_key}
-    elif key_type == "encryption_key":
-        # 生成 Fernet 加密密钥
-        if Fernet is None:
-            return {"error": "cryptography 库未安装"}
-        generated_key = Fernet.generate_key().decode()
-        return {"key": generated_key}
-    else:
-        return {"error": f"不支持的密钥类型: {key_type}"}
+    # 读取系统随机源，放到线程池中执行，不阻塞事件循环
+    generated_key = await asyncio.get_running_loop().run_in_executor(None, _generate_key, key_type)
+    return {"key": generated_key}
 
 
 @router.post("/admin/config", summary="更新配置", description="更新系统配置并自动重启服务")
@@ -473,12 +639,14 @@ async def admin_update_config(request: ConfigUpdateRequest):
     Returns:
         ConfigUpdateResponse: 更新结果和重启状态
     """
-    from app.models import ConfigUpdateResponse
-
-    manager = ConfigManager()
+    manager = _config_manager
 
     # 更新配置
     success, message = manager.update_config(request.updates)
+    if success:
+        # .env 已变化，下次读取时重建配置响应
+        _invalidate_config_cache()
+        _refresh_config_status()
 
     if not success:
         return ConfigUpdateResponse(success=False, message=message, restarting=False)
@@ -497,7 +665,7 @@ async def admin_update_config(request: ConfigUpdateRequest):
 # 📊 监控指标 API
 # ==========================================
 
-@router.get("/admin/metrics", summary="监控指标", description="获取 Prometheus 监控指标（JSON 格式）")
+@router.get("/admin/metrics", response_model=MetricsResponse, summary="监控指标", description="获取 Prometheus 监控指标（JSON 格式）")
 async def admin_get_metrics():
     """
     📊 获取监控指标
@@ -548,6 +716,34 @@ async def admin_get_metrics():
     }
 
 
+# 监控页面模板未找到时的默认内容
+_DEFAULT_MONITORING_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>图床服务监控</title>
+    <meta charset="utf-8">
+</head>
+<body>
+    <h1>监控页面模板未找到</h1>
+    <p>请确保 app/templates/monitoring.html 文件存在</p>
+</body>
+</html>
+"""
+
+
+def _load_monitoring_html() -> str:
+    """读取监控页面模板，不存在时返回默认内容"""
+    template_path = Path(__file__).parent / "templates" / "monitoring.html"
+    if template_path.exists():
+        return template_path.read_text(encoding="utf-8")
+    return _DEFAULT_MONITORING_HTML
+
+
+# 模板在模块加载时读取一次，请求路径上不再有磁盘 I/O
+_MONITORING_HTML = _load_monitoring_html()
+
+
 @router.get("/monitoring", summary="监控页面", description="返回独立监控页面")
 async def monitoring_page():
     """
@@ -557,32 +753,14 @@ async def monitoring_page():
 
     Returns:
         HTMLResponse: 独立监控页面的 HTML 内容
-    """
-    from fastapi.responses import HTMLResponse
-    from pathlib import Path
-
-    template_path = Path(__file__).parent.parent / "app" / "templates" / "monitoring.html"
 
-    if template_path.exists():
-        with open(template_path, "r", encoding="utf-8") as f:
-            content = f.read()
-    else:
-        # 如果模板文件不存在，返回默认内容
-        content = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>图床服务监控</title>
-            <meta charset="utf-8">
-        </head>
-        <body>
-            <h1>监控页面模板未找到</h1>
-            <p>请确保 app/templates/monitoring.html 文件存在</p>
-        </body>
-        </html>
-        """
-
-    return HTMLResponse(content=content)
+    注意:
+        - 模板在启动时加载，修改模板后需重启服务
+    """
+    return HTMLResponse(
+        content=_MONITORING_HTML,
+        headers={"Cache-Control": "public, max-age=300"}  # 缓存 5 分钟
+    )
 
 
 # ==========================================
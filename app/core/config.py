@@ -14,13 +14,18 @@
 
 使用的 Python 标准库模块:
     - functools.cached_property: 延迟计算并缓存 OSS_CONFIG
+    - types.MappingProxyType: OSS_CONFIG 只读视图 (调用方无需防御性拷贝)
+    - warnings: OSS 配置不完整时发出警告
 
 """
 
 import os
+import re
 import threading
+import warnings
 from pathlib import Path
-from typing import Literal, Any, Callable, TYPE_CHECKING
+from types import MappingProxyType
+from typing import Literal, Any, Callable, ClassVar, TYPE_CHECKING
 from functools import cached_property
 
 # TYPE_CHECKING 用于类型注解，避免循环导入
@@ -31,23 +36,100 @@ if TYPE_CHECKING:
 from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# 日志: app.core.logger 依赖本模块 (LOG_DIR)，这里直接引用 loguru 全局 logger
+# (即 app.core.logger.log 本身)，避免循环导入和在重载锁内执行导入
+from loguru import logger as _log
+
 # ========== 基础路径定义 ==========
 # 项目根目录 (当前文件向上三级)
-PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+# 导入得到的 __file__ 已是绝对路径，不再 resolve() (省去 realpath 系统调用)
+PROJECT_ROOT = Path(__file__).parent.parent.parent
 
 # 数据库路径：优先使用环境变量，默认使用 data 目录（Docker 命名卷）
-DB_PATH = Path(os.getenv("DB_PATH", PROJECT_ROOT / "data" / "files.db"))
+_env_db_path = os.getenv("DB_PATH")
+DB_PATH = Path(_env_db_path) if _env_db_path else PROJECT_ROOT / "data" / "files.db"
 # 本地存储目录
 UPLOAD_DIR = PROJECT_ROOT / "uploads"
 # 日志目录
 LOG_DIR = PROJECT_ROOT / "logs"
 
-# 确保 data 目录存在（如果使用本地路径）
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+# 跳过 .env 文件 (容器/K8s 已通过环境变量注入配置时设置 SKIP_DOTENV=1)
+SKIP_DOTENV = os.getenv("SKIP_DOTENV", "").strip().lower() in ("1", "true", "yes")
+
+# 路径字符串 (供 Settings 大写别名使用，只转换一次)
+_DB_FILE = str(DB_PATH)
+_UPLOAD_DIR = str(UPLOAD_DIR)
+_LOG_DIR = str(LOG_DIR)
+
+# 限流规则解析: "60/minute"、"10 per second"、"100/2 hours"
+_RATE_LIMIT_RE = re.compile(
+    r"^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$",
+    re.IGNORECASE,
+)
+# 时间单位 -> 秒数
+_RATE_UNITS: dict[str, int] = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def _parse_rate_limit(rule: str) -> tuple[int, int]:
+    """
+    解析限流规则字符串
+
+    Args:
+        rule: 限流规则，如 "60/minute"
+
+    Returns:
+        tuple: (请求数, 时间窗口秒数)
+
+    Raises:
+        ValueError: 规则格式无效或请求数为 0 时抛出
+    """
+    match = _RATE_LIMIT_RE.match(rule)
+    if match is None or int(match[1]) < 1:
+        raise ValueError(f"无效的限流规则: {rule!r} (格式: 数量/时间单位，如 60/minute)")
+    multiple = int(match[2]) if match[2] else 1
+    return int(match[1]), multiple * _RATE_UNITS[match[3].lower()]
+
+
+# 启用 OSS 时必须填写的配置: (字段名, 环境变量名)
+_OSS_REQUIRED: tuple[tuple[str, str], ...] = (
+    ("oss_endpoint", "OSS_ENDPOINT"),
+    ("oss_bucket", "OSS_BUCKET"),
+    ("oss_ak", "OSS_AK"),
+    ("oss_sk", "OSS_SK"),
+    ("oss_domain", "OSS_DOMAIN"),
+)
+
+# 允许上传的文件扩展名 (不可变，非配置字段)
+ALLOWED_EXTENSIONS: frozenset[str] = frozenset({".json"})
 
-# 自动创建必要的目录
-UPLOAD_DIR.mkdir(exist_ok=True)
-LOG_DIR.mkdir(exist_ok=True)
+# 允许全部来源时共享的 CORS 元组 (调用方可用 `is` 快速判断)
+_WILDCARD_CORS: tuple[str, ...] = ("*",)
+
+# 目录是否已创建 (进程内只创建一次)
+_dirs_ready = False
+
+
+def ensure_dirs() -> None:
+    """
+    📁 创建运行所需的目录 (data / uploads / logs)
+
+    由应用启动流程 (lifespan) 显式调用，导入本模块时不再触碰文件系统。
+    同一进程内重复调用直接返回。
+
+    注意:
+        日志目录由 loguru 在添加文件 sink 时自行创建，这里只是兜底
+    """
+    global _dirs_ready
+    if _dirs_ready:
+        return
+
+    # 确保 data 目录存在（如果使用本地路径）
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # 上传与日志目录
+    UPLOAD_DIR.mkdir(exist_ok=True)
+    LOG_DIR.mkdir(exist_ok=True)
+
+    _dirs_ready = True
 
 
 class Settings(BaseSettings):
@@ -66,7 +148,8 @@ class Settings(BaseSettings):
         - 安全配置: 文件大小限制、CORS
 
     环境变量:
-        自动从 .env 文件加载，变量名不区分大小写
+        自动从 .env 文件加载，变量名不区分大小写；
+        设置 SKIP_DOTENV=1 时只读取进程环境变量，不打开 .env
     """
 
     # ==========================================
@@ -74,7 +157,7 @@ class Settings(BaseSettings):
     # ==========================================
 
     model_config = SettingsConfigDict(
-        env_file=".env",           # .env 文件路径
+        env_file=None if SKIP_DOTENV else ".env",  # .env 文件路径
         env_file_encoding="utf-8", # 文件编码
         env_ignore_empty=True,     # 忽略空环境变量
         extra="ignore",            # 忽略未定义的环境变量
@@ -219,111 +302,60 @@ class Settings(BaseSettings):
     # 📂 文件类型限制
     # ==========================================
 
-    # 允许的文件扩展名
-    ALLOWED_EXTENSIONS: set = {".json"}
+    # 允许的文件扩展名 (兼容 Config.ALLOWED_EXTENSIONS 访问，指向模块级常量)
+    ALLOWED_EXTENSIONS: ClassVar[frozenset[str]] = ALLOWED_EXTENSIONS
 
     # ==========================================
     # 🔗 大写属性别名 (兼容旧代码)
     # ==========================================
-    # 这些属性提供大写访问方式，保持向后兼容
-
-    @property
-    def HOST_DOMAIN(self) -> str:
-        return self.host_domain
-
-    @property
-    def AUTH_ENABLED(self) -> bool:
-        return self.auth_enabled
-
-    @property
-    def API_KEY(self) -> str:
-        return self.api_key
-
-    @property
-    def ENCRYPTION_ENABLED(self) -> bool:
-        return self.encryption_enabled
-
-    @property
-    def ENCRYPTION_KEY(self) -> str:
-        return self.encryption_key
-
-    @property
-    def COMPRESSION_ENABLED(self) -> bool:
-        return self.compression_enabled
-
-    @property
-    def COMPRESSION_LEVEL(self) -> int:
-        return self.compression_level
-
-    @property
-    def ENABLE_OSS(self) -> bool:
-        return self.enable_oss
-
-    @property
-    def OSS_ENDPOINT(self) -> str:
-        return self.oss_endpoint
-
-    @property
-    def OSS_BUCKET(self) -> str:
-        return self.oss_bucket
-
-    @property
-    def OSS_AK(self) -> str:
-        return self.oss_ak
-
-    @property
-    def OSS_SK(self) -> str:
-        return self.oss_sk
-
-    @property
-    def OSS_DOMAIN(self) -> str:
-        return self.oss_domain
-
-    @property
-    def RATE_LIMIT(self) -> str:
-        return self.rate_limit
-
-    @property
-    def REDIS_URL(self) -> str:
-        return self.redis_url
-
-    @property
-    def MAX_FILE_SIZE(self) -> int:
-        return self.max_file_size
-
-    @property
-    def CORS_ORIGINS(self) -> list:
-        return self._cors_origins_cached
-
-    @property
-    def DB_FILE(self) -> str:
-        """数据库文件路径"""
-        return str(DB_PATH)
-
-    @property
-    def UPLOAD_DIR(self) -> str:
-        """上传目录路径"""
-        return str(UPLOAD_DIR)
-
-    @property
-    def LOG_DIR(self) -> str:
-        """日志目录路径"""
-        return str(LOG_DIR)
+    # HOST_DOMAIN、API_KEY、OSS_* 等大写别名在 __init__ 中一次性写入实例字典，
+    # 读取时是普通属性查找，不再经过 property 调用；
+    # 另外提供 DB_FILE / UPLOAD_DIR / LOG_DIR 三个路径字符串；
+    # CORS_ORIGINS 是解析后的来源元组 (而非原始逗号分隔字符串)，
+    # RATE_LIMIT_PARSED 是预解析的 (请求数, 窗口秒数)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        # 缓存 CORS_ORIGINS 列表
-        self._cors_origins_cached = self._parse_cors_origins()
-
-    def _parse_cors_origins(self) -> list:
-        if self.cors_origins.strip() == "*":
-            return ["*"]
-        return [x.strip() for x in self.cors_origins.split(",") if x.strip()]
+        # 写入大写别名 (字段值在构造后不再变化)
+        self.__dict__.update(self._uppercase_aliases())
+
+    def _uppercase_aliases(self) -> dict[str, Any]:
+        """构建大写别名 -> 值 的映射 (字段别名 + 路径字符串)"""
+        aliases = {
+            field.alias: getattr(self, name)
+            for name, field in type(self).model_fields.items()
+            if field.alias
+        }
+        aliases["DB_FILE"] = _DB_FILE      # 数据库文件路径
+        aliases["UPLOAD_DIR"] = _UPLOAD_DIR  # 上传目录路径
+        aliases["LOG_DIR"] = _LOG_DIR      # 日志目录路径
+        aliases["CORS_ORIGINS"] = self._parse_cors_origins()  # 覆盖原始字符串
+        aliases["RATE_LIMIT_PARSED"] = _parse_rate_limit(self.rate_limit)  # 限流参数
+        return aliases
+
+    def _parse_cors_origins(self) -> tuple[str, ...]:
+        """解析 CORS 来源；"*" 直接返回共享的 _WILDCARD_CORS (可用 is 判断)"""
+        origins = self.cors_origins.strip()
+        if origins == "*":
+            return _WILDCARD_CORS
+        return tuple(x for x in map(str.strip, origins.split(",")) if x)
 
     # ==========================================
     # 🧠 配置验证
     # ==========================================
 
+    @field_validator("rate_limit")
+    @classmethod
+    def validate_rate_limit(cls, v: str) -> str:
+        """
+        🚦 验证限流规则格式
+
+        Raises:
+            ValueError: 规则无法解析时抛出
+        """
+        _parse_rate_limit(v)
+        return v
+
     @model_validator(mode="after")
     def validate_encryption_config(self):
         """
@@ -353,21 +385,10 @@ class Settings(BaseSettings):
             ValueError: OSS 配置不完整时记录警告 (不阻止启动)
         """
         if self.enable_oss:
-            missing = []
-            if not self.oss_endpoint:
-                missing.append("OSS_ENDPOINT")
-            if not self.oss_bucket:
-                missing.append("OSS_BUCKET")
-            if not self.oss_ak:
-                missing.append("OSS_AK")
-            if not self.oss_sk:
-                missing.append("OSS_SK")
-            if not self.oss_domain:
-                missing.append("OSS_DOMAIN")
+            missing = tuple(alias for name, alias in _OSS_REQUIRED if not getattr(self, name))
 
             if missing:
                 # 记录警告但不阻止启动 (运行时会尝试使用本地存储)
-                import warnings
                 warnings.warn(
                     f"⚠️ OSS 配置不完整，缺失: {', '.join(missing)}，"
                     f"OSS 功能将不可用，仅使用本地存储"
@@ -379,20 +400,36 @@ class Settings(BaseSettings):
     # ==========================================
 
     @cached_property
-    def OSS_CONFIG(self) -> dict:
+    def OSS_CONFIG(self) -> MappingProxyType:
         """
         ☁️ 获取 OSS 配置字典（延迟计算并缓存）
 
         Returns:
-            dict: OSS 配置字典，包含 endpoint, bucket_name, access_key, secret_key, base_url
+            MappingProxyType: 只读的 OSS 配置映射，包含 endpoint, bucket_name, access_key, secret_key, base_url
+
+        注意:
+            - 每个 Settings 实例只构建一次，热重载会换成新实例，无需手动失效
         """
-        return {
+        return MappingProxyType({
             "endpoint": self.oss_endpoint,
             "bucket_name": self.oss_bucket,
             "access_key": self.oss_ak,
             "secret_key": self.oss_sk,
             "base_url": self.oss_domain,
-        }
+        })
+
+
+# 镜像到 ConfigProxy 实例上的属性: 全部字段 + 大写别名 + OSS_CONFIG
+# (读取方直接命中槽位，等同于直接读取 Settings 实例)
+_MIRRORED_NAMES: tuple[str, ...] = (
+    *Settings.model_fields,
+    *(field.alias for field in Settings.model_fields.values() if field.alias),
+    "DB_FILE",
+    "UPLOAD_DIR",
+    "LOG_DIR",
+    "RATE_LIMIT_PARSED",
+    "OSS_CONFIG",
+)
 
 
 # ==========================================
@@ -406,8 +443,10 @@ class ConfigProxy:
     支持热重载的线程安全配置访问代理。
 
     功能:
-        - 线程安全的配置访问（使用 RLock）
-        - 配置热重载（替换底层 Settings 实例）
+        - 无锁配置读取（底层 Settings 只整体替换，从不原地修改）
+          镜像字段逐个写入，重载须在事件循环线程执行 (ConfigReloader 负责转交)，
+          协程才不会读到新旧混合的配置；需要多个字段保持一致时，从同一个 _settings 快照读取
+        - 配置热重载（替换底层 Settings 实例，RLock 只保护写入）
         - 配置版本追踪（每次重载 version +1）
         - 重载回调通知机制
 
@@ -417,13 +456,29 @@ class ConfigProxy:
         Config.api_key
         Config.model_dump()
 
+    属性存储:
+        使用 __slots__，配置字段与大写别名各自对应一个槽位 (C 层描述符)，
+        由 _mirror_fields 在构造和重载时写入；槽位可直接赋值，
+        测试中的 monkeypatch.setattr(Config, ...) 依然可用。
+        只有 Settings 的方法等未镜像的属性才回落到 __getattr__
+
+    为什么保留代理而不是原地修改单例:
+        热重载回调需要同时拿到新旧两份完整配置，且 Settings(...) 在重载、
+        测试中会被独立构造；原地 __dict__.update 会让旧配置随之改变
+
     属性:
         _settings: 当前生效的 Settings 实例
-        _lock: 线程安全锁（RLock 支持可重入）
+        _lock: 重载锁（RLock 支持可重入，读取路径不加锁）
         _version: 配置版本号（从 0 开始，每次重载 +1）
         _reload_callbacks: 配置重载后的回调函数列表
+        _dump_cache: 当前配置的 model_dump() 结果 (仅在构造和重载时计算)
     """
 
+    __slots__ = (
+        "_settings", "_lock", "_version", "_reload_callbacks", "_dump_cache",
+        *_MIRRORED_NAMES,
+    )
+
     def __init__(self, settings: 'Settings'):
         """
         初始化配置代理
@@ -435,42 +490,80 @@ class ConfigProxy:
         self._lock = threading.RLock()
         self._version = 0
         self._reload_callbacks: list[Callable[['Settings', 'Settings'], None]] = []
+        self._dump_cache = settings.model_dump()
+        self._mirror_fields(settings)
+
+    def _mirror_fields(self, settings: 'Settings') -> None:
+        """
+        将配置字段值镜像到代理实例上
+
+        镜像后 Config.auth_enabled 等字段走普通实例属性查找，
+        不再进入 __getattr__
+        """
+        for name in _MIRRORED_NAMES:
+            object.__setattr__(self, name, getattr(settings, name))
 
     def reload(self, new_settings: 'Settings') -> bool:
         """
         🔄 重新加载配置
 
         线程安全地替换底层配置实例，并触发回调通知。
+        应在事件循环线程调用，否则并发请求可能读到部分更新的镜像字段。
 
         Args:
-            new_settings: 新的配置实例
+            new_settings: 新的配置实例 (构造时已完成验证，这里不再重复验证)
 
         Returns:
             bool: 重载成功返回 True，失败返回 False
         """
+        if not isinstance(new_settings, Settings):
+            _log.error(f"配置重载失败: 需要 Settings 实例，收到 {type(new_settings).__name__}")
+            return False
+
+        # 在锁外导出 (仅用于 model_dump 缓存)
+        dump = new_settings.model_dump()
+
         with self._lock:
             old_settings = self._settings
+
+            # 替换配置实例: _settings 为单次引用赋值；镜像槽位逐个写入，
+            # 其他线程可能在中途读到新旧混合的字段 (事件循环线程内调用时协程不受影响)
+            self._settings = new_settings
+            self._dump_cache = dump
+            self._mirror_fields(new_settings)
+            self._version += 1
+
+            # 锁内只取回调列表快照
+            callbacks = tuple(self._reload_callbacks)
+
+        # 触发回调（在锁外执行，避免死锁）
+        for callback in callbacks:
             try:
-                # 验证新配置
-                new_settings.model_validate(new_settings.model_dump())
-
-                # 替换配置实例
-                self._settings = new_settings
-                self._version += 1
-
-                # 触发回调（在锁外执行，避免死锁）
-                for callback in self._reload_callbacks:
-                    try:
-                        callback(old_settings, new_settings)
-                    except Exception as e:
-                        from app.core.logger import log
-                        log.error(f"配置重载回调失败: {e}")
-
-                return True
+                callback(old_settings, new_settings)
             except Exception as e:
-                from app.core.logger import log
-                log.error(f"配置重载失败: {e}")
-                return False
+                _log.error(f"配置重载回调失败: {e}")
+
+        return True
+
+    def reload_from_dict(self, data: dict[str, Any]) -> bool:
+        """
+        🔄 从字典重新加载配置
+
+        对字典只做一次验证 (构造 Settings)，再交给 reload() 替换。
+        未提供的配置项仍按 .env / 环境变量 / 默认值加载。
+
+        Args:
+            data: 配置字典 (字段名或大写别名均可)
+
+        Returns:
+            bool: 重载成功返回 True，验证失败返回 False
+        """
+        try:
+            new_settings = Settings(**data)
+        except Exception as e:
+            _log.error(f"配置重载失败: {e}")
+            return False
+        return self.reload(new_settings)
 
     def add_reload_callback(self, callback: Callable[['Settings', 'Settings'], None]):
         """
@@ -497,27 +590,31 @@ class ConfigProxy:
         """
         🔍 代理所有属性访问到当前配置实例
 
-        支持 Config.auth_enabled、Config.api_key 等访问方式。
+        配置字段、大写别名、OSS_CONFIG 已镜像到实例上，不会进入此方法；
+        这里只处理 Settings 的方法等其余属性。
 
         Args:
             name: 属性名
 
         Returns:
             Any: 配置值
+
+        注意:
+            - 不加锁: 只读取一次 _settings 引用，重载时整体替换
         """
-        with self._lock:
-            return getattr(self._settings, name)
+        return getattr(self._settings, name)
 
-    @property
     def model_dump(self) -> dict:
         """
         📦 导出配置为字典
 
         Returns:
-            dict: 配置字典
+            dict: 配置字典 (缓存的浅拷贝，调用方修改不会影响缓存)
+
+        注意:
+            - 不再每次走 pydantic 序列化，缓存随 reload() 刷新
         """
-        with self._lock:
-            return self._settings.model_dump()
+        return self._dump_cache.copy()
 
     def __repr__(self) -> str:
         return f"ConfigProxy(version={self._version})"
@@ -561,4 +658,7 @@ __all__ = [
     "UPLOAD_DIR",       # 上传目录
     "DB_PATH",          # 数据库文件路径
     "LOG_DIR",          # 日志目录
+    "ALLOWED_EXTENSIONS",  # 允许上传的扩展名
+    "SKIP_DOTENV",      # 是否跳过 .env 文件
+    "ensure_dirs",      # 创建运行所需目录
 ]
@@ -10,39 +10,15 @@
 """
 
 import os
+import re
+from functools import cache
 from pathlib import Path
 from typing import Dict, Any, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from app.core.config import PROJECT_ROOT
 from app.core.logger import log
-
-
-# ==========================================
-# 📋 配置项定义
-# ==========================================
-
-class ConfigItem(BaseModel):
-    """单个配置项定义"""
-    key: str = Field(..., description="配置键名")
-    label: str = Field(..., description="显示名称")
-    value: str = Field(..., description="当前值")
-    type: str = Field(default="text", description="输入类型: text, number, boolean, select")
-    category: str = Field(default="基础", description="配置分类")
-    description: str = Field(default="", description="配置说明")
-    options: Optional[list[str]] = Field(None, description="可选值列表")
-    sensitive: bool = Field(default=False, description="是否敏感信息")
-    placeholder: str = Field(default="", description="占位符")
-    min_value: Optional[int] = Field(None, description="最小值（数字类型）")
-    max_value: Optional[int] = Field(None, description="最大值（数字类型）")
-    required: bool = Field(default=False, description="是否必填")
-    pattern: Optional[str] = Field(None, description="正则验证模式")
-    generate_command: Optional[str] = Field(None, description="生成命令（用于密钥等）")
-    generate_type: Optional[str] = Field(None, description="生成类型：api_key, encryption_key")
-
-
-class ConfigUpdateRequest(BaseModel):
-    """配置更新请求"""
-    updates: Dict[str, str] = Field(..., description="配置更新 {key: value}")
+# 配置项模型统一定义在 app.models (此处重新导出以兼容旧导入)
+from app.models import ConfigItem, ConfigUpdateRequest
 
 
 # ==========================================
@@ -197,6 +173,107 @@ CATEGORIES = [
 ]
 
 
+# .env 中的 KEY=VALUE 行 (键、值两侧空白及行尾 \r 不计入)
+_ENV_LINE_RE = re.compile(
+    r"^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*([^\r\n]*?)[ \t\r]*$",
+    re.MULTILINE,
+)
+
+
+# ==========================================
+# 🧮 配置项模板 (导入时一次性展开)
+# ==========================================
+# 每个配置项预先整理成 ConfigItem 的关键字参数 (缺省值已填充)，
+# 渲染时只需填入 key / value 并解包，无需逐项 dict.get()。
+# 模板顺序在导入时按 (分类顺序, 显示名称) 排好，渲染时无需再排序
+
+# ConfigItem 字段 -> 缺省值 (key / value 在运行时填入)
+_ITEM_DEFAULTS: Dict[str, Any] = {
+    "type": "text",
+    "description": "",
+    "options": None,
+    "sensitive": False,
+    "placeholder": "",
+    "min_value": None,
+    "max_value": None,
+    "required": False,
+    "pattern": None,
+    "generate_command": None,
+    "generate_type": None,
+}
+
+_CATEGORY_ORDER: Dict[str, int] = {cat: i for i, cat in enumerate(CATEGORIES)}
+_ITEM_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    key: {**_ITEM_DEFAULTS, **CONFIG_DEFINITIONS[key]}
+    for key in sorted(
+        CONFIG_DEFINITIONS,
+        key=lambda k: (
+            _CATEGORY_ORDER.get(CONFIG_DEFINITIONS[k]["category"], 999),
+            CONFIG_DEFINITIONS[k]["label"],
+        ),
+    )
+}
+
+# 需要脱敏显示的配置键
+_SENSITIVE: frozenset[str] = frozenset(
+    key for key, template in _ITEM_TEMPLATES.items() if template["sensitive"]
+)
+
+
+def _mask(value: str) -> str:
+    """
+    🔒 脱敏敏感信息 (长度超过 8 时保留首尾各 2 个字符)
+
+    Args:
+        value: 原始值
+
+    Returns:
+        str: 脱敏后的值
+    """
+    return f"{value[:2]}******{value[-2:]}" if len(value) > 8 else "******"
+
+
+# ==========================================
+# 🔁 服务重启环境 (导入时检测一次，运行期间不会变化)
+# ==========================================
+
+_DOCKER_SUPERVISORCTL = "/usr/bin/supervisorctl"
+_IS_DOCKER = os.path.exists("/.dockerenv")
+_HAS_SUPERVISOR = os.path.exists(_DOCKER_SUPERVISORCTL)
+
+
+@cache
+def _local_supervisorctl() -> Optional[str]:
+    """
+    本地环境从 PATH 查找 supervisorctl (首次重启时才扫描 PATH，结果缓存)
+
+    Returns:
+        Optional[str]: 可执行文件路径，未安装时为 None
+    """
+    import shutil  # 仅重启路径使用，不拖慢启动
+    return shutil.which("supervisorctl")
+
+
+def _supervisorctl_restart(executable: str) -> int:
+    """
+    通过 supervisorctl 重启服务 (直接执行，不经过 shell)
+
+    Args:
+        executable: supervisorctl 可执行文件路径
+
+    Returns:
+        int: 进程退出码
+    """
+    import subprocess  # 仅重启路径使用，不拖慢启动
+    return subprocess.run(
+        [executable, "restart", "tuchuang"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=5,
+        check=False,
+    ).returncode
+
+
 # ==========================================
 # 🛠️ 配置管理器
 # ==========================================
@@ -220,34 +297,41 @@ class ConfigManager:
             env_path: .env 文件路径，默认为项目根目录下的 .env
         """
         if env_path is None:
-            from app.core.config import PROJECT_ROOT
             env_path = PROJECT_ROOT / ".env"
         self.env_path = env_path
+        # 解析结果缓存: (st_mtime_ns, st_size, 配置字典)，文件未变化时直接复用
+        self._env_cache: Optional[tuple[int, int, Dict[str, str]]] = None
 
     def read_env_file(self) -> Dict[str, str]:
         """
         📖 读取 .env 文件
 
         Returns:
-            dict: 配置键值对
+            dict: 配置键值对 (新字典，调用方可自由修改)
+
+        注意:
+            - 按文件 mtime + size 缓存解析结果，文件未变化时不再重新读取
         """
-        config = {}
-        if self.env_path.exists():
-            with open(self.env_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    # 跳过空行和注释
-                    if not line or line.startswith("#"):
-                        continue
-                    # 解析 KEY=VALUE
-                    if "=" in line:
-                        key, value = line.split("=", 1)
-                        config[key.strip()] = value.strip()
-        return config
+        try:
+            st = os.stat(self.env_path)
+        except FileNotFoundError:
+            self._env_cache = None
+            return {}
+
+        cache = self._env_cache
+        if cache is not None and cache[0] == st.st_mtime_ns and cache[1] == st.st_size:
+            return dict(cache[2])
+
+        # 整个文件一次正则扫描 (空行、注释行不匹配，自动跳过)
+        text = self.env_path.read_text(encoding="utf-8")
+        config = dict(_ENV_LINE_RE.findall(text))
+
+        self._env_cache = (st.st_mtime_ns, st.st_size, config)
+        return dict(config)
 
     def write_env_file(self, config: Dict[str, str]) -> bool:
         """
-        💾 写入 .env 文件（直接修改对应字段，保留注释和其他内容）
+        💾 写入 .env 文件（直接修改对应字段，保留注释和其他内容，原子替换）
 
         Args:
             config: 配置键值对
@@ -256,11 +340,10 @@ class ConfigManager:
             bool: 是否写入成功
         """
         try:
-            # 读取原文件内容
-            if self.env_path.exists():
-                with open(self.env_path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-            else:
+            # 一次性读取原文件内容
+            try:
+                lines = self.env_path.read_text(encoding="utf-8").splitlines(keepends=True)
+            except FileNotFoundError:
                 lines = []
 
             # 记录已处理的配置项
@@ -290,14 +373,27 @@ class ConfigManager:
                     # 保留原行
                     new_lines.append(line)
 
-            # 添加新配置项（原文件中不存在的）
-            for key, value in config.items():
-                if key not in processed_keys:
-                    new_lines.append(f"{key}={value}\n")
+            # 原文件末行没有换行符时补上，避免新配置项拼接到末行
+            if new_lines and not new_lines[-1].endswith("\n"):
+                new_lines[-1] += "\n"
 
-            # 写回文件
-            with open(self.env_path, "w", encoding="utf-8") as f:
-                f.writelines(new_lines)
+            # 添加新配置项（原文件中不存在的）
+            new_lines.extend(
+                f"{key}={value}\n"
+                for key, value in config.items()
+                if key not in processed_keys
+            )
+
+            # 原子写回: 先写临时文件再 os.replace，中途崩溃不会留下半截 .env
+            payload = "".join(new_lines)
+            tmp_path = self.env_path.with_name(self.env_path.name + ".tmp")
+            self._write_private_file(tmp_path, payload.encode("utf-8"))
+            try:
+                os.replace(tmp_path, self.env_path)
+            except OSError:
+                # .env 以单文件形式挂载 (Docker bind mount) 时无法替换，退回原地写入
+                tmp_path.unlink(missing_ok=True)
+                self.env_path.write_text(payload, encoding="utf-8")
 
             log.info(f"✅ 配置已写入: {self.env_path}")
             return True
@@ -305,6 +401,40 @@ class ConfigManager:
             log.error(f"❌ 写入配置失败: {e}")
             return False
 
+    def _write_private_file(self, tmp_path: Path, data: bytes) -> None:
+        """
+        写入临时文件，权限与属主沿用原 .env
+
+        注意:
+            - .env 含 API_KEY / ENCRYPTION_KEY / OSS 密钥，替换后不能变成全局可读
+            - 原文件不存在时使用 0600
+            - 非 root 无法 chown 时保留当前属主
+        """
+        try:
+            st = os.stat(self.env_path)
+            mode = st.st_mode & 0o777
+        except FileNotFoundError:
+            st = None
+            mode = 0o600
+
+        # 清理上次崩溃残留的临时文件，O_EXCL 保证文件由本次创建
+        tmp_path.unlink(missing_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+        try:
+            # os.open 的 mode 受 umask 影响，显式设置一次
+            os.fchmod(fd, mode)
+            if st is not None:
+                try:
+                    os.fchown(fd, st.st_uid, st.st_gid)
+                except PermissionError:
+                    pass
+            with os.fdopen(fd, "wb") as f:
+                fd = -1
+                f.write(data)
+        finally:
+            if fd != -1:
+                os.close(fd)
+
     def get_config_items(self) -> list[ConfigItem]:
         """
         📋 获取所有配置项
@@ -313,36 +443,18 @@ class ConfigManager:
             list[ConfigItem]: 配置项列表（按分类排序）
         """
         current_config = self.read_env_file()
-        items = []
-
-        for key, definition in CONFIG_DEFINITIONS.items():
-            value = current_config.get(key, "")
-            # 敏感信息脱敏
-            display_value = self._mask_sensitive(value, definition.get("sensitive", False))
 
-            items.append(ConfigItem(
+        # 模板在导入时已确定合法，用 model_construct 跳过验证；
+        # 只有敏感配置项才调用脱敏函数
+        return [
+            ConfigItem.model_construct(
                 key=key,
-                label=definition["label"],
-                value=display_value,
-                type=definition.get("type", "text"),
-                category=definition["category"],
-                description=definition.get("description", ""),
-                options=definition.get("options"),
-                sensitive=definition.get("sensitive", False),
-                placeholder=definition.get("placeholder", ""),
-                min_value=definition.get("min_value"),
-                max_value=definition.get("max_value"),
-                required=definition.get("required", False),
-                pattern=definition.get("pattern"),
-                generate_command=definition.get("generate_command"),
-                generate_type=definition.get("generate_type"),
-            ))
-
-        # 按分类排序
-        category_order = {cat: i for i, cat in enumerate(CATEGORIES)}
-        items.sort(key=lambda x: (category_order.get(x.category, 999), x.label))
-
-        return items
+                value=_mask(value) if key in _SENSITIVE else value,
+                **template,
+            )
+            for key, template in _ITEM_TEMPLATES.items()
+            for value in (current_config.get(key, ""),)
+        ]
 
     def update_config(self, updates: Dict[str, str]) -> tuple[bool, str]:
         """
@@ -360,12 +472,12 @@ class ConfigManager:
 
             # 应用更新
             for key, value in updates.items():
-                if key not in CONFIG_DEFINITIONS:
+                template = _ITEM_TEMPLATES.get(key)
+                if template is None:
                     return False, f"❌ 未知的配置项: {key}"
 
                 # 处理布尔值
-                definition = CONFIG_DEFINITIONS[key]
-                if definition.get("type") == "boolean":
+                if template["type"] == "boolean":
                     current_config[key] = "true" if value.lower() in ("true", "1", "yes") else "false"
                 else:
                     current_config[key] = value
@@ -390,18 +502,18 @@ class ConfigManager:
         """
         try:
             # 检测运行环境
-            if os.path.exists("/.dockerenv"):
+            if _IS_DOCKER:
                 # Docker 环境：使用 supervisor 或直接退出让容器重启
-                if os.path.exists("/usr/bin/supervisorctl"):
-                    os.system("supervisorctl restart tuchuang")
+                if _HAS_SUPERVISOR:
+                    _supervisorctl_restart(_DOCKER_SUPERVISORCTL)
                     return True, "✅ 服务重启命令已发送"
                 else:
                     # 直接退出，让 Docker 容器管理器重启
                     return True, "✅ 配置已保存，服务将在几秒后自动重启"
             else:
                 # 本地开发环境：尝试使用 supervisor
-                result = os.system("supervisorctl restart tuchuang 2>/dev/null")
-                if result == 0:
+                executable = _local_supervisorctl()
+                if executable and _supervisorctl_restart(executable) == 0:
                     return True, "✅ 服务重启成功"
                 else:
                     return True, "✅ 配置已保存，请手动重启服务"
@@ -410,23 +522,6 @@ class ConfigManager:
             log.exception("重启服务异常")
             return False, f"❌ 重启服务失败: {str(e)}"
 
-    def _mask_sensitive(self, value: str, sensitive: bool) -> str:
-        """
-        🔒 脱敏敏感信息
-
-        Args:
-            value: 原始值
-            sensitive: 是否敏感
-
-        Returns:
-            str: 脱敏后的值
-        """
-        if not sensitive:
-            return value
-        if not value or len(value) < 4:
-            return "******"
-        return value[:2] + "******" + value[-2:] if len(value) > 8 else "******"
-
 
 # ==========================================
 # 📤 导出
@@ -6,7 +6,7 @@
 模块功能:
     - 协调文件监听和配置重载
     - 配置变更日志记录
-    - 线程安全的重载机制
+    - 线程安全的重载机制 (配置替换在事件循环线程执行)
 
 使用场景:
     - 配置热重载
@@ -14,17 +14,29 @@
 
 """
 
+import asyncio
+import re
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import Optional
 
-# 类型注解
-if TYPE_CHECKING:
-    from app.core.config import Settings, ConfigProxy
+# 配置模块 (模块级引用，重载时不再执行函数内导入)
+from app.core.config import Config, Settings, PROJECT_ROOT
 
 # 日志模块
 from app.core.logger import log
 
 
+# 变更日志中需要脱敏的配置字段 (字段名含 key / secret / token，以及 OSS 凭证)
+# 导入时对字段名匹配一次，重载时只做集合查找
+_SENSITIVE_RE = re.compile(r"key|secret|token", re.IGNORECASE)
+_SENSITIVE_KEYS: frozenset[str] = frozenset(
+    name for name in Settings.model_fields if _SENSITIVE_RE.search(name)
+) | {"oss_ak", "oss_sk"}
+
+# 等待事件循环执行配置替换的最长时间 (秒)
+_APPLY_TIMEOUT = 10.0
+
+
 class ConfigReloader:
     """
     🔄 配置重载协调器
@@ -50,13 +62,13 @@ class ConfigReloader:
         Args:
             env_path: .env 文件路径，默认使用项目根目录下的 .env
         """
-        from app.core.config import PROJECT_ROOT
-
         if env_path is None:
             env_path = PROJECT_ROOT / ".env"
 
         self.env_path = env_path
         self._watcher = None
+        # 应用的事件循环 (start_watching 时获取)，配置替换须在此线程执行
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     def _on_file_changed(self):
         """
@@ -76,37 +88,31 @@ class ConfigReloader:
         Returns:
             bool: 重载成功返回 True，失败返回 False
         """
-        from app.core.config import Config, Settings
-
         try:
             # 创建新的配置实例（会重新读取 .env）
             new_settings = Settings()
 
-            # 收集变更的配置项（用于日志）
-            old_values = {}
-            new_values = {}
-            for key in new_settings.model_fields:
-                old_val = getattr(Config._settings, key, None)
-                new_val = getattr(new_settings, key, None)
-                if old_val != new_val:
-                    old_values[key] = old_val
-                    new_values[key] = new_val
+            # 收集变更的配置项（用于日志）: 新旧配置各导出一次后比较
+            old_dump = Config.model_dump()
+            changed = {
+                key: (old_dump.get(key), new_val)
+                for key, new_val in new_settings.model_dump().items()
+                if old_dump.get(key) != new_val
+            }
 
             # 执行重载
-            success = Config.reload(new_settings)
+            success = self._apply(new_settings)
 
             if success:
                 log.info("✅ 配置热重载成功")
                 log.info(f"   版本: {Config.version}")
 
                 # 输出变更的配置项
-                if old_values:
+                if changed:
                     changes = []
-                    for key in old_values:
-                        old_v = old_values[key]
-                        new_v = new_values[key]
+                    for key, (old_v, new_v) in changed.items():
                         # 敏感信息脱敏
-                        if "key" in key.lower() or "secret" in key.lower() or "token" in key.lower():
+                        if key in _SENSITIVE_KEYS:
                             old_v = "***" if old_v else None
                             new_v = "***" if new_v else None
                         changes.append(f"{key}: {old_v} → {new_v}")
@@ -123,8 +129,46 @@ class ConfigReloader:
             log.exception(f"💥 配置重载异常: {e}")
             return False
 
+    def _apply(self, new_settings: Settings) -> bool:
+        """
+        在事件循环线程中替换配置
+
+        Config.reload 会逐个写入镜像字段，在监听线程中直接执行时，
+        并发处理的请求可能读到新旧混合的配置；交给事件循环执行后，
+        协程只会在 await 点之间看到完整的旧配置或新配置
+
+        Args:
+            new_settings: 新的配置实例
+
+        Returns:
+            bool: Config.reload 的结果
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return Config.reload(new_settings)
+        try:
+            if asyncio.get_running_loop() is loop:
+                return Config.reload(new_settings)
+        except RuntimeError:
+            pass
+
+        async def _reload() -> bool:
+            return Config.reload(new_settings)
+
+        return asyncio.run_coroutine_threadsafe(_reload(), loop).result(timeout=_APPLY_TIMEOUT)
+
     def start_watching(self):
-        """启动配置文件监听"""
+        """
+        启动配置文件监听
+
+        注意:
+            - 在事件循环中调用时记录该循环，之后的重载都在循环线程中执行
+        """
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
         if self._watcher is None:
             from app.core.config_watcher import ConfigWatcher
 
@@ -17,6 +17,7 @@
 
 """
 
+import os
 import threading
 import time
 from pathlib import Path
@@ -24,71 +25,156 @@ from typing import Callable, Optional
 
 # watchdog 文件系统监听
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileModifiedEvent
+from watchdog.observers.api import BaseObserver, ObservedWatch
+from watchdog.observers.polling import PollingObserver
+from watchdog.events import (
+    EVENT_TYPE_CREATED,
+    EVENT_TYPE_MODIFIED,
+    EVENT_TYPE_MOVED,
+    FileSystemEvent,
+    FileSystemEventHandler,
+)
 
 # 日志模块
 from app.core.logger import log
 
 
+# Docker 中 .env 通常位于绑定挂载卷上，inotify 可能收不到事件或事件风暴；
+# 配置文件很少变化，改用轮询 (每 5 秒扫描一次所在目录)
+_IS_DOCKER = os.path.exists("/.dockerenv")
+_POLL_INTERVAL = 5.0
+
+# 会改变文件内容的事件类型 (编辑器和 ConfigManager 通过重命名覆盖保存 → moved)
+_CONTENT_EVENTS = frozenset({EVENT_TYPE_MODIFIED, EVENT_TYPE_CREATED, EVENT_TYPE_MOVED})
+
+
+# ==========================================
+# 🔗 进程级共享观察者
+# ==========================================
+
+# 所有 ConfigWatcher 共用一个观察者 (一个线程 + 一个 inotify 实例)，
+# 按引用计数在第一个监听启动时创建、最后一个监听停止时关闭
+_shared_observer: Optional[BaseObserver] = None
+_observer_refs = 0
+_observer_lock = threading.Lock()
+
+
+def _acquire_observer() -> BaseObserver:
+    """
+    获取共享观察者 (首次调用时创建并启动)
+
+    Returns:
+        BaseObserver: 进程级共享观察者
+    """
+    global _shared_observer, _observer_refs
+    with _observer_lock:
+        if _shared_observer is None:
+            # Docker 中轮询，其他环境使用原生 inotify / FSEvents
+            observer = PollingObserver(timeout=_POLL_INTERVAL) if _IS_DOCKER else Observer()
+            observer.daemon = True
+            observer.start()
+            _shared_observer = observer
+        _observer_refs += 1
+        return _shared_observer
+
+
+def _release_observer() -> None:
+    """释放共享观察者引用 (最后一个引用释放时停止观察者线程)"""
+    global _shared_observer, _observer_refs
+    with _observer_lock:
+        _observer_refs -= 1
+        if _observer_refs > 0 or _shared_observer is None:
+            return
+        observer, _shared_observer = _shared_observer, None
+    observer.stop()
+    observer.join(timeout=5)
+
+
 class EnvFileHandler(FileSystemEventHandler):
     """
     📄 .env 文件变化处理器
 
     功能:
-        - 监听 .env 文件的修改事件
-        - 防抖处理（避免短时间内多次触发）
+        - 监听 .env 文件的修改 / 创建 / 重命名覆盖 (原子写入) 事件
+        - 与预先计算的路径字符串直接比较过滤事件，同目录其他文件的变化不会进入回调
+        - 防抖处理（最后一次修改后静默 debounce_seconds 才触发，一次保存只触发一次）
         - 触发配置重载回调
 
+    防抖实现:
+        事件回调只记录时间戳并唤醒常驻的后台线程，
+        不再为每个事件创建 threading.Timer
+
     属性:
         callback: 文件修改后的回调函数
         debounce_seconds: 防抖延迟（秒）
     """
 
-    def __init__(self, callback: Callable[[], None], debounce_seconds: float = 1.0):
+    def __init__(
+        self,
+        callback: Callable[[], None],
+        debounce_seconds: float = 1.0,
+        env_path: Optional[Path] = None,
+    ):
         """
         初始化文件处理器
 
         Args:
             callback: 文件修改后的回调函数
             debounce_seconds: 防抖延迟时间（秒），默认 1 秒
+            env_path: 监听的配置文件路径，默认匹配任意目录下的 .env
         """
         super().__init__()
+        # 事件路径 = 调度目录字符串 + 文件名 (按 ConfigWatcher 调度的 str(env_path.parent) 拼接，
+        # 相对路径 .env 的事件路径是 "./.env" 而不是 str(env_path))，逐事件只做字符串比较
+        self._env_path_str: Optional[str] = (
+            os.path.join(str(env_path.parent), env_path.name) if env_path else None
+        )
         self.callback = callback
         self.debounce_seconds = debounce_seconds
-        self._last_trigger: float = 0
-        self._timer: Optional[threading.Timer] = None
-        self._env_name = ".env"
-
-    def on_modified(self, event):
+        self._last_change: float = 0.0
+        self._pending = threading.Event()
+        self._closed = False
+        self._worker = threading.Thread(
+            target=self._debounce_loop, name="env-debounce", daemon=True
+        )
+        self._worker.start()
+
+    def dispatch(self, event: FileSystemEvent) -> None:
         """
-        文件修改事件处理
+        文件事件处理 (替代父类按事件类型分发，只记录时间戳)
 
         Args:
             event: 文件系统事件
         """
-        # 忽略目录事件
-        if event.is_directory:
+        # 只关心会改变文件内容的事件 (打开 / 关闭 / 删除 / 目录事件等忽略)
+        if event.is_directory or event.event_type not in _CONTENT_EVENTS:
             return
 
-        # 只处理 .env 文件
-        if Path(event.src_path).name != self._env_name:
+        # 重命名覆盖时 .env 出现在 dest_path，其余事件在 src_path
+        if self._env_path_str is None:
+            if os.path.basename(event.src_path) != ".env" and os.path.basename(event.dest_path) != ".env":
+                return
+        elif event.src_path != self._env_path_str and event.dest_path != self._env_path_str:
             return
 
-        now = time.time()
-
-        # 防抖：如果距离上次触发时间太短，则忽略
-        if now - self._last_trigger < self.debounce_seconds:
-            return
+        # 记录最后修改时间并唤醒防抖线程
+        self._last_change = time.monotonic()
+        self._pending.set()
 
-        self._last_trigger = now
+    def _debounce_loop(self):
+        """防抖线程: 等到文件静默 debounce_seconds 后执行一次回调"""
+        while True:
+            self._pending.wait()
 
-        # 取消之前的定时器（如果存在）
-        if self._timer:
-            self._timer.cancel()
+            # 等待期间的新事件会推迟触发时间 (确保文件写入完成)
+            while (remaining := self._last_change + self.debounce_seconds - time.monotonic()) > 0:
+                time.sleep(remaining)
 
-        # 延迟执行回调（确保文件写入完成）
-        self._timer = threading.Timer(self.debounce_seconds, self._do_callback)
-        self._timer.start()
+            if self._closed:
+                return
+            # 在回调前清除标记: 等待期间的事件已合并，回调期间的新事件会再触发一次
+            self._pending.clear()
+            self._do_callback()
 
     def _do_callback(self):
         """执行回调函数"""
@@ -97,6 +183,11 @@ class EnvFileHandler(FileSystemEventHandler):
         except Exception as e:
             log.error(f"配置文件监听回调执行失败: {e}")
 
+    def close(self):
+        """停止防抖线程 (未触发的回调将被丢弃)"""
+        self._closed = True
+        self._pending.set()
+
 
 class ConfigWatcher:
     """
@@ -129,7 +220,9 @@ class ConfigWatcher:
         """
         self.env_path = env_path
         self.callback = callback
-        self.observer: Optional[Observer] = None
+        self.observer: Optional[BaseObserver] = None
+        self._watch: Optional[ObservedWatch] = None
+        self._handler: Optional[EnvFileHandler] = None
         self._running = False
 
     def start(self):
@@ -143,27 +236,30 @@ class ConfigWatcher:
             return
 
         try:
-            # 创建观察者
-            self.observer = Observer()
-
             # 创建事件处理器
-            handler = EnvFileHandler(self.callback, debounce_seconds=1.0)
+            self._handler = EnvFileHandler(
+                self.callback, debounce_seconds=1.0, env_path=self.env_path
+            )
 
-            # 监听 .env 文件所在的目录
-            self.observer.schedule(
-                handler,
+            # 在共享观察者上监听 .env 文件所在的目录
+            self.observer = _acquire_observer()
+            self._watch = self.observer.schedule(
+                self._handler,
                 str(self.env_path.parent),
                 recursive=False
             )
-
-            # 启动观察者
-            self.observer.start()
             self._running = True
 
             log.info(f"👁️ 配置文件监听已启动: {self.env_path}")
 
         except Exception as e:
             log.error(f"配置文件监听启动失败: {e}")
+            if self.observer:
+                _release_observer()
+                self.observer = None
+            if self._handler:
+                self._handler.close()
+                self._handler = None
             self._running = False
 
     def stop(self):
@@ -173,12 +269,19 @@ class ConfigWatcher:
 
         if self.observer:
             try:
-                self.observer.stop()
-                self.observer.join(timeout=5)
+                # 只移除自己的监听，观察者在没有其他使用者时才停止
+                if self._watch is not None:
+                    self.observer.unschedule(self._watch)
+                _release_observer()
             except Exception as e:
                 log.error(f"配置文件监听停止失败: {e}")
             finally:
                 self.observer = None
+                self._watch = None
+
+        if self._handler:
+            self._handler.close()
+            self._handler = None
 
         self._running = False
         log.info("🛑 配置文件监听已停止")
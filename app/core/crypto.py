@@ -4,17 +4,29 @@
 =============================================
 模块名称: crypto.py
 模块功能:
-    - 基于 Fernet (AES-128) 的对称加密/解密
+    - 基于 AES-256-GCM 的对称加密/解密 (OpenSSL AES-NI 硬件加速)
+    - 兼容解密旧版 Fernet 密文
     - 支持透明加解密 (根据配置自动开关)
     - 数据落盘前加密，读取时解密
 加密算法:
-    - Fernet (AES-128-CBC + HMAC)
-    - 密钥长度: 32 字节 (URL-safe Base64 编码)
+    - AES-256-GCM (认证加密，一次完成加密与完整性校验，无 Base64 编码)
+    - 密文格式: 版本字节 (0x01) + 12 字节随机 nonce + 密文 + 16 字节认证标签
+    - 密钥: ENCRYPTION_KEY 仍为 Fernet 格式 (32 字节 URL-safe Base64)，
+      AES 密钥由其经 HKDF-SHA256 派生
+    - 旧数据: Fernet 密文以 0x80 版本字节开头 (Base64 后为 "gAAAAA")，
+      按首字节区分，继续用 Fernet 解密
 
 """
 
-# Fernet 加密实现 (基于 cryptography 库)
+import base64
+import os
+
+# 加密实现 (基于 cryptography 库)
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 # 应用配置
 from app.core.config import Config
@@ -22,6 +34,32 @@ from app.core.config import Config
 from app.core.logger import log
 
 
+# 密文版本字节 (旧版 Fernet 密文首字节为 Base64 字符 "g"，不会冲突)
+_AESGCM_V1 = b"\x01"
+# GCM nonce 长度 (96 位)
+_NONCE_SIZE = 12
+# 密文头部长度: 版本字节 + nonce
+_HEADER_SIZE = 1 + _NONCE_SIZE
+
+
+def _derive_aes_key(raw_key: bytes) -> bytes:
+    """
+    由 Fernet 原始密钥 (32 字节) 派生 AES-256 密钥
+
+    Args:
+        raw_key: Base64 解码后的 ENCRYPTION_KEY
+
+    Returns:
+        bytes: 32 字节 AES 密钥
+    """
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"tuchuang aes-256-gcm v1",
+    ).derive(raw_key)
+
+
 class CryptoEngine:
     """
     🔐 加密引擎
@@ -32,7 +70,8 @@ class CryptoEngine:
         - 所有加密操作在内存中进行，不产生临时文件
 
     属性:
-        _cipher (Fernet | None): Fernet 加密器实例，未启用加密时为 None
+        _cipher (AESGCM | None): AES-GCM 加密器实例，未启用加密时为 None
+        _legacy (Fernet | None): 用于解密旧版 Fernet 密文
 
     使用示例:
         ```python
@@ -48,7 +87,8 @@ class CryptoEngine:
     """
 
     # 类变量: 加密器实例 (全局单例)
-    _cipher: Fernet = None
+    _cipher: AESGCM = None
+    _legacy: Fernet = None
 
     @classmethod
     def init_engine(cls):
@@ -56,7 +96,7 @@ class CryptoEngine:
         🚀 初始化加密引擎
 
         根据配置决定是否启用加密:
-            - 如果 ENCRYPTION_ENABLED=True，则初始化 Fernet 加密器
+            - 如果 ENCRYPTION_ENABLED=True，则初始化 AES-GCM 加密器 (及旧版 Fernet 解密器)
             - 如果 ENCRYPTION_ENABLED=False，则跳过初始化
 
         Raises:
@@ -75,9 +115,12 @@ class CryptoEngine:
                 raise ValueError("💥 加密已开启 (ENCRYPTION_ENABLED=True) 但未设置 ENCRYPTION_KEY，服务停止")
 
             try:
-                # 使用配置的密钥初始化 Fernet 加密器
-                cls._cipher = Fernet(Config.ENCRYPTION_KEY.encode())
-                log.info("🔐 加密引擎: 已启用 (数据将以 AES-128 加密存储)")
+                # Fernet 负责校验密钥格式并解密旧数据
+                key = Config.ENCRYPTION_KEY.encode()
+                cls._legacy = Fernet(key)
+                # 由原始密钥派生 AES-256 密钥
+                cls._cipher = AESGCM(_derive_aes_key(base64.urlsafe_b64decode(key)))
+                log.info("🔐 加密引擎: 已启用 (数据将以 AES-256-GCM 加密存储)")
             except Exception as e:
                 # 密钥格式错误或其他初始化失败
                 log.error(f"💥 加密引擎初始化失败: {e}")
@@ -85,6 +128,7 @@ class CryptoEngine:
         else:
             # 加密未启用，直接返回原始数据
             cls._cipher = None
+            cls._legacy = None
             log.info("🔓 加密引擎: 已禁用 (数据将以明文存储)")
 
     @classmethod
@@ -92,7 +136,7 @@ class CryptoEngine:
         """
         🔒 加密数据
 
-        如果加密已启用，使用 Fernet 加密数据
+        如果加密已启用，使用 AES-256-GCM 加密数据
         如果加密未启用，直接返回原数据
 
         Args:
@@ -102,24 +146,25 @@ class CryptoEngine:
             bytes: 加密后的数据 (未启用时返回原数据)
 
         注意:
-            - Fernet 加密后会包含: 时间戳 + IV + HMAC + 密文
-            - 加密后数据长度约为原数据长度的 1.5 倍
+            - 密文格式: 版本字节 + nonce + 密文 + 认证标签
+            - 加密后数据长度 = 原数据长度 + 29 字节
         """
-        # 检查加密是否启用
-        if not Config.ENCRYPTION_ENABLED or cls._cipher is None:
+        # _cipher 为 None 即表示加密未启用 (由 init_engine 按配置设置)
+        cipher = cls._cipher
+        if cipher is None:
             # 加密未启用，直接返回原数据
             return data
 
-        # 使用 Fernet 加密数据
-        # 加密过程: 生成时间戳 -> 生成 IV -> AES 加密 -> 计算 HMAC -> 拼接返回
-        return cls._cipher.encrypt(data)
+        # 每次使用新的随机 nonce (GCM 要求同一密钥下 nonce 不重复)
+        nonce = os.urandom(_NONCE_SIZE)
+        return b"".join((_AESGCM_V1, nonce, cipher.encrypt(nonce, data, None)))
 
     @classmethod
     def decrypt(cls, data: bytes) -> bytes:
         """
         🔓 解密数据
 
-        如果加密已启用，使用 Fernet 解密数据
+        如果加密已启用，按版本字节选择 AES-GCM 或旧版 Fernet 解密
         如果加密未启用，直接返回原数据
 
         Args:
@@ -129,22 +174,27 @@ class CryptoEngine:
             bytes: 解密后的原始数据 (未启用时返回原数据)
 
         Raises:
-            InvalidToken: 密钥错误或数据被篡改时抛出
+            InvalidTag: AES-GCM 密文认证失败 (密钥错误或数据被篡改)
+            InvalidToken: 旧版 Fernet 密文校验失败
             Exception: 解密失败时抛出
 
         注意:
-            ⚠️ 如果数据被篡改或密钥错误，解密会失败并抛出 InvalidToken
+            ⚠️ 如果数据被篡改或密钥错误，解密会失败并抛出异常
         """
-        # 检查加密是否启用
-        if not Config.ENCRYPTION_ENABLED or cls._cipher is None:
+        # _cipher 为 None 即表示加密未启用 (由 init_engine 按配置设置)
+        cipher = cls._cipher
+        if cipher is None:
             # 加密未启用，直接返回原数据
             return data
 
         try:
-            # 使用 Fernet 解密数据
-            # 解密过程: 验证 HMAC -> 验证时间戳 -> 验证 IV -> AES 解密
-            return cls._cipher.decrypt(data)
-        except InvalidToken as e:
+            if data[:1] == _AESGCM_V1:
+                # AES-GCM: 校验认证标签并解密
+                nonce = data[1:_HEADER_SIZE]
+                return cipher.decrypt(nonce, data[_HEADER_SIZE:], None)
+            # 旧版 Fernet 密文
+            return cls._legacy.decrypt(data)
+        except (InvalidTag, InvalidToken) as e:
             # 密钥错误或数据被篡改
             log.error(f"💥 解密失败: 数据可能已损坏或密钥错误 - {e}")
             raise e
@@ -8,21 +8,40 @@
     - 参数校验异常处理器
     - 错误响应格式统一
     - 敏感信息脱敏
+    - 错误响应体按 (错误码, 信息) 缓存，重复的拒绝响应不再重复序列化
 """
 
-import traceback
+import json
+from functools import lru_cache
+
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 
 from app.core.logger import log
 
 
+@lru_cache(maxsize=256)
+def _render_error(error_code: str, message: str) -> bytes:
+    """
+    序列化错误响应体 (与 JSONResponse 的输出逐字节一致)
+
+    401 / 429 等拒绝响应的内容在多次请求间完全相同，缓存后只序列化一次
+    """
+    return json.dumps(
+        {"code": error_code, "msg": message, "data": None},
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
 class ErrorResponse:
     """错误响应格式"""
 
     @staticmethod
-    def create(error_code: str, message: str, status_code: int = 500) -> JSONResponse:
+    def create(error_code: str, message: str, status_code: int = 500) -> Response:
         """
         创建标准错误响应
 
@@ -32,19 +51,22 @@ class ErrorResponse:
             status_code: HTTP 状态码
 
         Returns:
-            JSONResponse: 标准格式的错误响应
+            Response: 标准格式的 JSON 错误响应 (响应体来自缓存)
         """
-        return JSONResponse(
+        if not isinstance(message, str):
+            # HTTPException.detail 也可能是 dict / list (不可哈希，不缓存)
+            return JSONResponse(
+                status_code=status_code,
+                content={"code": error_code, "msg": message, "data": None},
+            )
+        return Response(
+            _render_error(error_code, message),
             status_code=status_code,
-            content={
-                "code": error_code,
-                "msg": message,
-                "data": None
-            }
+            media_type="application/json",
         )
 
 
-async def global_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def global_exception_handler(request: Request, exc: Exception) -> Response:
     """
     全局异常处理器
 
@@ -55,10 +77,10 @@ async def global_exception_handler(request: Request, exc: Exception) -> JSONResp
         exc: 异常对象
 
     Returns:
-        JSONResponse: 标准错误响应
+        Response: 标准错误响应
     """
     # 记录完整错误到日志（包含堆栈）
-    log.error(f"Unhandled exception: {exc}\n{traceback.format_exc()}")
+    log.opt(exception=exc).error("Unhandled exception: {}", exc)
 
     # 返回安全错误信息（不泄露内部细节）
     return ErrorResponse.create(
@@ -71,7 +93,7 @@ async def global_exception_handler(request: Request, exc: Exception) -> JSONResp
 async def validation_exception_handler(
     request: Request,
     exc: RequestValidationError
-) -> JSONResponse:
+) -> Response:
     """
     参数校验异常处理器
 
@@ -82,7 +104,7 @@ async def validation_exception_handler(
         exc: 验证异常对象
 
     Returns:
-        JSONResponse: 标准错误响应
+        Response: 标准错误响应
     """
     # 记录验证错误
     log.warning(f"Validation error: {exc.errors()}")
@@ -103,7 +125,7 @@ async def validation_exception_handler(
     )
 
 
-async def http_exception_handler(request: Request, exc) -> JSONResponse:
+async def http_exception_handler(request: Request, exc) -> Response:
     """
     HTTP 异常处理器
 
@@ -114,7 +136,7 @@ async def http_exception_handler(request: Request, exc) -> JSONResponse:
         exc: HTTPException 对象
 
     Returns:
-        JSONResponse: 标准错误响应
+        Response: 标准错误响应
     """
     return ErrorResponse.create(
         error_code="HTTP_ERROR",
@@ -5,7 +5,7 @@
 模块名称: logger.py
 模块功能:
     - 基于 Loguru 的结构化日志配置
-    - 控制台彩色输出
+    - 控制台彩色输出 (仅终端，重定向时输出纯文本)
     - 文件自动轮转 (按天切割，保留 30 天)
 日志风格:
     - 表情 + 中文
@@ -13,7 +13,10 @@
 
 """
 
+import gzip
+import shutil
 import sys
+import threading
 from loguru import logger
 
 # ========== 内部模块导入 ==========
@@ -33,15 +36,25 @@ logger.remove()
 # 📺 控制台输出 (彩色日志)
 # ==========================================
 
+# 只有输出到终端时才着色；重定向到 Docker 日志 / supervisor 时使用无标签的纯文本格式
+_COLORIZE = sys.stderr.isatty()
+
 # 格式: 时间 | 级别 | 模块:函数:行号 | 消息
+_CONSOLE_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+    if _COLORIZE else
+    "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+)
+
 logger.add(
     sys.stderr,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-           "<level>{level: <8}</level> | "
-           "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
-           "<level>{message}</level>",
+    format=_CONSOLE_FORMAT,
     level="INFO",  # 控制台只显示 INFO 及以上级别
-    colorize=True,  # 启用彩色输出
+    colorize=_COLORIZE,  # 终端中启用彩色输出
+    enqueue=True,  # 由后台线程输出，调用方不等待终端 / 管道 I/O
 )
 
 
@@ -52,15 +65,42 @@ logger.add(
 # 日志文件路径: logs/server_YYYY-MM-DD.log
 log_file_path = os.path.join(LOG_DIR, "server_{time:YYYY-MM-DD}.log")
 
+
+def _gzip_file(path: str) -> None:
+    """压缩单个日志文件为 .gz 并删除原文件"""
+    try:
+        with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except OSError as e:
+        logger.warning(f"⚠️ 日志压缩失败: {path} ({e})")
+
+
+def _compress_in_background(path: str) -> None:
+    """
+    轮转后的旧日志交给独立线程压缩
+
+    loguru 在写日志的线程中执行 compression，
+    直接用 "gz" 会让日志队列在午夜轮转时停顿到压缩完成
+    """
+    threading.Thread(target=_gzip_file, args=(path,), name="log-gzip").start()
+
+
+# 异常日志是否输出变量值 (逐帧 repr 局部变量，开销大且可能泄露密钥，默认关闭)
+# 排查问题时设置 LOG_DIAGNOSE=1 临时开启
+_DIAGNOSE = os.environ.get("LOG_DIAGNOSE", "0") == "1"
+
 logger.add(
     log_file_path,
     rotation="00:00",      # 每天午夜切割日志
     retention="30 days",   # 保留 30 天的日志
     level="INFO",          # 记录 INFO 及以上级别
     encoding="utf-8",      # UTF-8 编码 (支持中文)
-    compression="gz",      # 压缩旧日志文件 (节省空间)
-    backtrace=True,        # 显示完整的堆栈跟踪
-    diagnose=True,         # 显示变量值
+    buffering=64 * 1024,   # 64KB 写缓冲 (默认行缓冲每条日志一次 write 调用；退出时 loguru 自动刷盘)
+    compression=_compress_in_background,  # 后台压缩旧日志文件 (节省空间)
+    enqueue=True,          # 由后台线程写文件，调用方不等待磁盘 I/O
+    backtrace=False,       # 只显示到捕获点的堆栈 (不向上展开调用链)
+    diagnose=_DIAGNOSE,    # 显示变量值 (LOG_DIAGNOSE=1 时开启)
 )
 
 
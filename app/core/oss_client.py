@@ -5,7 +5,8 @@
 模块名称: oss_client.py
 模块功能:
     - 封装阿里云 OSS SDK 操作
-    - 提供异步文件上传/删除接口
+    - 提供异步文件上传/删除接口 (支持批量删除)
+    - 上传/删除直接经全局 HTTPX 客户端发送 (oss2 只负责签名)
     - 支持双写模式 (本地 + OSS)
 依赖:
     - oss2: 阿里云 OSS Python SDK
@@ -13,15 +14,30 @@
 """
 
 import asyncio
+import httpx
 import oss2
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
 # 应用配置
 from app.core.config import Config
+# 全局 HTTP 客户端 (上传/删除请求复用其连接池)
+from app.core.http_client import http_client
 # 日志模块
 from app.core.logger import log
 
 
+# 单次批量删除请求最多包含的对象数 (OSS 接口上限)
+_BATCH_DELETE_LIMIT = 1000
+
+# 上传/删除签名 URL 有效期 (秒)，生成后立即发送
+_SIGN_EXPIRES = 300
+
+# OSS 专用线程数，同时也是 HTTP 连接池大小:
+# 每个线程都有可复用的长连接 (oss2 默认只保留 10 个连接，超出的连接用完即关闭，下次重新 TLS 握手)
+_WORKERS = 16
+
+
 class OSSClient:
     """
     ☁️ 阿里云 OSS 客户端
@@ -45,12 +61,21 @@ class OSSClient:
 
         # 删除文件
         await OSSClient.delete("file.bin")
+
+        # 批量删除 (每 1000 个对象一次请求)
+        await OSSClient.delete_many_by_url(urls)
         ```
     """
 
     # 类变量: 认证和 Bucket 实例 (全局单例)
     _auth: Optional[oss2.Auth] = None
     _bucket: Optional[oss2.Bucket] = None
+    # 公网访问 URL 前缀 (init 时从配置快照，与 Bucket 同步，不含末尾 "/")
+    _base_url: str = ""
+    # Bucket 信息缓存 (首次探测成功后填充)
+    _bucket_info_cache: Optional[dict] = None
+    # OSS 专用线程池 (与其他 to_thread 调用隔离，OSS 变慢不会占满默认线程池)
+    _executor: Optional[ThreadPoolExecutor] = None
 
     @classmethod
     def init(cls):
@@ -66,7 +91,10 @@ class OSSClient:
 
         注意:
             ⚠️ OSS 上传失败不会影响主流程，仍会使用本地存储
+            - 只构造 Bucket 对象，不发网络请求；连通性由 probe() 在后台检查
         """
+        cls._bucket_info_cache = None
+
         # 检查是否启用 OSS
         if not Config.ENABLE_OSS:
             cls._bucket = None
@@ -93,15 +121,16 @@ class OSSClient:
                 Config.OSS_CONFIG["secret_key"]
             )
 
-            # 创建 Bucket 对象
+            # 创建 Bucket 对象 (所有调用共用一个线程安全的连接池，保持长连接)
             cls._bucket = oss2.Bucket(
                 cls._auth,
                 Config.OSS_CONFIG["endpoint"],
-                Config.OSS_CONFIG["bucket_name"]
+                Config.OSS_CONFIG["bucket_name"],
+                session=oss2.Session(pool_size=_WORKERS),
             )
-
-            # 测试连接 (获取 Bucket 信息)
-            cls._bucket.get_bucket_info()
+            cls._base_url = Config.OSS_CONFIG["base_url"].rstrip("/")
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="oss")
 
             log.info(f"☁️ OSS 客户端: 已启用 (Bucket: {Config.OSS_CONFIG['bucket_name']})")
 
@@ -109,6 +138,76 @@ class OSSClient:
             log.error(f"💥 OSS 客户端初始化失败: {e}")
             cls._bucket = None
 
+    @classmethod
+    async def _run(cls, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在 OSS 专用线程池中执行同步的 oss2 调用
+
+        Args:
+            func: oss2 同步方法
+            *args: 位置参数
+
+        Returns:
+            Any: func 的返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._executor, func, *args)
+
+    @classmethod
+    async def _send(cls, method: str, key: str, content: Optional[bytes] = None) -> httpx.Response:
+        """
+        用 oss2 生成签名 URL，经全局 HTTPX 异步客户端发送 (不占用线程)
+
+        Args:
+            method: HTTP 方法 (PUT / DELETE)
+            key: OSS 对象名
+            content: 请求体
+
+        Returns:
+            httpx.Response: OSS 响应
+
+        注意:
+            - 只用 oss2 公开的 Bucket.sign_url，签名在查询参数中，请求头须与签名时一致
+        """
+        # 与 Bucket.put_object 一致: 按扩展名设置 Content-Type (参与签名)
+        headers = oss2.utils.set_content_type(oss2.CaseInsensitiveDict(), key) if content is not None else {}
+        url = cls._bucket.sign_url(method, key, _SIGN_EXPIRES, headers=headers)
+        return await http_client().request(method, url, content=content, headers=dict(headers))
+
+    @staticmethod
+    def _crc64(content: bytes) -> int:
+        """计算 CRC64 (与 OSS 返回的 x-oss-hash-crc64ecma 相同算法)"""
+        crc = oss2.utils.Crc64()
+        crc.update(content)
+        return crc.crc
+
+    @classmethod
+    def close(cls):
+        """🛑 关闭 OSS 专用线程池 (应用关闭时调用，等待进行中的请求完成)"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
+
+    @classmethod
+    async def probe(cls) -> bool:
+        """
+        🔍 检查 OSS 连通性 (应用启动后在后台任务中执行)
+
+        在线程池中获取一次 Bucket 信息并缓存，不阻塞事件循环和应用启动
+
+        Returns:
+            bool: 连通返回 True；失败时禁用 OSS (仅使用本地存储) 并返回 False
+        """
+        if cls._bucket is None:
+            return False
+
+        if await cls.get_bucket_info():
+            return True
+
+        log.error("💥 OSS 连通性检查失败，仅使用本地存储")
+        cls._bucket = None
+        return False
+
     @classmethod
     async def upload(cls, filename: str, content: bytes) -> Optional[str]:
         """
@@ -127,7 +226,9 @@ class OSSClient:
             Exception: 上传失败时抛出 (由调用方处理)
 
         注意:
-            - 使用 asyncio.to_thread 将同步 oss2 调用转为异步
+            - 异步发送，等待 OSS 响应期间不占用线程
+            - content 原样作为请求体发送 (HTTPX 直接引用该 bytes 对象，不复制、不跨线程传递)
+            - 按 OSS 返回的 x-oss-hash-crc64ecma 校验 CRC64，不一致视为上传失败
             - 上传失败不会中断主流程，仅记录错误日志
         """
         # 检查 OSS 是否已初始化
@@ -135,22 +236,23 @@ class OSSClient:
             return None
 
         try:
-            # 在线程池中执行同步的 oss2 上传操作
-            # oss2.put_object 是同步方法，需要使用 to_thread 避免阻塞
-            result = await asyncio.to_thread(
-                cls._bucket.put_object,
-                filename,      # OSS 中的文件名
-                content        # 文件内容
-            )
+            response = await cls._send("PUT", filename, content)
+            status = response.status_code
 
             # 检查上传结果
-            if result.status == 200:
+            if status == 200:
+                # 与 put_object 一样校验 CRC64，不一致时删除已写入的对象
+                oss_crc = response.headers.get("x-oss-hash-crc64ecma")
+                if oss_crc is not None and int(oss_crc) != await cls._run(cls._crc64, content):
+                    log.error(f"☁️ OSS 上传 CRC64 校验失败: {filename}")
+                    await cls.delete(filename)
+                    return None
                 # 上传成功，生成公网访问 URL
-                url = f"{Config.OSS_CONFIG['base_url']}/{filename}"
+                url = f"{cls._base_url}/{filename}"
                 log.info(f"☁️ OSS 上传成功: {filename}")
                 return url
             else:
-                log.error(f"☁️ OSS 上传失败: HTTP {result.status}")
+                log.error(f"☁️ OSS 上传失败: HTTP {status}")
                 return None
 
         except Exception as e:
@@ -179,18 +281,14 @@ class OSSClient:
             return False
 
         try:
-            # 在线程池中执行同步的 oss2 删除操作
-            result = await asyncio.to_thread(
-                cls._bucket.delete_object,
-                filename
-            )
+            status = (await cls._send("DELETE", filename)).status_code
 
             # 检查删除结果
-            if result.status == 204 or result.status == 200:
+            if status == 204 or status == 200:
                 log.info(f"☁️ OSS 删除成功: {filename}")
                 return True
             else:
-                log.warning(f"⚠️ OSS 删除失败: HTTP {result.status}")
+                log.warning(f"⚠️ OSS 删除失败: HTTP {status}")
                 return False
 
         except Exception as e:
@@ -217,12 +315,61 @@ class OSSClient:
         try:
             # 从 URL 中提取文件名
             # URL 格式: https://bucket.oss-cn-hangzhou.aliyuncs.com/filename.bin
-            filename = url.split("/")[-1]
+            filename = url[url.rfind("/") + 1:]
             return await cls.delete(filename)
         except Exception as e:
             log.error(f"💥 解析 OSS URL 失败: {url} - {e}")
             return False
 
+    @classmethod
+    async def delete_many(cls, filenames: list[str]) -> dict[str, bool]:
+        """
+    🗑️ 批量从 OSS 删除文件
+
+        每 1000 个文件名合并为一次 batch_delete_objects 请求，
+        代替逐个 delete_object (每个对象一次网络往返 + 一次线程切换)
+
+        Args:
+            filenames: 要删除的文件名列表
+
+        Returns:
+            dict[str, bool]: {文件名: 是否删除成功}
+
+        注意:
+            - 未启用 OSS 时全部返回 False
+            - 某一批请求失败只影响该批文件，不中断其余批次
+        """
+        unique = list(dict.fromkeys(filenames))
+        results = dict.fromkeys(unique, False)
+        if cls._bucket is None or not unique:
+            return results
+
+        for start in range(0, len(unique), _BATCH_DELETE_LIMIT):
+            chunk = unique[start:start + _BATCH_DELETE_LIMIT]
+            try:
+                result = await cls._run(cls._bucket.batch_delete_objects, chunk)
+                for key in result.deleted_keys:
+                    results[key] = True
+            except Exception as e:
+                log.error(f"💥 OSS 批量删除异常 ({len(chunk)} 个文件): {e}")
+
+        deleted = sum(results.values())
+        log.info(f"☁️ OSS 批量删除: {deleted}/{len(unique)} 个文件")
+        return results
+
+    @classmethod
+    async def delete_many_by_url(cls, urls: list[str]) -> dict[str, bool]:
+        """
+    🗑️ 批量从 OSS 删除文件 (通过 URL)
+
+        Args:
+            urls: OSS 文件完整 URL 列表
+
+        Returns:
+            dict[str, bool]: {文件名: 是否删除成功}
+        """
+        return await cls.delete_many([url[url.rfind("/") + 1:] for url in urls])
+
     @classmethod
     def is_enabled(cls) -> bool:
         """
@@ -234,27 +381,31 @@ class OSSClient:
         return cls._bucket is not None
 
     @classmethod
-    def get_bucket_info(cls) -> dict:
+    async def get_bucket_info(cls) -> dict:
         """
         📊 获取 Bucket 信息
 
-        获取当前 OSS Bucket 的基本信息
+        获取当前 OSS Bucket 的基本信息 (成功后缓存，之后不再请求 OSS)
 
         Returns:
             dict: Bucket 信息，包含名称、区域、创建时间等
-                  未启用时返回空字典
+                  未启用或获取失败时返回空字典
         """
         if cls._bucket is None:
             return {}
+        if cls._bucket_info_cache is not None:
+            return cls._bucket_info_cache.copy()
 
         try:
-            info = cls._bucket.get_bucket_info()
-            return {
-                "name": info.name,
-                "location": info.location,
-                "creation_date": info.creation_date,
-                "storage_class": info.storage_class,
-            }
+            info = await cls._run(cls._bucket.get_bucket_info)
         except Exception as e:
             log.error(f"💥 获取 Bucket 信息失败: {e}")
             return {}
+
+        cls._bucket_info_cache = {
+            "name": info.name,
+            "location": info.location,
+            "creation_date": info.creation_date,
+            "storage_class": info.storage_class,
+        }
+        return cls._bucket_info_cache.copy()
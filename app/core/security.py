@@ -8,25 +8,32 @@
     - 请求频率限制 (基于 IP)
     - 支持 Redis 分布式限流
 鉴权流程:
-    - 从请求头提取 x-api-key
+    - APIKeyMiddleware 在 ASGI 层直接从原始请求头提取 x-api-key (不经过依赖注入)
     - 与配置的 API_KEY 比对
     - 鉴权失败返回 401
 限流机制:
-    - 使用 slowapi 库
-    - 支持 Redis 分布式或内存限流
+    - 令牌桶 (token_bucket 依赖)，Redis 上以 Lua 脚本原子执行
+    - 未配置 Redis 或 Redis 不可用时退化为进程内令牌桶
+    - slowapi 限流器保留给应用级挂载
 
 """
 
 import hmac
-
+import time
+import redis.asyncio as aioredis
+from cachetools import TTLCache
 from fastapi import Request, HTTPException, Security
 from fastapi.security.api_key import APIKeyHeader
+from starlette._utils import get_route_path
+from starlette.types import ASGIApp, Receive, Scope, Send
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 # ========== 内部模块导入 ==========
 from app.core.config import Config
 from app.core.logger import log
+from app.core.error_handler import ErrorResponse
+from app.exceptions import RateLimitExceededError
 
 
 # ==========================================
@@ -36,6 +43,8 @@ from app.core.logger import log
 # 动态选择限流存储后端
 # - 如果配置了 redis_url，使用 Redis (支持分布式)
 # - 否则使用内存 (单机模式)
+# 注意: 请求路径上的限流由下方 token_bucket 通过 redis.asyncio 完成；
+#       slowapi 的同步存储只在显式使用 limiter 装饰器时才会访问
 storage_uri = Config.redis_url if Config.redis_url else "memory://"
 
 limiter = Limiter(
@@ -51,6 +60,159 @@ else:
     log.info(f"🚦 限流器: 内存模式 (规则: {Config.rate_limit})")
 
 
+# ==========================================
+# 🪣 令牌桶限流
+# ==========================================
+
+# 令牌桶 Lua 脚本 (在 Redis 内原子执行，多 worker / 多实例共享同一限额)
+# KEYS[1]: 桶键  ARGV: 容量, 每秒补充令牌数, 键过期时间 (秒)
+# 时间取自 Redis 服务器 (TIME)，各实例时钟不一致也不会多发令牌
+# 返回 1 表示放行，0 表示拒绝
+_TOKEN_BUCKET_LUA = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens')) or capacity
+local last = tonumber(redis.call('HGET', KEYS[1], 'ts')) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+if tokens < 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+# Redis 连接池上限与超时 (秒): Redis 卡顿时快速失败并退化为进程内令牌桶，
+# 而不是让请求排队等待连接
+_REDIS_MAX_CONNECTIONS = 64
+_REDIS_TIMEOUT = 1.0
+
+# Redis 调用失败后的冷却时间 (秒): 期间直接使用进程内令牌桶，
+# 避免故障时每个请求都等待超时并刷屏告警
+_REDIS_COOLDOWN = 30.0
+
+# 冷却截止时间 (time.monotonic)，0 表示 Redis 可用
+_redis_down_until = 0.0
+
+# Redis 客户端与脚本 (首次使用时创建，共享同一个有界异步连接池)
+_redis_client: aioredis.Redis | None = None
+_redis_script = None
+
+# 进程内令牌桶: 键 -> [剩余令牌, 上次时间]
+# 空闲超过 1 小时的桶自动淘汰 (届时早已补满)
+_local_buckets: TTLCache = TTLCache(maxsize=65536, ttl=3600)
+
+
+def _get_redis_script():
+    """获取 (必要时创建) Redis 令牌桶脚本"""
+    global _redis_client, _redis_script
+    if _redis_script is None:
+        pool = aioredis.ConnectionPool.from_url(
+            Config.redis_url,
+            max_connections=_REDIS_MAX_CONNECTIONS,
+            socket_connect_timeout=_REDIS_TIMEOUT,
+            socket_timeout=_REDIS_TIMEOUT,
+        )
+        _redis_client = aioredis.Redis(connection_pool=pool)
+        _redis_script = _redis_client.register_script(_TOKEN_BUCKET_LUA)
+    return _redis_script
+
+
+async def close_redis() -> None:
+    """🛑 关闭令牌桶使用的 Redis 连接池 (应用关闭时调用)"""
+    global _redis_client, _redis_script
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        await _redis_client.connection_pool.disconnect()
+        _redis_client = None
+        _redis_script = None
+
+
+def _take_local(key: str, capacity: int, rate: float, now: float) -> bool:
+    """进程内令牌桶取令牌 (事件循环单线程，读改写之间无 await，无需加锁)"""
+    bucket = _local_buckets.get(key)
+    if bucket is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, bucket[0] + max(0.0, now - bucket[1]) * rate)
+    if tokens < 1:
+        return False
+    _local_buckets[key] = [tokens - 1, now]
+    return True
+
+
+async def _take_redis(key: str, capacity: int, rate: float, window: int) -> bool | None:
+    """
+    在 Redis 中取令牌
+
+    Returns:
+        bool | None: 是否放行；Redis 冷却中或调用失败时返回 None (由调用方退化为进程内令牌桶)
+
+    注意:
+        - 失败后 _REDIS_COOLDOWN 秒内不再访问 Redis，每个冷却窗口只告警一次
+    """
+    global _redis_down_until
+    if _redis_down_until:
+        if time.monotonic() < _redis_down_until:
+            return None
+    try:
+        allowed = bool(await _get_redis_script()(keys=[key], args=[capacity, rate, window]))
+    except Exception as e:
+        _redis_down_until = time.monotonic() + _REDIS_COOLDOWN
+        log.warning(f"🚦 Redis 限流失败，{_REDIS_COOLDOWN:.0f}s 内使用进程内令牌桶: {e}")
+        return None
+    if _redis_down_until:
+        _redis_down_until = 0.0
+        log.info("🚦 Redis 限流已恢复")
+    return allowed
+
+
+def token_bucket(scope: str):
+    """
+    🪣 令牌桶限流依赖
+
+    Args:
+        scope: 限流作用域 (如 "upload", "download")，不同作用域独立计数
+
+    Returns:
+        Callable: FastAPI 依赖函数，超限时抛出 429
+
+    使用示例:
+        ```python
+        @router.post("/upload", dependencies=[Depends(token_bucket("upload"))])
+        ```
+
+    注意:
+        - 按客户端 IP 限流，规则取自 RATE_LIMIT (支持热重载)
+        - 配置了 REDIS_URL 时在 Redis 中执行，集群范围内限额一致
+        - Redis 调用失败时退化为进程内令牌桶，不因限流故障拒绝服务；
+          失败后冷却 _REDIS_COOLDOWN 秒再重试 Redis
+    """
+
+    async def _dependency(request: Request) -> None:
+        # 规则在配置加载时已解析为 (容量, 窗口秒数)
+        capacity, window = Config.RATE_LIMIT_PARSED
+        rate = capacity / window
+        key = f"tb:{scope}:{get_remote_address(request)}"
+        now = time.time()
+
+        allowed = None
+        if Config.redis_url:
+            allowed = await _take_redis(key, capacity, rate, window)
+        if allowed is None:
+            allowed = _take_local(key, capacity, rate, now)
+
+        if not allowed:
+            raise RateLimitExceededError(Config.rate_limit)
+
+    return _dependency
+
+
 # ==========================================
 # 🔑 API Key 鉴权
 # ==========================================
@@ -81,6 +243,8 @@ async def verify_api_key(api_key: str = Security(api_key_header)) -> bool:
         - auto_error=False 使得无 API Key 时不自动报错
         - 我们手动判断是否需要鉴权
         - 使用 hmac.compare_digest 防止时序攻击
+        - 按字节比较: str 参数含非 ASCII 字符时 compare_digest 会抛 TypeError (变成 500)
+        - 鉴权开关和密钥每次从 Config 读取 (槽位读取)，热重载后立即生效
     """
 
     # ========== 检查鉴权开关 ==========
@@ -99,7 +263,7 @@ async def verify_api_key(api_key: str = Security(api_key_header)) -> bool:
 
     # ========== 使用常量时间比较（防止时序攻击） ==========
     # hmac.compare_digest 以恒定时间比较字符串，不会因字符串内容不同而暴露时间差异
-    if hmac.compare_digest(api_key, Config.api_key):
+    if hmac.compare_digest(api_key.encode(), Config.api_key.encode()):
         # API Key 匹配，验证通过
         return True
 
@@ -113,11 +277,64 @@ async def verify_api_key(api_key: str = Security(api_key_header)) -> bool:
     )
 
 
+class APIKeyMiddleware:
+    """
+    🔑 API Key 鉴权中间件 (纯 ASGI)
+
+    对受保护路径直接扫描原始请求头 (bytes) 并以恒定时间比较，
+    鉴权失败时直接返回 401，不进入路由和依赖注入
+
+    与 verify_api_key 规则一致:
+        - AUTH_ENABLED=False 时直接放行 (每次请求读取，热重载后立即生效)
+        - 缺少或不匹配 x-api-key 时返回 401
+
+    使用示例:
+        ```python
+        app.add_middleware(APIKeyMiddleware, paths=("/upload",))
+        ```
+    """
+
+    def __init__(self, app: ASGIApp, paths: tuple[str, ...] = ("/upload",)):
+        """
+        Args:
+            app: 下游 ASGI 应用
+            paths: 需要鉴权的路径
+        """
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 按路由路径匹配 (去掉 root_path 前缀)，与路由器看到的路径一致，
+        # 否则反向代理前缀下的 /api/upload 会绕过鉴权
+        if scope["type"] != "http" or get_route_path(scope) not in self.paths or not Config.auth_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        api_key = next((value for name, value in scope["headers"] if name == b"x-api-key"), None)
+
+        if api_key is None:
+            log.warning("⛔ 鉴权失败: 未提供 API Key")
+            message = "⛔ 未提供 API Key"
+        elif hmac.compare_digest(api_key, Config.api_key.encode()):
+            await self.app(scope, receive, send)
+            return
+        else:
+            log.warning("⛔ 鉴权失败: API Key 不匹配")
+            message = "⛔ API Key 无效"
+
+        response = ErrorResponse.create("HTTP_ERROR", message, status_code=401)
+        response.headers["WWW-Authenticate"] = "ApiKey"
+        await response(scope, receive, send)
+
+
 # ==========================================
 # 📤 导出对象
 # ==========================================
 
 __all__ = [
     "limiter",          # 限流器实例
+    "token_bucket",     # 令牌桶限流依赖
+    "close_redis",      # 关闭 Redis 连接池
     "verify_api_key",   # API Key 验证函数
+    "APIKeyMiddleware", # API Key 鉴权中间件
 ]
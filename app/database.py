@@ -6,7 +6,7 @@
 模块功能:
     - 异步 SQLite 数据库连接管理
     - 表结构初始化
-    - 数据库连接池 (通过 aiosqlite)
+    - 数据库连接池 (复用 aiosqlite 连接，PRAGMA 仅在建连时设置一次)
     - 自动迁移: 兼容旧数据库，自动添加 hash_algorithm 字段
 数据表:
     - files: 文件元数据表 (id, file_hash, hash_algorithm, filename, local_path, oss_path, expire_at, created_at)
@@ -16,10 +16,11 @@
 
 """
 
+import asyncio
 import aiosqlite
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Iterable
 
 # ========== 内部模块导入 ==========
 from app.core.config import Config
@@ -30,30 +31,55 @@ from app.core.logger import log
 # 🏊 数据库连接池
 # ==========================================
 
+# 连接级 PRAGMA (每个连接建立时执行一次)
+_CONNECTION_PRAGMAS = """
+PRAGMA journal_mode=WAL;        -- WAL 模式: 读写互不阻塞
+PRAGMA synchronous=NORMAL;      -- WAL 下只在检查点 fsync，提交不再逐次刷盘 (断电最多丢失最近的提交，不会损坏数据库)
+PRAGMA temp_store=MEMORY;       -- 排序 / 临时表放在内存
+PRAGMA mmap_size=268435456;     -- 256MB 内存映射读取，减少 read() 系统调用
+PRAGMA cache_size=-65536;       -- 页缓存 64MB (负数表示 KiB)
+"""
+
 class DatabasePool:
     """
     🏊 简单的数据库连接池
 
     复用数据库连接，减少创建/销毁开销
+
+    空闲连接放在 asyncio.Queue 中: 连接全部借出时 acquire 排队等待归还，
+    而不是对空列表 pop() 抛出 IndexError
     """
 
     def __init__(self, db_path: str, pool_size: int = 5):
         self.db_path = db_path
         self.pool_size = pool_size
-        self._connections: list[aiosqlite.Connection] = []
+        self._queue: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue(maxsize=pool_size)
+        self._init_lock = asyncio.Lock()
         self._initialized = False
 
+    async def _connect(self) -> aiosqlite.Connection:
+        """
+        创建一个新连接并应用连接级 PRAGMA
+
+        PRAGMA 只在建连时执行一次，之后复用连接不再重复设置
+        """
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        # 一次 executescript 设置全部 PRAGMA (只切换一次后台线程)
+        await conn.executescript(_CONNECTION_PRAGMAS)
+        return conn
+
     async def initialize(self):
         """初始化连接池"""
-        if self._initialized:
-            return
+        async with self._init_lock:
+            # 并发的首次 acquire 只会有一个真正建连
+            if self._initialized:
+                return
 
-        for _ in range(self.pool_size):
-            conn = await aiosqlite.connect(self.db_path)
-            conn.row_factory = aiosqlite.Row
-            self._connections.append(conn)
+            for _ in range(self.pool_size):
+                self._queue.put_nowait(await self._connect())
 
-        self._initialized = True
+            self._initialized = True
         log.info(f"🗄️ 数据库连接池已初始化（大小: {self.pool_size}）")
 
     @asynccontextmanager
@@ -63,21 +89,28 @@ class DatabasePool:
 
         Yields:
             aiosqlite.Connection: 数据库连接
+
+        注意:
+            - 没有空闲连接时等待其他使用者归还 (天然限流)
         """
         if not self._initialized:
             await self.initialize()
 
-        conn = self._connections.pop()
+        conn = await self._queue.get()
         try:
             yield conn
         finally:
-            self._connections.append(conn)
+            try:
+                # 归还前回滚未提交的事务，避免脏状态污染下一个使用者
+                if conn.in_transaction:
+                    await conn.rollback()
+            finally:
+                self._queue.put_nowait(conn)
 
     async def close_all(self):
-        """关闭所有连接"""
-        for conn in self._connections:
-            await conn.close()
-        self._connections.clear()
+        """关闭所有空闲连接"""
+        while not self._queue.empty():
+            await self._queue.get_nowait().close()
         self._initialized = False
         log.info("🗄️ 数据库连接池已关闭")
 
@@ -98,41 +131,107 @@ def get_db_pool() -> DatabasePool:
 # 🔗 数据库连接
 # ==========================================
 
-async def get_db_connection() -> aiosqlite.Connection:
+@asynccontextmanager
+async def get_db_connection() -> AsyncGenerator[aiosqlite.Connection, None]:
     """
     🔗 获取异步数据库连接
 
-    创建一个新的数据库连接，使用 Row 模式返回结果
+    从全局连接池借出一个连接，使用 Row 模式返回结果
 
-    Returns:
+    Yields:
         aiosqlite.Connection: SQLite 异步连接对象
 
     注意:
-        - 每次调用创建新连接 (aiosqlite 内部有连接池)
-        - 使用完毕后需要手动关闭连接
-        - 建议使用 async with 语法自动管理
+        - 必须使用 async with 语法，退出时连接自动归还连接池
+        - 不要手动关闭连接
+        - 未提交的事务在归还时自动回滚
+
+    使用示例:
+        ```python
+        async with get_db_connection() as conn:
+            cursor = await conn.execute("SELECT 1")
+        ```
     """
-    conn = await aiosqlite.connect(Config.DB_FILE)
-    # 设置 Row 工厂，可以通过列名访问
-    conn.row_factory = aiosqlite.Row
-    return conn
+    async with get_db_pool().acquire() as conn:
+        yield conn
+
+
+async def fetch_one(
+    conn: aiosqlite.Connection, sql: str, parameters: Iterable[Any] = ()
+) -> aiosqlite.Row | None:
+    """
+    🔎 执行查询并返回第一行
+
+    基于 execute_fetchall: 执行 + 取结果在 aiosqlite 后台线程中一次完成，
+    比 execute() 后再 fetchone() 少一次线程往返，游标也随之关闭
+
+    Args:
+        conn: 数据库连接
+        sql: SQL 语句 (应只返回少量行，如主键查询)
+        parameters: 查询参数
+
+    Returns:
+        aiosqlite.Row | None: 第一行，无结果时返回 None
+    """
+    rows = await conn.execute_fetchall(sql, parameters)
+    return rows[0] if rows else None
 
 
 # ==========================================
 # 🏗️ 数据库初始化
 # ==========================================
 
+# 数据库结构版本 (存于 PRAGMA user_version)
+# 1: files 表包含 hash_algorithm 字段
+# 2: 删除冗余的 idx_hash (idx_hash_unique 的首列即 file_hash，已覆盖按哈希查询)
+_SCHEMA_VERSION = 2
+
+# 迁移完成后执行的 DDL (全部幂等)，作为一个脚本只切换一次后台线程
+_INDEX_AND_STATS_DDL = """
+-- 哈希算法索引
+CREATE INDEX IF NOT EXISTS idx_hash_algorithm ON files (hash_algorithm);
+
+-- 哈希唯一索引 (防止并发重复；SQLite 中 UNIQUE INDEX 会自动处理并发插入冲突)
+-- 同时用于去重查询 (file_hash 为首列)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_hash_unique ON files (file_hash, hash_algorithm);
+
+-- 过期时间部分索引 (只收录有过期时间的文件，永久文件不占索引)
+-- 用于过期清理 (expire_at < ?) 与即将过期查询 (范围 + ORDER BY)
+CREATE INDEX IF NOT EXISTS idx_expire_at ON files (expire_at) WHERE expire_at IS NOT NULL;
+
+-- 统计表 (文件总数计数器)
+-- SQLite 的 count(*) 需要全表扫描，改为由触发器维护的单行计数器
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),  -- 固定单行
+    total_files INTEGER NOT NULL DEFAULT 0  -- 文件总数
+);
+CREATE TRIGGER IF NOT EXISTS trg_files_insert AFTER INSERT ON files
+BEGIN
+    UPDATE stats SET total_files = total_files + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_files_delete AFTER DELETE ON files
+BEGIN
+    UPDATE stats SET total_files = total_files - 1 WHERE id = 1;
+END;
+
+-- 启动时校准一次计数 (兼容旧数据库，也修正任何漂移)
+INSERT INTO stats (id, total_files) VALUES (1, (SELECT count(*) FROM files))
+ON CONFLICT(id) DO UPDATE SET total_files = excluded.total_files;
+"""
+
 async def init_db():
     """
     🚀 初始化数据库表结构
 
     创建所有必要的表和索引:
         - files 表: 存储文件元数据
-        - idx_hash 索引: 加速哈希查重
-        - idx_hash_unique 唯一索引: 防止并发重复插入
+        - idx_hash_unique 唯一索引: 加速哈希查重，防止并发重复插入
+        - idx_expire_at 部分索引: 过期清理只扫描已过期的记录
+        - stats 表 + 触发器: O(1) 获取文件总数
 
     注意:
         - 使用 IF NOT EXISTS 安全地创建表
+        - 迁移之后的 DDL 合并为一个 executescript (executescript 会先提交迁移)
         - 每次应用启动时调用，幂等操作
         - 初始化连接池
     """
@@ -140,17 +239,16 @@ async def init_db():
     log.info("🗄️ 正在初始化数据库...")
 
     # 初始化连接池
-    pool = get_db_pool()
-    await pool.initialize()
+    await get_db_pool().initialize()
 
     # 使用连接池获取连接
-    async with pool.acquire() as conn:
+    async with get_db_connection() as conn:
         # ========== 创建文件表 ==========
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS files (
                 id TEXT PRIMARY KEY,         -- 文件唯一 ID (8 位十六进制)
                 file_hash TEXT,              -- 内容哈希 (用于去重)
-                hash_algorithm TEXT DEFAULT 'md5',  -- 哈希算法 (blake2b 或 md5)
+                hash_algorithm TEXT DEFAULT 'md5',  -- 哈希算法 (blake3、blake2b 或 md5)
                 filename TEXT,               -- 原始文件名
                 local_path TEXT,             -- 本地存储路径
                 oss_path TEXT,               -- OSS 访问 URL (可选)
@@ -159,39 +257,34 @@ async def init_db():
             )
         """)
 
-        # ========== 迁移：添加 hash_algorithm 字段（兼容旧数据库）==========
-        # 检查字段是否已存在
-        cursor = await conn.execute("PRAGMA table_info(files)")
-        columns = await cursor.fetchall()
-        column_names = [col["name"] for col in columns]
-
-        if "hash_algorithm" not in column_names:
-            log.info("🔄 正在迁移数据库：添加 hash_algorithm 字段...")
-            await conn.execute("ALTER TABLE files ADD COLUMN hash_algorithm TEXT DEFAULT 'md5'")
-            # 为现有记录设置默认值
-            await conn.execute("UPDATE files SET hash_algorithm = 'md5' WHERE hash_algorithm IS NULL")
-            log.info("✅ 数据库迁移完成")
+        # ========== 迁移 (兼容旧数据库) ==========
+        # 用 user_version 记录已完成的迁移，迁移过的数据库启动时只读一个整数
+        (schema_version,) = await fetch_one(conn, "PRAGMA user_version")
+
+        if schema_version < 1:
+            # 添加 hash_algorithm 字段
+            # 旧版本创建的数据库可能已有该字段 (当时未记录 user_version)
+            columns = await conn.execute_fetchall("PRAGMA table_info(files)")
+            column_names = {col["name"] for col in columns}
+
+            if "hash_algorithm" not in column_names:
+                log.info("🔄 正在迁移数据库：添加 hash_algorithm 字段...")
+                await conn.execute("ALTER TABLE files ADD COLUMN hash_algorithm TEXT DEFAULT 'md5'")
+                # 为现有记录设置默认值
+                await conn.execute("UPDATE files SET hash_algorithm = 'md5' WHERE hash_algorithm IS NULL")
+                log.info("✅ 数据库迁移完成")
+
+        if schema_version < 2:
+            # 删除冗余索引 (每次写入少维护一棵 B 树)
+            await conn.execute("DROP INDEX IF EXISTS idx_hash")
+
+        if schema_version < _SCHEMA_VERSION:
+            await conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
         else:
-            log.info("ℹ️ hash_algorithm 字段已存在，跳过迁移")
+            log.info("ℹ️ 数据库结构已是最新，跳过迁移")
 
-        # ========== 创建哈希索引 (加速去重查询) ==========
-        await conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_hash
-            ON files (file_hash)
-        """)
-
-        # ========== 创建哈希算法索引 ==========
-        await conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_hash_algorithm
-            ON files (hash_algorithm)
-        """)
-
-        # ========== 创建哈希唯一索引 (防止并发重复) ==========
-        # 注意: SQLite 中 UNIQUE INDEX 会自动处理并发插入冲突
-        await conn.execute("""
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_hash_unique
-            ON files (file_hash, hash_algorithm)
-        """)
+        # ========== 索引 / 统计表 / 触发器 (一次 executescript 完成) ==========
+        await conn.executescript(_INDEX_AND_STATS_DDL)
 
         # 提交更改
         await conn.commit()
@@ -217,6 +310,7 @@ async def close_db():
 
 __all__ = [
     "get_db_connection",  # 获取数据库连接
+    "fetch_one",          # 查询并返回第一行
     "init_db",            # 初始化数据库
     "close_db",           # 关闭数据库连接池
     "get_db_pool",        # 获取连接池
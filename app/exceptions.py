@@ -337,7 +337,7 @@ class RateLimitExceededError(HTTPException):
 
     当请求频率超过限制时抛出
 
-    注意: 此异常由 slowapi 库自动处理，这里仅作类型定义
+    注意: 由令牌桶限流依赖 (security.token_bucket) 抛出
 
     Attributes:
         status_code: HTTP 状态码 (429 Too Many Requests)
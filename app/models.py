@@ -61,13 +61,16 @@ class TimeLimit(str, Enum):
         Returns:
             str: 有效期的中文描述
         """
-        labels = {
-            TimeLimit.ONE_DAY: "1 天",
-            TimeLimit.SEVEN_DAYS: "7 天",
-            TimeLimit.ONE_MONTH: "1 个月",
-            TimeLimit.PERMANENT: "永久"
-        }
-        return labels.get(self, "未知")
+        return _TIME_LIMIT_LABELS[self]
+
+
+# 有效期中文标签 (类定义后构建一次，label 只做一次字典查找)
+_TIME_LIMIT_LABELS: dict[TimeLimit, str] = {
+    TimeLimit.ONE_DAY: "1 天",
+    TimeLimit.SEVEN_DAYS: "7 天",
+    TimeLimit.ONE_MONTH: "1 个月",
+    TimeLimit.PERMANENT: "永久",
+}
 
 
 # ==========================================
@@ -162,10 +165,62 @@ class UploadResponse(BaseModel):
     )
 
 
+def make_upload_response(url: str, filename: str, expiry: str, is_duplicate: bool = False) -> dict:
+    """
+    📤 构建上传成功响应 (结构与 UploadResponse 一致)
+
+    上传接口直接序列化该字典，跳过 UploadResponse / FileData 的实例化和校验；
+    UploadResponse 仍在上传接口的 responses 中用于生成 API 文档
+
+    Args:
+        url: 文件访问 URL
+        filename: 原始文件名
+        expiry: 过期时间或 "永久"
+        is_duplicate: 是否为秒传
+
+    Returns:
+        dict: 统一响应格式字典
+    """
+    return {
+        "code": 200,
+        "msg": "✅ 上传成功",
+        "data": {"url": url, "filename": filename, "expiry": expiry, "is_duplicate": is_duplicate},
+    }
+
+
+# ==========================================
+# 🏥 健康检查模型
+# ==========================================
+
+class HealthResponse(BaseModel):
+    """健康检查响应"""
+
+    status: str = Field(..., description="整体状态 (🟢 健康 / 🟡 降级)")
+    version: str = Field(..., description="服务版本")
+    components: dict[str, str] = Field(..., description="各组件状态")
+
+
 # ==========================================
 # 📋 管理后台数据模型
 # ==========================================
 
+class ConfigStatus(BaseModel):
+    """功能开关状态"""
+
+    auth: bool = Field(..., description="是否开启鉴权")
+    encryption: bool = Field(..., description="是否开启加密")
+    compression: bool = Field(..., description="是否开启压缩")
+    oss: bool = Field(..., description="是否开启 OSS")
+    redis: bool = Field(..., description="是否配置 Redis")
+
+
+class SystemStats(BaseModel):
+    """系统统计"""
+
+    total_files: int = Field(..., description="文件总数")
+    config_status: ConfigStatus = Field(..., description="功能开关状态")
+
+
 class FileListItem(BaseModel):
     """文件列表项"""
 
@@ -247,6 +302,23 @@ class ExpiringData(BaseModel):
     files: List[ExpiringFile] = Field(..., description="即将过期的文件列表")
 
 
+class MetricsData(BaseModel):
+    """监控指标数据"""
+
+    requests: dict[str, Any] = Field(..., description="请求统计")
+    latency: dict[str, Any] = Field(..., description="延迟统计 (毫秒)")
+    errors: dict[str, Any] = Field(..., description="错误统计")
+    system: dict[str, Any] = Field(..., description="系统指标")
+
+
+class MetricsResponse(BaseModel):
+    """监控指标响应"""
+
+    code: int = Field(..., description="业务状态码")
+    msg: str = Field(..., description="提示信息")
+    data: MetricsData = Field(..., description="监控指标")
+
+
 # ==========================================
 # ⚙️ 配置管理模型
 # ==========================================
@@ -302,12 +374,17 @@ __all__ = [
     "TimeLimit",         # 文件有效期枚举
     "FileData",          # 文件信息响应体
     "UploadResponse",    # 统一 API 响应格式
+    "make_upload_response",  # 构建上传成功响应
+    "HealthResponse",    # 健康检查响应
+    "ConfigStatus",      # 功能开关状态
+    "SystemStats",       # 系统统计
     "FileListItem",      # 文件列表项
     "FileListResponse",  # 文件列表响应
     "FileDetail",        # 文件详情
     "StorageStats",      # 存储统计
     "TrendData",         # 趋势数据
     "ExpiringData",      # 即将过期数据
+    "MetricsResponse",   # 监控指标响应
     "ConfigItem",        # 配置项
     "ConfigCategory",    # 配置分类
     "ConfigListResponse",  # 配置列表响应
@@ -23,12 +23,15 @@
 
 # ========== 标准库导入 ==========
 import hashlib  # 哈希计算
-import gzip  # Gzip 压缩
+import os  # fork 钩子
 import secrets  # 安全随机数生成
+import threading  # 随机数池锁
 import datetime  # 时间处理
 import asyncio  # 异步任务
+import functools  # 装饰器工具
 import re  # 正则表达式
 import time  # 时间戳
+import zlib  # Gzip 压缩 / 流式解压
 import psutil  # 系统信息
 from pathlib import Path  # 路径操作
 
@@ -37,12 +40,27 @@ import anyio  # 异步文件操作
 import orjson  # 高性能 JSON 处理
 from fastapi import UploadFile, HTTPException
 from dataclasses import dataclass
-from typing import Any
-from cachetools import TTLCache  # TTL 缓存
+from typing import Any, AsyncIterator
+from cachetools import LRUCache, TTLCache  # LRU / TTL 缓存
+
+# ISA-L 加速的 DEFLATE (python-isal 为可选依赖，未安装时降级为标准库 zlib)
+# 输出与 zlib 完全兼容，仅支持 0-3 级压缩
+try:
+    from isal import isal_zlib as _deflate
+    _DEFLATE_MAX_LEVEL = 3
+except ImportError:
+    _deflate = zlib
+    _DEFLATE_MAX_LEVEL = 9
+
+# BLAKE3 哈希 (blake3 为可选依赖，SIMD 并行，大文件比 blake2b 快数倍)
+try:
+    from blake3 import blake3 as _blake3
+except ImportError:
+    _blake3 = None
 
 # ========== 内部模块导入 ==========
-from app.core.config import Config
-from app.database import get_db_connection
+from app.core.config import Config, ALLOWED_EXTENSIONS
+from app.database import get_db_connection, fetch_one
 from app.models import TimeLimit
 from app.core.logger import log
 from app.core.http_client import http_client
@@ -63,17 +81,21 @@ class JSONValidationConfig:
 
 def _validate_json_structure(obj: Any, depth: int = 0, config: JSONValidationConfig | None = None) -> None:
     """
-    递归验证 JSON 结构
+    验证 JSON 结构
 
     防止深度嵌套攻击和超大对象攻击
 
     Args:
         obj: 待验证的 JSON 对象
-        depth: 当前嵌套深度
+        depth: 起始嵌套深度
         config: 验证配置
 
     Raises:
         HTTPException: 验证失败时抛出
+
+    注意:
+        - 使用显式栈迭代遍历，避免每个节点一次 Python 函数调用
+        - 只有容器入栈；非空容器的子节点深度超限即判定过深
     """
     if config is None:
         config = JSONValidationConfig()
@@ -85,23 +107,35 @@ def _validate_json_structure(obj: Any, depth: int = 0, config: JSONValidationCon
             detail=f"📄 JSON 嵌套过深（最大 {config.max_depth} 层）"
         )
 
-    # 检查字段数量
-    if isinstance(obj, dict):
-        if len(obj) > config.max_fields:
-            raise HTTPException(
-                status_code=400,
-                detail=f"📄 JSON 字段过多（最大 {config.max_fields} 个）"
-            )
-        for value in obj.values():
-            _validate_json_structure(value, depth + 1, config)
-    elif isinstance(obj, list):
-        if len(obj) > config.max_fields:
+    stack = [(obj, depth)]
+    while stack:
+        node, level = stack.pop()
+
+        # 检查字段数量
+        if isinstance(node, dict):
+            if len(node) > config.max_fields:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"📄 JSON 字段过多（最大 {config.max_fields} 个）"
+                )
+            children = node.values()
+        elif isinstance(node, list):
+            if len(node) > config.max_fields:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"📄 JSON 数组过长（最大 {config.max_fields} 个元素）"
+                )
+            children = node
+        else:
+            continue
+
+        # 子节点 (包括标量) 位于 level + 1 层
+        if node and level + 1 > config.max_depth:
             raise HTTPException(
                 status_code=400,
-                detail=f"📄 JSON 数组过长（最大 {config.max_fields} 个元素）"
+                detail=f"📄 JSON 嵌套过深（最大 {config.max_depth} 层）"
             )
-        for item in obj:
-            _validate_json_structure(item, depth + 1, config)
+        stack.extend((child, level + 1) for child in children if isinstance(child, (dict, list)))
 
 
 # ==========================================
@@ -112,17 +146,88 @@ def _validate_json_structure(obj: Any, depth: int = 0, config: JSONValidationCon
 _metadata_cache: TTLCache = TTLCache(maxsize=2048, ttl=300)
 
 # 全局缓存：哈希查重结果（1分钟过期）
+# 文件哈希 -> (文件 ID, OSS 链接)，只缓存命中的结果；删除文件时按哈希清除
 _hash_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
 
+# 全局缓存：小文件解密结果（按字节数计容量，上限 8MB）
+# 存储文件不可变 (ID 随机生成、从不原地改写)，以文件 ID 为键无需校验内容
+_PLAINTEXT_CACHE_MAX_ITEM = 64 * 1024
+_plaintext_cache: LRUCache = LRUCache(maxsize=8 * 1024 * 1024, getsizeof=len)
+
+
+def ttl_cache(seconds: float):
+    """
+    ⏱️ 异步函数 TTL 缓存装饰器
+
+    以调用参数为键缓存结果，过期前直接返回缓存值
+
+    Args:
+        seconds: 缓存有效期 (秒)
+
+    使用示例:
+        ```python
+        @ttl_cache(seconds=10)
+        async def get_storage_stats() -> dict: ...
 
-def invalidate_file_cache(file_id: str) -> None:
+        get_storage_stats.cache_clear()  # 数据变化后手动失效
+        ```
+
+    注意:
+        - 同一键的并发刷新只执行一次 (single-flight)，其余请求等待同一结果
+        - 返回的是共享对象，调用方不得修改
+        - 仅用于参数取值有限的函数 (键不会自动淘汰)
+    """
+    def decorator(func):
+        # 键 -> (过期时间 monotonic, 结果)
+        entries: dict[tuple, tuple[float, Any]] = {}
+        locks: dict[tuple, asyncio.Lock] = {}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            entry = entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+
+            lock = locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                # 等锁期间可能已被其他请求刷新
+                entry = entries.get(key)
+                if entry and entry[0] > time.monotonic():
+                    return entry[1]
+                value = await func(*args, **kwargs)
+                entries[key] = (time.monotonic() + seconds, value)
+                return value
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+    return decorator
+
+
+# 管理后台统计接口的缓存时间 (秒)
+# 仪表盘每隔几秒轮询一次，同一窗口内只查询一次数据库
+_STATS_TTL = 10
+
+
+def invalidate_stats_cache() -> None:
+    """🗑️ 清除统计缓存 (删除/清理文件后调用)"""
+    get_storage_stats.cache_clear()
+    get_upload_trend.cache_clear()
+    get_expiring_files.cache_clear()
+
+
+def invalidate_file_cache(file_id: str, file_hash: str | None = None) -> None:
     """
     🗑️ 清除文件缓存
 
     Args:
         file_id: 文件 ID
+        file_hash: 文件哈希 (删除文件时传入，同时清除查重缓存)
     """
     _metadata_cache.pop(file_id, None)
+    _plaintext_cache.pop(file_id, None)
+    if file_hash:
+        _hash_cache.pop(file_hash, None)
 
 
 # ==========================================
@@ -143,10 +248,13 @@ def compress_data(data: bytes) -> bytes:
 
     注意:
         - 压缩等级由 COMPRESSION_LEVEL 控制 (1-9)
+        - 安装 isal 时使用 ISA-L 加速，4-9 级按 3 级处理
         - 典型 JSON 文件可压缩 60-80%
     """
     if Config.COMPRESSION_ENABLED:
-        return gzip.compress(data, compresslevel=Config.COMPRESSION_LEVEL)
+        # 直接生成 Gzip 格式 (wbits=31)，省去 gzip 模块拼接头尾的额外拷贝
+        level = min(Config.COMPRESSION_LEVEL, _DEFLATE_MAX_LEVEL)
+        return _deflate.compress(data, level, wbits=31)
     return data
 
 
@@ -168,28 +276,32 @@ def decompress_data(data: bytes) -> bytes:
     """
     # 检查是否为 Gzip 格式 (魔数检测)
     if Config.COMPRESSION_ENABLED and data.startswith(b'\x1f\x8b'):
-        return gzip.decompress(data)
+        return _deflate.decompress(data, wbits=31)
     return data
 
 
-def calculate_hash(content: bytes, use_blake2b: bool = True) -> tuple[str, str]:
+def calculate_hash(content: bytes, use_blake2b: bool = True, use_blake3: bool = False) -> tuple[str, str]:
     """
     🔐 计算数据哈希
 
-    使用 blake2b 或 MD5 算法计算内容的哈希值，用于文件去重
+    使用 blake3、blake2b 或 MD5 算法计算内容的哈希值，用于文件去重
 
     Args:
         content: 待计算的字节数据
         use_blake2b: 是否使用 blake2b（默认 True），False 则使用 MD5
+        use_blake3: 是否优先使用 blake3（需安装 blake3，未安装时忽略）
 
     Returns:
-        tuple[str, str]: (哈希值, 哈希算法标识 "blake2b" 或 "md5")
+        tuple[str, str]: (哈希值, 哈希算法标识 "blake3"、"blake2b" 或 "md5")
 
     注意:
-        - blake2b 比 MD5 更快且更安全
-        - digest_size=16 生成 128 位（32 位十六进制），与 MD5 长度相同
+        - blake2b 比 MD5 更快且更安全，blake3 在大文件上更快
+        - 统一输出 128 位（32 位十六进制），与 MD5 长度相同
         - 相同内容必然产生相同哈希，实现"秒传"功能
     """
+    if use_blake3 and _blake3 is not None:
+        # blake3 截取 16 字节，与 blake2b / MD5 长度一致
+        return _blake3(content).hexdigest(16), "blake3"
     if use_blake2b:
         # blake2b digest_size=16 生成 128 位（32 位十六进制），与 MD5 长度一致
         return hashlib.blake2b(content, digest_size=16).hexdigest(), "blake2b"
@@ -275,15 +387,143 @@ def calculate_expiry(limit: TimeLimit) -> datetime.datetime | None:
 # 📤 文件上传处理
 # ==========================================
 
+# 上传分块读取大小 (1 MiB)
+_UPLOAD_CHUNK_SIZE = 1 << 20
+
+# 超过此大小的内容在线程中计算哈希 (1 MiB；小文件线程调度开销大于哈希本身)
+_THREADED_HASH_THRESHOLD = 1 << 20
+
+
+def _file_too_large(size: int, limit: int) -> HTTPException:
+    """构造文件过大异常并记录日志"""
+    log.warning(f"📦 文件过大: {size} 字节，限制: {limit} 字节")
+    return HTTPException(
+        status_code=413,
+        detail=f"📦 文件过大，限制为 {limit} 字节"
+    )
+
+
+# 文件 ID 随机字节数 (8 位十六进制)
+_FILE_ID_BYTES = 4
+# 随机数池大小：一次系统调用可生成 1024 个文件 ID
+_RANDOM_POOL_SIZE = 4096
+
+_random_pool = b""
+_random_pos = 0
+_random_lock = threading.Lock()
+
+
+def _new_file_id() -> str:
+    """
+    🎲 生成文件 ID
+
+    从批量预取的安全随机数池中切片，摊薄每次上传的 getrandom 系统调用
+
+    Returns:
+        str: 8 位十六进制文件 ID (熵与 secrets.token_hex(4) 相同)
+    """
+    global _random_pool, _random_pos
+    with _random_lock:
+        if _random_pos + _FILE_ID_BYTES > len(_random_pool):
+            _random_pool = secrets.token_bytes(_RANDOM_POOL_SIZE)
+            _random_pos = 0
+        start = _random_pos
+        _random_pos += _FILE_ID_BYTES
+        return _random_pool[start:_random_pos].hex()
+
+
+def _reset_random_pool() -> None:
+    """fork 后清空随机数池，避免多个 worker 进程生成相同的 ID"""
+    global _random_pool, _random_pos
+    _random_pool = b""
+    _random_pos = 0
+
+
+os.register_at_fork(after_in_child=_reset_random_pool)
+
+
+async def _read_upload(file: UploadFile, limit: int) -> bytearray:
+    """
+    📥 分块读取上传文件
+
+    Args:
+        file: 上传的文件对象 (Starlette 已将大文件落盘到临时文件)
+        limit: 最大允许字节数
+
+    Returns:
+        bytearray: 文件内容 (orjson 可直接解析，无需再拷贝为 bytes)
+
+    Raises:
+        HTTPException: 超过大小限制时抛出 413
+
+    注意:
+        - 已知大小时直接拒绝，不读取内容
+        - 否则按 1 MiB 分块读取，超限立即中止，不会把超大文件整体读入内存
+    """
+    if file.size is not None and file.size > limit:
+        raise _file_too_large(file.size, limit)
+
+    buffer = bytearray()
+    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > limit:
+            raise _file_too_large(len(buffer), limit)
+    return buffer
+
+
+def _compress_and_encrypt(data: bytes) -> tuple[bytes, bytes]:
+    """
+    压缩并加密 (同步，在线程中执行)
+
+    Returns:
+        tuple[bytes, bytes]: (压缩后数据, 最终存储数据)
+    """
+    processed = compress_data(data)
+    return processed, CryptoEngine.encrypt(processed)
+
+
+async def _write_local_file(local_path: Path, content: bytes) -> None:
+    """写入本地存储 (打开/写入/关闭放在同一次线程调度中完成，anyio.open_file 需要三次)"""
+    await asyncio.to_thread(local_path.write_bytes, content)
+
+
+async def _upload_to_oss(save_filename: str, content: bytes) -> str | None:
+    """
+    ☁️ 上传文件到 OSS (未启用时跳过)，失败只记录日志
+
+    Args:
+        save_filename: 存储文件名
+        content: 文件内容
+
+    Returns:
+        str | None: OSS 链接，未启用或失败时返回 None
+    """
+    if not Config.ENABLE_OSS:
+        return None
+    from app.core.oss_client import OSSClient
+    try:
+        oss_url = await OSSClient.upload(save_filename, content)
+        log.info(f"☁️ OSS 上传成功: {oss_url}")
+        return oss_url
+    except Exception as e:
+        # OSS 上传失败不影响主流程，仍使用本地存储
+        log.error(f"☁️ OSS 上传失败: {e}")
+        return None
+
+
+# 正在处理中的上传: 文件哈希 -> 返回链接 Future (失败时为 None)
+_inflight_uploads: dict[str, asyncio.Future] = {}
+
+
 async def process_file_upload(file: UploadFile, time_limit: TimeLimit):
     """
     📤 处理文件上传
 
     完整的上传处理流程:
-        1. 文件大小检查
-        2. 后缀名校验
-        3. 读取并标准化 JSON
-        4. 哈希查重 (秒传)
+        1. 后缀名校验
+        2. 分块读取 (超限立即中止)
+        3. 校验并标准化 JSON
+        4. 哈希查重 (秒传，并发的相同上传合并为一次)
         5. 数据压缩 (可选)
         6. 数据加密 (可选)
         7. 本地存储
@@ -301,29 +541,20 @@ async def process_file_upload(file: UploadFile, time_limit: TimeLimit):
         HTTPException: 文件过大、格式错误等异常
     """
 
-    # ========== 1. 文件大小检查 ==========
-    # 读取文件内容到内存 (小文件场景)
-    raw_content = await file.read()
-
-    file_size = len(raw_content)
-    if file_size > Config.MAX_FILE_SIZE:
-        log.warning(f"📦 文件过大: {file_size} 字节，限制: {Config.MAX_FILE_SIZE} 字节")
-        raise HTTPException(
-            status_code=413,
-            detail=f"📦 文件过大，限制为 {Config.MAX_FILE_SIZE} 字节"
-        )
-
-    log.info(f"📦 接收文件: {file.filename} ({file_size} 字节)")
-
-    # ========== 2. 后缀名校验 ==========
+    # ========== 1. 后缀名校验 ==========
+    # 不读取任何内容即可拒绝
     ext = Path(file.filename).suffix.lower()
-    if ext not in Config.ALLOWED_EXTENSIONS:
+    if ext not in ALLOWED_EXTENSIONS:
         log.warning(f"🚫 不允许的文件类型: {ext}")
         raise HTTPException(
             status_code=400,
-            detail=f"🚫 不允许的文件类型，仅支持: {', '.join(Config.ALLOWED_EXTENSIONS)}"
+            detail=f"🚫 不允许的文件类型，仅支持: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
         )
 
+    # ========== 2. 分块读取 + 文件大小检查 ==========
+    raw_content = await _read_upload(file, Config.MAX_FILE_SIZE)
+    log.info(f"📦 接收文件: {file.filename} ({len(raw_content)} 字节)")
+
     # ========== 3. JSON 校验并标准化 ==========
     try:
         minified_content = validate_and_minify(raw_content)
@@ -332,28 +563,77 @@ async def process_file_upload(file: UploadFile, time_limit: TimeLimit):
         raise
 
     # ========== 4. 哈希查重 ==========
-    file_hash, hash_algorithm = calculate_hash(minified_content, use_blake2b=True)
+    # 大文件放到线程中计算 (hashlib/blake3 计算时释放 GIL)，不阻塞事件循环
+    if len(minified_content) >= _THREADED_HASH_THRESHOLD:
+        file_hash, hash_algorithm = await asyncio.to_thread(
+            calculate_hash, minified_content, use_blake2b=True, use_blake3=True
+        )
+    else:
+        file_hash, hash_algorithm = calculate_hash(minified_content, use_blake2b=True, use_blake3=True)
+
+    # 4.1 合并并发的相同上传：同一哈希正在处理时等待其结果，不重复存储/上传 OSS
+    while (pending := _inflight_uploads.get(file_hash)) is not None:
+        return_url = await asyncio.shield(pending)
+        if return_url:
+            log.info(f"✨ 相同文件正在上传，合并为秒传: {file_hash}")
+            return {
+                "url": return_url,
+                "filename": file.filename,
+                "is_duplicate": True,
+                "expiry": "永久"
+            }
+
+    # 查重前登记 (中间无 await，不会有两个请求同时登记)
+    future = asyncio.get_running_loop().create_future()
+    _inflight_uploads[file_hash] = future
+    try:
+        result = await _store_upload(file, ext, minified_content, file_hash, hash_algorithm, time_limit)
+        future.set_result(result["url"])
+        return result
+    finally:
+        # 失败时返回 None，等待者各自重新处理
+        if not future.done():
+            future.set_result(None)
+        _inflight_uploads.pop(file_hash, None)
+
+
+async def _store_upload(
+    file: UploadFile,
+    ext: str,
+    minified_content: bytes,
+    file_hash: str,
+    hash_algorithm: str,
+    time_limit: TimeLimit,
+) -> dict:
+    """
+    💾 查重并存储新文件 (process_file_upload 的第 4~9 步)
 
-    conn = await get_db_connection()
-    # 查询是否存在相同哈希的文件（同时支持 blake2b 和 md5）
-    cursor = await conn.execute("""
-        SELECT id, oss_path FROM files
-        WHERE (file_hash = ? AND hash_algorithm = 'blake2b')
-           OR (file_hash = ? AND hash_algorithm = 'md5')
-    """, (file_hash, file_hash))
-    existing = await cursor.fetchone()
+    Returns:
+        dict: 包含 url, filename, expiry, is_duplicate 的响应字典
+    """
+    # 先查查重缓存，热点文件反复上传时免去数据库往返
+    existing = _hash_cache.get(file_hash)
+    if existing is None:
+        async with get_db_connection() as conn:
+            # 查询是否存在相同哈希的文件（按算法区分，命中唯一索引）
+            row = await fetch_one(conn, """
+                SELECT id, oss_path FROM files
+                WHERE file_hash = ? AND hash_algorithm = ?
+            """, (file_hash, hash_algorithm))
+        if row:
+            existing = _hash_cache[file_hash] = (row['id'], row['oss_path'])
 
     if existing:
+        existing_id, existing_oss_path = existing
         # 命中缓存，直接返回现有链接 (秒传)
         log.info(f"✨ 检测到重复文件，使用秒传: {file_hash}")
-        await conn.close()
 
         # 加密/压缩模式下统一返回 API 链接
         if Config.ENCRYPTION_ENABLED or Config.COMPRESSION_ENABLED:
-            return_url = f"{Config.HOST_DOMAIN}/f/{existing['id']}"
+            return_url = f"{Config.HOST_DOMAIN}/f/{existing_id}"
         else:
             # 明文模式优先返回 OSS 链接
-            return_url = existing['oss_path'] if existing['oss_path'] else f"{Config.HOST_DOMAIN}/f/{existing['id']}"
+            return_url = existing_oss_path if existing_oss_path else f"{Config.HOST_DOMAIN}/f/{existing_id}"
 
         return {
             "url": return_url,
@@ -363,18 +643,18 @@ async def process_file_upload(file: UploadFile, time_limit: TimeLimit):
         }
 
     # ========== 5. 数据处理 (压缩 -> 加密) ==========
-    # 5.1 压缩 (可选)
-    processed_content = compress_data(minified_content)
+    # 压缩/加密是 CPU 密集操作，放到线程中执行 (zlib 与 cryptography 计算时释放 GIL)
+    if Config.COMPRESSION_ENABLED or Config.ENCRYPTION_ENABLED:
+        processed_content, final_content = await asyncio.to_thread(_compress_and_encrypt, minified_content)
+    else:
+        processed_content = final_content = minified_content
     if Config.COMPRESSION_ENABLED:
         compression_ratio = len(processed_content) / len(minified_content)
         log.info(f"🗜️ 压缩完成: 压缩率 {compression_ratio:.1%}")
 
-    # 5.2 加密 (可选)
-    final_content = CryptoEngine.encrypt(processed_content)
-
     # ========== 6. 文件存储 ==========
     # 生成唯一的文件 ID (8 位十六进制，使用安全的随机数)
-    file_id = secrets.token_hex(4)
+    file_id = _new_file_id()
 
     # 确定存储文件名
     # 加密/压缩模式下使用 .bin 后缀，避免误导
@@ -383,26 +663,23 @@ async def process_file_upload(file: UploadFile, time_limit: TimeLimit):
     else:
         save_filename = f"{file_id}{ext}"
 
-    # 6.1 本地存储
+    # 6.1 本地存储 + 6.2 OSS 存储 (可选)
+    # 加密/压缩模式返回的是 API 链接，OSS 只是副本，元数据落库后交给后台队列异步上传；
+    # 明文模式要直接返回 OSS 链接，与本地写入并发完成
     local_path = Path(Config.UPLOAD_DIR) / save_filename
-    async with await anyio.open_file(str(local_path), 'wb') as f:
-        await f.write(final_content)
-    log.info(f"💾 本地存储完成: {save_filename}")
-
-    # 6.2 OSS 存储 (可选)
     oss_url = None
-    if Config.ENABLE_OSS:
-        # 使用 OSS 客户端上传
-        from app.core.oss_client import OSSClient
-        try:
-            oss_url = await OSSClient.upload(save_filename, final_content)
-            log.info(f"☁️ OSS 上传成功: {oss_url}")
-        except Exception as e:
-            log.error(f"☁️ OSS 上传失败: {e}")
-            # OSS 上传失败不影响主流程，仍使用本地存储
+    via_api = Config.ENCRYPTION_ENABLED or Config.COMPRESSION_ENABLED
+    if Config.ENABLE_OSS and not via_api:
+        _, oss_url = await asyncio.gather(
+            _write_local_file(local_path, final_content),
+            _upload_to_oss(save_filename, final_content),
+        )
+    else:
+        await _write_local_file(local_path, final_content)
+    log.info(f"💾 本地存储完成: {save_filename}")
 
     # ========== 7. 生成返回链接 ==========
-    if Config.ENCRYPTION_ENABLED or Config.COMPRESSION_ENABLED:
+    if via_api:
         # 加密/压缩模式必须走 API 解密
         return_url = f"{Config.HOST_DOMAIN}/f/{file_id}"
     else:
@@ -413,16 +690,20 @@ async def process_file_upload(file: UploadFile, time_limit: TimeLimit):
     expire_at = calculate_expiry(time_limit)
 
     try:
-        await conn.execute("""
-            INSERT INTO files (id, file_hash, hash_algorithm, filename, local_path, oss_path, expire_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (file_id, file_hash, hash_algorithm, file.filename, save_filename, oss_url, expire_at))
-        await conn.commit()
+        async with get_db_connection() as conn:
+            await conn.execute("""
+                INSERT INTO files (id, file_hash, hash_algorithm, filename, local_path, oss_path, expire_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (file_id, file_hash, hash_algorithm, file.filename, save_filename, oss_url, expire_at))
+            await conn.commit()
     except Exception as e:
         log.error(f"💥 数据库写入失败: {e}")
         raise e
-    finally:
-        await conn.close()
+    _hash_cache[file_hash] = (file_id, oss_url)
+
+    # 元数据落库后再入队，保证后台回写 oss_path 时记录已存在
+    if Config.ENABLE_OSS and via_api:
+        await submit_oss_upload(file_id, save_filename, final_content)
 
     log.info(f"✅ 上传成功: {file_id} -> {return_url}")
 
@@ -438,77 +719,189 @@ async def process_file_upload(file: UploadFile, time_limit: TimeLimit):
 # 📥 文件读取处理
 # ==========================================
 
-async def retrieve_file_content(file_id: str):
+# 下载流式读取/解压的分块大小 (64 KiB)
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class StoredFile:
+    """
+    📦 已存储文件的读取结果
+
+    二选一:
+        - path: 磁盘内容即原始 JSON，可直接整文件发送 (sendfile)
+        - chunks: 需要解密/解压，按块产出原始 JSON
+    """
+    filename: str                                 # 原始文件名
+    path: Path | None = None                      # 可直接发送的本地文件
+    chunks: AsyncIterator[bytes] | None = None    # 逆向处理后的内容分块
+
+    async def read(self) -> bytes:
+        """一次性读取全部内容 (仅用于管理后台等需要完整内容的场景)"""
+        if self.path is not None:
+            async with await anyio.open_file(str(self.path), 'rb') as f:
+                return await f.read()
+        return b"".join([chunk async for chunk in self.chunks])
+
+
+async def _iter_file_blocks(path: Path) -> AsyncIterator[bytes]:
+    """按固定大小分块读取本地文件"""
+    async with await anyio.open_file(str(path), 'rb') as f:
+        while block := await f.read(_STREAM_CHUNK_SIZE):
+            yield block
+
+
+async def _iter_buffer(data: bytes) -> AsyncIterator[bytes]:
+    """把内存中的数据包装成异步分块"""
+    yield data
+
+
+async def _gunzip_stream(blocks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    🗜️ 流式 Gzip 解压
+
+    每次产出不超过 _STREAM_CHUNK_SIZE 的解压数据，内存占用与文件大小无关
+
+    Raises:
+        zlib.error: 数据损坏
+        EOFError: 数据被截断
+    """
+    decompressor = zlib.decompressobj(wbits=31)  # 31 = Gzip 头
+    async for block in blocks:
+        data = block
+        while data:
+            out = decompressor.decompress(data, _STREAM_CHUNK_SIZE)
+            if out:
+                yield out
+            data = decompressor.unconsumed_tail
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+    if not decompressor.eof:
+        raise EOFError("Gzip 数据不完整")
+
+
+async def _with_first(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """把预读的首块重新拼回分块流"""
+    if first:
+        yield first
+    async for chunk in rest:
+        yield chunk
+
+
+async def get_file_metadata(file_id: str) -> dict | None:
+    """
+    🔎 获取文件元数据 (带缓存)
+
+    Args:
+        file_id: 文件的唯一 ID
+
+    Returns:
+        dict | None: {"local_path", "filename", "file_hash"}，不存在时返回 None
+
+    注意:
+        - file_hash 为原始 JSON 的内容哈希，可直接作为强 ETag
+        - 旧数据可能没有 file_hash (为 None)
+    """
+    # 先检查缓存
+    cached_metadata = _metadata_cache.get(file_id)
+    if cached_metadata:
+        return cached_metadata
+
+    async with get_db_connection() as conn:
+        row = await fetch_one(
+            conn,
+            "SELECT local_path, filename, file_hash FROM files WHERE id = ?",
+            (file_id,)
+        )
+
+    if not row:
+        # 文件不存在
+        log.warning(f"🔍 文件不存在: {file_id}")
+        return None
+
+    metadata = {
+        "local_path": row['local_path'],
+        "filename": row['filename'],
+        "file_hash": row['file_hash'],
+    }
+    # 写入缓存
+    _metadata_cache[file_id] = metadata
+    return metadata
+
+
+async def retrieve_file_content(file_id: str) -> StoredFile | None:
     """
     📥 获取文件内容
 
     完整的读取处理流程:
         1. 查询数据库获取文件路径
-        2. 读取本地文件
-        3. 解密 (如果加密)
-        4. 解压 (如果压缩)
-        5. 返回原始 JSON
+        2. 无需逆向处理时直接返回文件路径
+        3. 解密 (如果加密，Fernet 需要完整密文)
+        4. 流式解压 (如果压缩)
 
     Args:
         file_id: 文件的唯一 ID
 
     Returns:
-        tuple: (文件内容 bytes, 原始文件名 str)，不存在时返回 (None, None)
+        StoredFile | None: 文件读取结果，不存在时返回 None
 
     Raises:
         HTTPException: 文件损坏、解密失败等异常
+
+    注意:
+        - 解压流的首块在返回前预读，头部损坏仍会得到 500 而不是中断的响应
     """
 
     # ========== 1. 查询文件元数据 ==========
-    # 先检查缓存
-    cached_metadata = _metadata_cache.get(file_id)
-    if cached_metadata:
-        local_path = Path(Config.UPLOAD_DIR) / cached_metadata["local_path"]
-        original_name = cached_metadata["filename"]
-    else:
-        conn = await get_db_connection()
-        cursor = await conn.execute("SELECT local_path, filename FROM files WHERE id = ?", (file_id,))
-        row = await cursor.fetchone()
-        await conn.close()
-
-        if not row:
-            # 文件不存在
-            log.warning(f"🔍 文件不存在: {file_id}")
-            return None, None
+    metadata = await get_file_metadata(file_id)
+    if metadata is None:
+        return None
 
-        local_path = Path(Config.UPLOAD_DIR) / row['local_path']
-        original_name = row['filename']
-        # 写入缓存
-        _metadata_cache[file_id] = {"local_path": row['local_path'], "filename": original_name}
+    local_path = Path(Config.UPLOAD_DIR) / metadata["local_path"]
+    original_name = metadata["filename"]
 
     # ========== 2. 检查文件是否存在 ==========
     if not local_path.exists():
         log.warning(f"🔍 文件已丢失: {local_path}，清理数据库记录")
         # 文件丢失，清理数据库记录
-        conn = await get_db_connection()
-        await conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
-        await conn.commit()
-        await conn.close()
-        invalidate_file_cache(file_id)
-        return None, None
+        async with get_db_connection() as conn:
+            await conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            await conn.commit()
+        invalidate_file_cache(file_id, metadata["file_hash"])
+        return None
 
-    # ========== 3. 读取文件内容 ==========
-    try:
-        async with await anyio.open_file(str(local_path), 'rb') as f:
-            content = await f.read()
-    except Exception as e:
-        log.error(f"💥 文件读取失败 {file_id}: {e}")
-        raise HTTPException(status_code=500, detail="📄 文件读取失败")
+    encrypted = Config.ENCRYPTION_ENABLED and CryptoEngine.is_enabled()
 
-    # ========== 4. 逆向处理 (解密 -> 解压) ==========
     try:
-        # 4.1 解密 (如果加密)
-        decrypted = CryptoEngine.decrypt(content)
-
-        # 4.2 解压 (如果压缩)
-        final_json = decompress_data(decrypted)
-
-        return final_json, original_name
+        # ========== 3. 读取 / 解密 ==========
+        if encrypted:
+            data = _plaintext_cache.get(file_id)
+            if data is None:
+                # 认证加密只能整体解密 (校验通过前不能输出明文)
+                async with await anyio.open_file(str(local_path), 'rb') as f:
+                    content = await f.read()
+                data = CryptoEngine.decrypt(content)
+                if len(data) <= _PLAINTEXT_CACHE_MAX_ITEM:
+                    _plaintext_cache[file_id] = data
+            gzipped = Config.COMPRESSION_ENABLED and data.startswith(b'\x1f\x8b')
+            if not gzipped:
+                return StoredFile(filename=original_name, chunks=_iter_buffer(data))
+            blocks = _iter_buffer(data)
+        else:
+            if Config.COMPRESSION_ENABLED:
+                # 只读魔数判断是否为 Gzip
+                async with await anyio.open_file(str(local_path), 'rb') as f:
+                    magic = await f.read(2)
+            if not Config.COMPRESSION_ENABLED or magic != b'\x1f\x8b':
+                # 磁盘内容即原始 JSON，直接整文件发送
+                return StoredFile(filename=original_name, path=local_path)
+            blocks = _iter_file_blocks(local_path)
+
+        # ========== 4. 流式解压 ==========
+        stream = _gunzip_stream(blocks)
+        first = await anext(stream, b"")
+        return StoredFile(filename=original_name, chunks=_with_first(first, stream))
 
     except Exception as e:
         log.error(f"❌ 文件处理失败 {file_id}: {e}")
@@ -518,6 +911,116 @@ async def retrieve_file_content(file_id: str):
         )
 
 
+# ==========================================
+# ☁️ OSS 后台上传队列
+# ==========================================
+
+# 队列容量 (满了就退回同步上传，不丢副本)
+_OSS_QUEUE_SIZE = 1024
+# 并发上传协程数
+OSS_UPLOAD_WORKERS = 4
+
+# 待上传任务: (file_id, 存储文件名)
+# 只存文件名，内容由上传任务从本地存储读取，队列不会占住大量内存
+_oss_upload_queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=_OSS_QUEUE_SIZE)
+
+
+async def _publish_to_oss(file_id: str, save_filename: str, content: bytes | None = None):
+    """
+    上传到 OSS 并回写 oss_path
+
+    Args:
+        file_id: 文件 ID
+        save_filename: 存储文件名
+        content: 文件内容 (为 None 时从本地存储读取)
+
+    注意:
+        - 上传前本地文件已被删除时跳过
+        - 上传期间记录被删除时 (删除时 oss_path 仍为空，不会删 OSS)，撤回刚上传的对象
+    """
+    if content is None:
+        try:
+            content = await asyncio.to_thread((Path(Config.UPLOAD_DIR) / save_filename).read_bytes)
+        except FileNotFoundError:
+            return
+    oss_url = await _upload_to_oss(save_filename, content)
+    if not oss_url:
+        return
+    try:
+        async with get_db_connection() as conn:
+            row = await fetch_one(
+                conn,
+                "UPDATE files SET oss_path = ? WHERE id = ? RETURNING id",
+                (oss_url, file_id)
+            )
+            await conn.commit()
+    except Exception as e:
+        log.error(f"☁️ OSS 路径回写失败 {file_id}: {e}")
+        return
+    if row is None:
+        from app.core.oss_client import OSSClient
+        log.info(f"☁️ 文件 {file_id} 已在上传期间删除，撤回 OSS 对象")
+        try:
+            await OSSClient.delete(save_filename)
+        except Exception as e:
+            log.error(f"☁️ 撤回 OSS 对象失败 {save_filename}: {e}")
+
+
+async def submit_oss_upload(file_id: str, save_filename: str, content: bytes):
+    """
+    📤 提交 OSS 上传任务
+
+    入队后立即返回，由 oss_upload_task 在后台上传并回写 oss_path。
+
+    Args:
+        file_id: 文件 ID (元数据须已写入)
+        save_filename: 存储文件名 (须已写入本地存储)
+        content: 文件内容 (仅在队列已满、同步上传时使用)
+
+    注意:
+        - 队列已满时退回同步上传
+    """
+    try:
+        _oss_upload_queue.put_nowait((file_id, save_filename))
+    except asyncio.QueueFull:
+        log.warning("☁️ OSS 上传队列已满，改为同步上传")
+        await _publish_to_oss(file_id, save_filename, content)
+
+
+async def oss_upload_task():
+    """
+    ☁️ OSS 后台上传任务
+
+    注意:
+        - 无限循环，在应用启动时创建 OSS_UPLOAD_WORKERS 个
+        - 关闭时先调用 drain_oss_uploads 等待队列清空再取消
+    """
+    while True:
+        file_id, save_filename = await _oss_upload_queue.get()
+        try:
+            await _publish_to_oss(file_id, save_filename)
+        finally:
+            _oss_upload_queue.task_done()
+
+
+async def drain_oss_uploads(timeout: float = 10.0) -> bool:
+    """
+    ⏳ 等待 OSS 上传队列清空
+
+    Args:
+        timeout: 最长等待秒数
+
+    Returns:
+        bool: 队列是否已清空
+    """
+    try:
+        await asyncio.wait_for(_oss_upload_queue.join(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        log.warning(f"☁️ OSS 上传队列未能在 {timeout}s 内清空，剩余 {_oss_upload_queue.qsize()} 个")
+        return False
+
+
 # ==========================================
 # 🧹 后台清理任务
 # ==========================================
@@ -527,10 +1030,9 @@ async def clean_expired_task():
     🧹 后台清理过期文件任务（优化版）
 
     功能:
-        - 定期扫描数据库中的过期文件
-        - 批量删除本地文件
+        - 定期分批删除数据库中的过期记录 (DELETE ... RETURNING)
+        - 按返回结果批量删除本地文件
         - 批量删除 OSS 文件 (如果启用)
-        - 批量删除数据库记录
 
     运行周期:
         - 每小时执行一次 (3600 秒)
@@ -548,80 +1050,50 @@ async def clean_expired_task():
 
     while True:
         try:
-            # ========== 1. 分批查询过期文件 ==========
-            conn = await get_db_connection()
+            # ========== 1. 分批删除过期记录 (DELETE ... RETURNING，单次往返) ==========
+            # 先删记录再删文件：文件删除失败只留下孤儿文件，不会出现指向已删文件的记录
             now = datetime.datetime.now()
 
-            # 分批查询过期文件
-            cursor = await conn.execute(
-                "SELECT id, local_path, oss_path FROM files WHERE expire_at < ? LIMIT ?",
-                (now, BATCH_SIZE)
-            )
-            rows = await cursor.fetchall()
+            async with get_db_connection() as conn:
+                rows = await conn.execute_fetchall(
+                    """
+                    DELETE FROM files
+                    WHERE id IN (SELECT id FROM files WHERE expire_at < ? LIMIT ?)
+                    RETURNING id, file_hash, local_path, oss_path
+                    """,
+                    (now, BATCH_SIZE)
+                )
+                await conn.commit()
 
-            if not rows:
-                await conn.close()
-            else:
+            if rows:
                 log.info(f"🧹 发现 {len(rows)} 个过期文件需要清理")
 
                 # ========== 2. 收集需要删除的文件信息 ==========
                 to_delete_local = []
                 to_delete_oss = []
-                file_ids = []
 
                 for row in rows:
-                    file_ids.append(row['id'])
-                    local_full = Path(Config.UPLOAD_DIR) / row['local_path']
-                    to_delete_local.append(str(local_full))
+                    to_delete_local.append(Path(Config.UPLOAD_DIR) / row['local_path'])
                     if row['oss_path']:
                         to_delete_oss.append(row['oss_path'])
 
-                # ========== 3. 并发删除本地文件 ==========
-                async def delete_local(path: str):
-                    path_obj = Path(path)
-                    if path_obj.exists():
-                        try:
-                            await asyncio.to_thread(path_obj.unlink)
-                            return path, True
-                        except OSError as e:
-                            log.error(f"⚠️ 删除本地文件失败 {path}: {e}")
-                            return path, False
-                    return path, False
-
-                local_results = await asyncio.gather(
-                    *[delete_local(p) for p in to_delete_local],
-                    return_exceptions=True
-                )
+                # ========== 3. 批量删除本地文件 (单次线程池调度) ==========
+                local_results = await asyncio.to_thread(_batch_unlink, to_delete_local)
 
-                deleted_count = sum(1 for r in local_results if isinstance(r, tuple) and r[1])
+                deleted_count = sum(local_results)
                 log.info(f"🗑️ 清理任务: 已删除 {deleted_count}/{len(to_delete_local)} 个本地文件")
 
                 # ========== 4. 批量删除 OSS 文件 ==========
-                if to_delete_oss and Config.ENABLE_OSS:
-                    from app.core.oss_client import OSSClient
-                    for oss_url in to_delete_oss:
-                        try:
-                            await OSSClient.delete(oss_url)
-                            log.info(f"☁️ 清理任务: 已删除 OSS 文件 {oss_url}")
-                        except Exception as e:
-                            log.error(f"⚠️ 删除 OSS 文件失败 {oss_url}: {e}")
-
-                # ========== 5. 批量删除数据库记录（单次事务）==========
-                placeholders = ','.join('?' * len(file_ids))
-                await conn.execute(
-                    f"DELETE FROM files WHERE id IN ({placeholders})",
-                    file_ids
-                )
-                await conn.commit()
-                await conn.close()
+                await _delete_oss_urls(to_delete_oss)
 
                 # 清除缓存
-                for file_id in file_ids:
-                    invalidate_file_cache(file_id)
+                for row in rows:
+                    invalidate_file_cache(row['id'], row['file_hash'])
+                invalidate_stats_cache()
 
-                log.info(f"✅ 清理任务完成，共清理 {len(file_ids)} 个文件")
+                log.info(f"✅ 清理任务完成，共清理 {len(rows)} 个文件")
 
-                # ========== 6. 继续检查是否还有更多 ==========
+                # ========== 5. 继续检查是否还有更多 ==========
                 if len(rows) == BATCH_SIZE:
                     continue
 
@@ -629,7 +1101,7 @@ async def clean_expired_task():
             # 捕获所有异常，防止任务循环中断
             log.error(f"🚨 清理任务严重错误: {e}")
 
-        # ========== 7. 等待下次执行 ==========
+        # ========== 6. 等待下次执行 ==========
         # 每小时执行一次 (3600 秒)
         await asyncio.sleep(3600)
 
@@ -658,8 +1130,6 @@ async def get_file_list(
     Returns:
         dict: 包含 items, total, page, page_size, total_pages 的字典
     """
-    conn = await get_db_connection()
-
     # 构建 WHERE 条件
     where_conditions = []
     params = []
@@ -669,20 +1139,14 @@ async def get_file_list(
 
     where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
 
-    # 获取总数
-    count_query = f"SELECT COUNT(*) as count FROM files WHERE {where_clause}"
-    cursor = await conn.execute(count_query, params)
-    total_row = await cursor.fetchone()
-    total = total_row['count'] if total_row else 0
-
     # 计算偏移量
     offset = (page - 1) * page_size
 
     # 构建排序
     order_clause = f"{sort} {order.upper()}"
 
-    # 获取文件列表
     now = datetime.datetime.now()
+    count_query = f"SELECT COUNT(*) as count FROM files WHERE {where_clause}"
     list_query = f"""
         SELECT id, filename, file_hash, local_path, oss_path, expire_at, created_at
         FROM files
@@ -690,9 +1154,14 @@ async def get_file_list(
         ORDER BY {order_clause}
         LIMIT ? OFFSET ?
     """
-    cursor = await conn.execute(list_query, params + [page_size, offset])
-    rows = await cursor.fetchall()
-    await conn.close()
+
+    async with get_db_connection() as conn:
+        # 获取总数
+        total_row = await fetch_one(conn, count_query, params)
+        total = total_row['count'] if total_row else 0
+
+        # 获取文件列表
+        rows = await conn.execute_fetchall(list_query, params + [page_size, offset])
 
     # 构建结果
     items = []
@@ -743,17 +1212,27 @@ async def get_file_detail(file_id: str) -> dict | None:
     Returns:
         dict | None: 文件详情，不存在时返回 None
     """
-    conn = await get_db_connection()
-    cursor = await conn.execute(
-        "SELECT * FROM files WHERE id = ?",
-        (file_id,)
-    )
-    row = await cursor.fetchone()
-    await conn.close()
+    # 单次主键查询，不存在时直接返回 (404 路径不做任何额外工作)
+    async with get_db_connection() as conn:
+        row = await fetch_one(
+            conn,
+            """
+            SELECT id, filename, file_hash, hash_algorithm, local_path, oss_path, expire_at, created_at
+            FROM files WHERE id = ?
+            """,
+            (file_id,)
+        )
 
     if not row:
         return None
 
+    # 预热元数据缓存，读取内容时不再重复查询
+    _metadata_cache[file_id] = {
+        "local_path": row['local_path'],
+        "filename": row['filename'],
+        "file_hash": row['file_hash'],
+    }
+
     # 获取文件大小
     file_size = 0
     local_path = Path(Config.UPLOAD_DIR) / row['local_path']
@@ -762,10 +1241,10 @@ async def get_file_detail(file_id: str) -> dict | None:
 
     # 获取文件内容
     content = None
-    content_bytes, filename = await retrieve_file_content(file_id)
-    if content_bytes:
+    stored = await retrieve_file_content(file_id)
+    if stored:
         try:
-            content = content_bytes.decode('utf-8')
+            content = (await stored.read()).decode('utf-8')
         except:
             content = None
 
@@ -794,14 +1273,17 @@ async def delete_file(file_id: str) -> bool:
     Returns:
         bool: 是否删除成功
     """
-    conn = await get_db_connection()
-
-    # 获取文件信息
-    cursor = await conn.execute("SELECT local_path, oss_path FROM files WHERE id = ?", (file_id,))
-    row = await cursor.fetchone()
+    # 先删除记录并取回文件信息：与 OSS 后台上传的 oss_path 回写串行，
+    # 回写在前则这里拿到 oss_path，在后则上传任务发现记录已删并撤回对象
+    async with get_db_connection() as conn:
+        row = await fetch_one(
+            conn,
+            "DELETE FROM files WHERE id = ? RETURNING file_hash, local_path, oss_path",
+            (file_id,)
+        )
+        await conn.commit()
 
     if not row:
-        await conn.close()
         return False
 
     # 删除本地文件
@@ -816,21 +1298,53 @@ async def delete_file(file_id: str) -> bool:
     if row['oss_path'] and Config.ENABLE_OSS:
         from app.core.oss_client import OSSClient
         try:
-            await OSSClient.delete(row['oss_path'])
+            await OSSClient.delete_by_url(row['oss_path'])
         except Exception as e:
             log.error(f"删除 OSS 文件失败 {row['oss_path']}: {e}")
 
-    # 删除数据库记录
-    await conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
-    await conn.commit()
-    await conn.close()
-
     # 清除缓存
-    invalidate_file_cache(file_id)
+    invalidate_file_cache(file_id, row['file_hash'])
+    invalidate_stats_cache()
 
     return True
 
 
+async def _delete_oss_urls(urls: list[str]) -> None:
+    """
+    批量删除 OSS 文件 (未启用 OSS 或列表为空时跳过)，逐个记录删除失败的对象
+
+    注意:
+        - OSS 对不存在的对象也返回删除成功，失败一定是请求出错或被拒绝
+    """
+    if not urls or not Config.ENABLE_OSS:
+        return
+    from app.core.oss_client import OSSClient
+    results = await OSSClient.delete_many_by_url(urls)
+    failed = [key for key, ok in results.items() if not ok]
+    if failed:
+        log.error(f"☁️ OSS 文件删除失败 {len(failed)}/{len(results)} 个: {', '.join(failed)}")
+
+
+def _batch_unlink(paths: list[Path]) -> list[bool]:
+    """
+    批量删除本地文件 (同步，整批放进一次 asyncio.to_thread)
+
+    Returns:
+        list[bool]: 每个文件是否删除成功 (不存在计为失败，其他错误只记录日志)
+    """
+    results = []
+    for path in paths:
+        try:
+            path.unlink()
+            results.append(True)
+        except FileNotFoundError:
+            results.append(False)
+        except OSError as e:
+            log.error(f"⚠️ 删除本地文件失败 {path}: {e}")
+            results.append(False)
+    return results
+
+
 async def batch_delete_files(file_ids: list[str]) -> dict:
     """
     🗑️ 批量删除文件
@@ -840,23 +1354,51 @@ async def batch_delete_files(file_ids: list[str]) -> dict:
 
     Returns:
         dict: 包含成功和失败数量的字典
+
+    注意:
+        - 一条 DELETE ... IN ... RETURNING 语句，本地/OSS 文件并发删除
+        - 不存在 (或重复) 的 ID 计为失败
     """
-    success_count = 0
-    failed_count = 0
+    unique_ids = list(dict.fromkeys(file_ids))
+    if not unique_ids:
+        return {"success": 0, "failed": 0}
 
-    for file_id in file_ids:
-        result = await delete_file(file_id)
-        if result:
-            success_count += 1
-        else:
-            failed_count += 1
+    placeholders = ",".join("?" * len(unique_ids))
+
+    # 先删除记录并取回文件信息 (单条语句，与 OSS 后台上传的回写串行，见 delete_file)
+    async with get_db_connection() as conn:
+        rows = await conn.execute_fetchall(
+            f"DELETE FROM files WHERE id IN ({placeholders}) RETURNING id, file_hash, local_path, oss_path",
+            unique_ids
+        )
+        await conn.commit()
+
+    if rows:
+        # 并发删除本地文件和 OSS 文件
+        local_paths = [Path(Config.UPLOAD_DIR) / row['local_path'] for row in rows]
+        oss_urls = [row['oss_path'] for row in rows if row['oss_path']]
+        local_result, oss_result = await asyncio.gather(
+            asyncio.to_thread(_batch_unlink, local_paths),
+            _delete_oss_urls(oss_urls),
+            return_exceptions=True
+        )
+        if isinstance(local_result, Exception):
+            log.error(f"删除本地文件失败: {local_result}")
+        if isinstance(oss_result, Exception):
+            log.error(f"删除 OSS 文件失败: {oss_result}")
+
+        # 清除缓存
+        for row in rows:
+            invalidate_file_cache(row['id'], row['file_hash'])
+        invalidate_stats_cache()
 
     return {
-        "success": success_count,
-        "failed": failed_count
+        "success": len(rows),
+        "failed": len(file_ids) - len(rows)
     }
 
 
+@ttl_cache(seconds=_STATS_TTL)
 async def get_storage_stats() -> dict:
     """
     📊 获取存储统计
@@ -864,12 +1406,12 @@ async def get_storage_stats() -> dict:
     Returns:
         dict: 存储统计数据
     """
-    conn = await get_db_connection()
+    async with get_db_connection() as conn:
+        # 总文件数和大小
+        total_row = await fetch_one(conn, "SELECT COUNT(*) as count FROM files")
+        total_files = total_row['count'] if total_row else 0
 
-    # 总文件数和大小
-    cursor = await conn.execute("SELECT COUNT(*) as count FROM files")
-    total_row = await cursor.fetchone()
-    total_files = total_row['count'] if total_row else 0
+        rows = await conn.execute_fetchall("SELECT local_path, filename, expire_at FROM files")
 
     # 计算总存储大小
     total_size = 0
@@ -877,9 +1419,6 @@ async def get_storage_stats() -> dict:
     by_expiry = {"permanent": 0, "1d": 0, "7d": 0, "1m": 0}
     expired_count = 0
 
-    cursor = await conn.execute("SELECT local_path, filename, expire_at FROM files")
-    rows = await cursor.fetchall()
-
     now = datetime.datetime.now()
     upload_dir = Path(Config.UPLOAD_DIR)
 
@@ -911,8 +1450,6 @@ async def get_storage_stats() -> dict:
             else:
                 by_expiry["1m"] += 1
 
-    await conn.close()
-
     return {
         "total_files": total_files,
         "total_size": total_size,
@@ -922,6 +1459,7 @@ async def get_storage_stats() -> dict:
     }
 
 
+@ttl_cache(seconds=_STATS_TTL)
 async def get_upload_trend(days: int = 30) -> dict:
     """
     📈 获取上传趋势
@@ -932,25 +1470,21 @@ async def get_upload_trend(days: int = 30) -> dict:
     Returns:
         dict: 包含 dates, counts, sizes 的字典
     """
-    conn = await get_db_connection()
-
     # 计算日期范围
     end_date = datetime.datetime.now()
     start_date = end_date - datetime.timedelta(days=days)
 
     # 查询每天的文件数量
-    cursor = await conn.execute("""
-        SELECT
-            DATE(created_at) as date,
-            COUNT(*) as count
-        FROM files
-        WHERE created_at >= ?
-        GROUP BY DATE(created_at)
-        ORDER BY date
-    """, (start_date,))
-
-    rows = await cursor.fetchall()
-    await conn.close()
+    async with get_db_connection() as conn:
+        rows = await conn.execute_fetchall("""
+            SELECT
+                DATE(created_at) as date,
+                COUNT(*) as count
+            FROM files
+            WHERE created_at >= ?
+            GROUP BY DATE(created_at)
+            ORDER BY date
+        """, (start_date,))
 
     # 构建完整的日期序列
     dates = []
@@ -979,6 +1513,7 @@ async def get_upload_trend(days: int = 30) -> dict:
     }
 
 
+@ttl_cache(seconds=_STATS_TTL)
 async def get_expiring_files(days: int = 7) -> dict:
     """
     ⏰ 获取即将过期的文件
@@ -989,24 +1524,20 @@ async def get_expiring_files(days: int = 7) -> dict:
     Returns:
         dict: 包含即将过期文件信息的字典
     """
-    conn = await get_db_connection()
-
     # 计算时间范围
     now = datetime.datetime.now()
     end_date = now + datetime.timedelta(days=days)
 
     # 查询即将过期的文件
-    cursor = await conn.execute("""
-        SELECT id, filename, expire_at
-        FROM files
-        WHERE expire_at IS NOT NULL
-            AND expire_at > ?
-            AND expire_at <= ?
-        ORDER BY expire_at ASC
-    """, (now, end_date))
-
-    rows = await cursor.fetchall()
-    await conn.close()
+    async with get_db_connection() as conn:
+        rows = await conn.execute_fetchall("""
+            SELECT id, filename, expire_at
+            FROM files
+            WHERE expire_at IS NOT NULL
+                AND expire_at > ?
+                AND expire_at <= ?
+            ORDER BY expire_at ASC
+        """, (now, end_date))
 
     files = []
     for row in rows:
@@ -1033,45 +1564,32 @@ async def manual_cleanup() -> dict:
     Returns:
         dict: 清理结果
     """
-    conn = await get_db_connection()
     now = datetime.datetime.now()
 
-    # 查询过期文件
-    cursor = await conn.execute("SELECT id, local_path, oss_path FROM files WHERE expire_at < ?")
-    rows = await cursor.fetchall()
+    # 删除过期记录并取回文件信息 (单条语句)
+    async with get_db_connection() as conn:
+        rows = await conn.execute_fetchall(
+            "DELETE FROM files WHERE expire_at < ? RETURNING id, file_hash, local_path, oss_path",
+            (now,)
+        )
+        await conn.commit()
 
     if not rows:
-        await conn.close()
         return {"cleaned": 0, "message": "没有过期文件需要清理"}
 
-    cleaned = 0
+    oss_urls = [row['oss_path'] for row in rows if row['oss_path']]
+
+    # 批量删除本地文件 (单次线程池调度)
+    await asyncio.to_thread(_batch_unlink, [Path(Config.UPLOAD_DIR) / row['local_path'] for row in rows])
+
+    # 批量删除 OSS 文件
+    await _delete_oss_urls(oss_urls)
 
     for row in rows:
-        file_id = row['id']
-        local_path = Path(Config.UPLOAD_DIR) / row['local_path']
+        invalidate_file_cache(row['id'], row['file_hash'])
+    invalidate_stats_cache()
 
-        # 删除本地文件
-        if local_path.exists():
-            try:
-                await asyncio.to_thread(local_path.unlink)
-            except Exception as e:
-                log.error(f"删除本地文件失败 {local_path}: {e}")
-
-        # 删除 OSS 文件
-        if row['oss_path'] and Config.ENABLE_OSS:
-            from app.core.oss_client import OSSClient
-            try:
-                await OSSClient.delete(row['oss_path'])
-            except Exception as e:
-                log.error(f"删除 OSS 文件失败 {row['oss_path']}: {e}")
-
-        # 删除数据库记录
-        await conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
-        invalidate_file_cache(file_id)
-        cleaned += 1
-
-    await conn.commit()
-    await conn.close()
+    cleaned = len(rows)
 
     return {"cleaned": cleaned, "message": f"已清理 {cleaned} 个过期文件"}
 
@@ -1100,12 +1618,9 @@ async def sync_missing_files_task():
 
     while True:
         try:
-            conn = await get_db_connection()
-
             # 查询所有文件记录
-            cursor = await conn.execute("SELECT id, local_path FROM files")
-            rows = await cursor.fetchall()
-            await conn.close()
+            async with get_db_connection() as conn:
+                rows = await conn.execute_fetchall("SELECT id, file_hash, local_path FROM files")
 
             missing_count = 0
             for row in rows:
@@ -1116,11 +1631,10 @@ async def sync_missing_files_task():
                 if not local_path.exists():
                     missing_count += 1
                     log.info(f"🗑️ 发现丢失文件: {file_id}，清理数据库记录")
-                    conn = await get_db_connection()
-                    await conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
-                    await conn.commit()
-                    await conn.close()
-                    invalidate_file_cache(file_id)
+                    async with get_db_connection() as conn:
+                        await conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                        await conn.commit()
+                    invalidate_file_cache(file_id, row['file_hash'])
 
             if missing_count > 0:
                 log.info(f"✅ 同步任务完成，清理 {missing_count} 个丢失文件记录")
@@ -1136,9 +1650,6 @@ async def sync_missing_files_task():
 # 📊 Prometheus 指标解析
 # ==========================================
 
-# 缓存 Prometheus 指标结果（10秒过期）
-_metrics_cache: TTLCache = TTLCache(maxsize=1, ttl=10)
-_metrics_cache_time: float = 0
 _startup_time: float = time.time()
 
 
@@ -1158,6 +1669,7 @@ def _parse_prometheus_labels(labels_str: str) -> dict:
     return labels
 
 
+@ttl_cache(seconds=10)
 async def get_prometheus_metrics() -> dict:
     """
     📊 获取 Prometheus 监控指标（JSON 格式）
@@ -1173,14 +1685,13 @@ async def get_prometheus_metrics() -> dict:
         - latency: 延迟统计（p50/p90/p95/p99 平均）
         - errors: 错误统计（总数、错误率、按状态码分组）
         - system: 系统指标（运行时长、内存使用）
+
+    注意:
+        - 结果缓存 10 秒
     """
-    global _metrics_cache_time
+    import httpx
 
     current_time = time.time()
-    if current_time - _metrics_cache_time < 10 and _metrics_cache:
-        return _metrics_cache
-
-    import httpx
 
     result = {
         "requests": {
@@ -1340,9 +1851,4 @@ async def get_prometheus_metrics() -> dict:
     except Exception as e:
         log.warning(f"获取系统指标失败: {e}")
 
-    # 更新缓存
-    _metrics_cache.clear()
-    _metrics_cache.update(result)
-    _metrics_cache_time = current_time
-
     return result
@@ -19,6 +19,7 @@ from contextlib import asynccontextmanager
 # FastAPI 核心组件
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 # 限流异常处理
@@ -41,11 +42,11 @@ from pathlib import Path
 
 # ========== 内部模块导入 ==========
 # 应用配置 - 从 .env 读取所有配置
-from app.core.config import Config, PROJECT_ROOT
+from app.core.config import Config, PROJECT_ROOT, SKIP_DOTENV, ensure_dirs
 # 日志模块 - 表情+中文风格日志
 from app.core.logger import log
 # 安全模块 - 限流器
-from app.core.security import limiter
+from app.core.security import limiter, APIKeyMiddleware, close_redis
 # HTTP 客户端 - 复用 TCP 连接
 from app.core.http_client import http_client
 # 加密引擎 - Fernet AES-128 加密
@@ -55,7 +56,10 @@ from app.core.oss_client import OSSClient
 # 数据库初始化
 from app.database import init_db, close_db
 # 后台清理任务
-from app.services import clean_expired_task, sync_missing_files_task
+from app.services import (
+    clean_expired_task, sync_missing_files_task,
+    oss_upload_task, drain_oss_uploads, OSS_UPLOAD_WORKERS,
+)
 # 配置热重载
 from app.core.config_reloader import ConfigReloader
 # API 路由
@@ -108,18 +112,19 @@ async def lifespan(app: FastAPI):
 
     启动流程:
         1. 输出启动日志
-        2. 初始化数据库
+        2. 创建运行目录并初始化数据库
         3. 启动 HTTP 客户端
         4. 初始化加密引擎 (如启用)
         5. 初始化 OSS 客户端 (如启用)
-        6. 启动后台清理任务
+        6. 启动后台清理任务与 OSS 上传任务
         7. 启动配置文件监听
 
     关闭流程:
         1. 输出关闭日志
         2. 停止配置文件监听
-        3. 优雅停止后台任务
-        4. 关闭 HTTP 客户端
+        3. 等待 OSS 上传队列清空
+        4. 优雅停止后台任务
+        5. 关闭 HTTP 客户端
 
     Args:
         app: FastAPI 应用实例
@@ -146,6 +151,9 @@ async def lifespan(app: FastAPI):
         f"Redis={'🔴启用' if bool(Config.REDIS_URL) else '⚪关闭'}"
     )
 
+    # 创建数据 / 上传 / 日志目录 (仅首次启动时真正执行 mkdir)
+    ensure_dirs()
+
     # 初始化数据库 (创建表结构)
     log.info("🗄️ 正在初始化数据库...")
     await init_db()
@@ -164,7 +172,12 @@ async def lifespan(app: FastAPI):
         raise
 
     # 初始化 OSS 客户端 (如果启用 OSS)
+    # 连通性检查在后台执行，不让 OSS 网络延迟拖慢启动
     OSSClient.init()
+    oss_probe_task = asyncio.create_task(OSSClient.probe())
+
+    # 启动 OSS 后台上传任务 (加密/压缩模式下异步上传副本)
+    oss_upload_tasks = [asyncio.create_task(oss_upload_task()) for _ in range(OSS_UPLOAD_WORKERS)]
 
     # 启动后台清理任务 (每小时清理一次过期文件)
     log.info("🧹 正在启动后台清理任务...")
@@ -175,9 +188,11 @@ async def lifespan(app: FastAPI):
     sync_task = asyncio.create_task(sync_missing_files_task())
 
     # 启动配置文件监听 (支持配置热重载)
-    log.info("👁️ 正在启动配置文件监听...")
-    config_reloader = ConfigReloader()
-    config_reloader.start_watching()
+    # SKIP_DOTENV 时配置只来自环境变量，无需监听
+    if not SKIP_DOTENV:
+        log.info("👁️ 正在启动配置文件监听...")
+        config_reloader = ConfigReloader()
+        config_reloader.start_watching()
 
     log.info("✅ 图床服务启动完成！")
 
@@ -194,17 +209,26 @@ async def lifespan(app: FastAPI):
         config_reloader.stop_watching()
         log.info("👁️ 配置文件监听已停止")
 
+    # 等待 OSS 上传队列清空 (上传任务需要回写数据库，必须在关闭连接池之前)
+    await drain_oss_uploads()
+
     # 关闭数据库连接池
     await close_db()
     log.info("🗄️ 数据库连接池已关闭")
 
     # 优雅关闭后台任务 (等待最多 5 秒)
-    tasks = [cleanup_task, sync_task]
+    tasks = [cleanup_task, sync_task, oss_probe_task, *oss_upload_tasks]
     for t in tasks:
         t.cancel()
     await asyncio.gather(*tasks, return_exceptions=True)
     log.info("✅ 后台任务已停止")
 
+    # 关闭 OSS 线程池
+    OSSClient.close()
+
+    # 关闭限流 Redis 连接池
+    await close_redis()
+
     # 关闭 HTTP 客户端
     await http_client.stop()
     log.info("🌐 HTTP 客户端已关闭")
@@ -223,6 +247,7 @@ app = FastAPI(
     lifespan=lifespan,  # 生命周期管理器
     docs_url="/docs",  # Swagger UI 地址
     redoc_url="/redoc",  # ReDoc 地址
+    default_response_class=ORJSONResponse,  # 使用 orjson 序列化响应 (比标准库 json 快数倍)
 )
 
 
@@ -235,6 +260,14 @@ app = FastAPI(
 Instrumentator().instrument(app).expose(app)
 
 
+# ==========================================
+# 🔑 API Key 鉴权中间件
+# ==========================================
+
+# 上传接口鉴权在 ASGI 层完成 (先于 CORS 注册 → 位于其内层，401 响应同样带 CORS 头)
+app.add_middleware(APIKeyMiddleware, paths=("/upload",))
+
+
 # ==========================================
 # 🌐 CORS 中间件配置
 # ==========================================
@@ -0,0 +1,83 @@
+"""
+=============================================
+🧪 API 路由测试
+=============================================
+"""
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import api
+from app.models import UploadResponse, make_upload_response
+
+
+@pytest.fixture
+def client():
+    """仅挂载路由的测试客户端 (不执行应用生命周期)"""
+    app = FastAPI()
+    app.include_router(api.router)
+    return TestClient(app)
+
+
+class TestAdminFileRoutes:
+    """文件管理路由测试"""
+
+    def test_batch_delete_route(self, client, monkeypatch):
+        """测试 /admin/files/batch 命中批量删除而不是单文件删除"""
+        calls = {}
+
+        async def fake_batch_delete(file_ids):
+            calls["batch"] = file_ids
+            return {"success": len(file_ids), "failed": 0}
+
+        async def fake_delete(file_id):
+            calls["single"] = file_id
+            return True
+
+        monkeypatch.setattr(api, "batch_delete_files", fake_batch_delete)
+        monkeypatch.setattr(api, "delete_file", fake_delete)
+
+        response = client.request("DELETE", "/admin/files/batch", json={"file_ids": ["a1b2c3d4", "e5f6a7b8"]})
+
+        assert response.status_code == 200
+        assert response.json() == {"success": 2, "failed": 0}
+        assert calls == {"batch": ["a1b2c3d4", "e5f6a7b8"]}
+
+    def test_single_delete_route(self, client, monkeypatch):
+        """测试单文件删除路由仍然可用"""
+        deleted = []
+
+        async def fake_delete(file_id):
+            deleted.append(file_id)
+            return True
+
+        monkeypatch.setattr(api, "delete_file", fake_delete)
+
+        response = client.delete("/admin/files/a1b2c3d4")
+
+        assert response.status_code == 200
+        assert deleted == ["a1b2c3d4"]
+
+
+class TestUploadResponse:
+    """上传响应结构测试"""
+
+    @pytest.mark.parametrize("is_duplicate", [False, True])
+    def test_matches_upload_response(self, is_duplicate):
+        """测试 make_upload_response 的输出 (新文件 / 秒传) 可通过 UploadResponse 校验"""
+        body = make_upload_response(
+            url="http://test.local/a1b2c3d4", filename="config.json", expiry="永久", is_duplicate=is_duplicate
+        )
+        parsed = UploadResponse.model_validate(orjson.loads(orjson.dumps(body)))
+
+        assert parsed.model_dump() == body
+        assert parsed.data.is_duplicate is is_duplicate
+
+    def test_openapi_documents_upload_response(self, client):
+        """测试 OpenAPI 文档中上传接口的 200 响应仍引用 UploadResponse"""
+        schema = client.get("/openapi.json").json()
+        content = schema["paths"]["/upload"]["post"]["responses"]["200"]["content"]
+
+        assert content["application/json"]["schema"]["$ref"].endswith("/UploadResponse")
@@ -0,0 +1,204 @@
+"""
+=============================================
+🧪 配置模块测试
+=============================================
+"""
+
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+
+from watchdog.events import FileModifiedEvent, FileMovedEvent
+
+from app.core.config import ConfigProxy, Settings
+from app.core import config_reloader, config_watcher
+from app.core.config_reloader import ConfigReloader
+from app.core.config_watcher import ConfigWatcher, EnvFileHandler
+from app.core.config_manager import ConfigManager
+
+
+class TestConfigReload:
+    """配置热重载测试"""
+
+    def test_reload_replaces_settings(self):
+        """测试重载替换配置并触发回调"""
+        proxy = ConfigProxy(Settings(RATE_LIMIT="60/minute"))
+        calls = []
+        proxy.add_reload_callback(lambda old, new: calls.append((old.rate_limit, new.rate_limit)))
+
+        assert proxy.reload(Settings(RATE_LIMIT="10/second")) is True
+        assert proxy.version == 1
+        assert proxy.RATE_LIMIT_PARSED == (10, 1)
+        assert proxy.model_dump()["rate_limit"] == "10/second"
+        assert calls == [("60/minute", "10/second")]
+
+    def test_reload_rejects_non_settings(self):
+        """测试重载非 Settings 对象时失败且不改变配置"""
+        proxy = ConfigProxy(Settings())
+
+        assert proxy.reload({"rate_limit": "10/second"}) is False
+        assert proxy.version == 0
+
+    def test_reload_from_dict(self):
+        """测试从字典重载：验证失败时保留旧配置"""
+        proxy = ConfigProxy(Settings(RATE_LIMIT="60/minute"))
+
+        assert proxy.reload_from_dict({"RATE_LIMIT": "fast"}) is False
+        assert proxy.rate_limit == "60/minute"
+
+        assert proxy.reload_from_dict({"RATE_LIMIT": "5/second"}) is True
+        assert proxy.rate_limit == "5/second"
+        assert proxy.version == 1
+
+    async def test_reloader_applies_on_event_loop(self, monkeypatch):
+        """测试监听线程触发的重载在事件循环线程中替换配置"""
+        proxy = ConfigProxy(Settings())
+        threads = []
+        proxy.add_reload_callback(lambda old, new: threads.append(threading.get_ident()))
+        monkeypatch.setattr(config_reloader, "Config", proxy)
+
+        reloader = ConfigReloader()
+        reloader._loop = asyncio.get_running_loop()
+
+        # 模拟 watchdog 去抖线程
+        assert await asyncio.to_thread(reloader.reload) is True
+        assert proxy.version == 1
+        assert threads == [threading.get_ident()]
+
+
+class TestConfigManager:
+    """配置管理器测试"""
+
+    def test_read_env_file_cache(self, tmp_path):
+        """测试 .env 解析缓存：返回副本，文件变化后重新读取"""
+        env_path = tmp_path / ".env"
+        env_path.write_text("# 注释\nHOST_DOMAIN=http://a\nAUTH_ENABLED = true\n", encoding="utf-8")
+        manager = ConfigManager(env_path)
+
+        first = manager.read_env_file()
+        assert first == {"HOST_DOMAIN": "http://a", "AUTH_ENABLED": "true"}
+
+        # 修改返回值不影响缓存
+        first["HOST_DOMAIN"] = "changed"
+        assert manager.read_env_file()["HOST_DOMAIN"] == "http://a"
+
+        env_path.write_text("HOST_DOMAIN=http://bb\n", encoding="utf-8")
+        assert manager.read_env_file() == {"HOST_DOMAIN": "http://bb"}
+
+    def test_read_missing_env_file(self, tmp_path):
+        """测试 .env 不存在时返回空字典"""
+        assert ConfigManager(tmp_path / ".env").read_env_file() == {}
+
+    def test_write_env_file_keeps_comments(self, tmp_path):
+        """测试写入时保留注释并追加新配置项"""
+        env_path = tmp_path / ".env"
+        env_path.write_text("# 注释\nA=1", encoding="utf-8")
+
+        assert ConfigManager(env_path).write_env_file({"A": "2", "B": "3"}) is True
+        assert env_path.read_text(encoding="utf-8") == "# 注释\nA=2\nB=3\n"
+
+    def test_write_env_file_keeps_mode(self, tmp_path):
+        """测试原子替换后 .env 保持原有权限 (不会变成全局可读)"""
+        env_path = tmp_path / ".env"
+        env_path.write_text("API_KEY=secret\n", encoding="utf-8")
+        env_path.chmod(0o600)
+
+        assert ConfigManager(env_path).write_env_file({"API_KEY": "new"}) is True
+        assert env_path.stat().st_mode & 0o777 == 0o600
+        assert env_path.read_text(encoding="utf-8") == "API_KEY=new\n"
+        assert not (tmp_path / ".env.tmp").exists()
+
+    def test_write_new_env_file_is_private(self, tmp_path):
+        """测试新建 .env 时权限为 0600"""
+        env_path = tmp_path / ".env"
+
+        assert ConfigManager(env_path).write_env_file({"A": "1"}) is True
+        assert env_path.stat().st_mode & 0o777 == 0o600
+
+
+class TestEnvFileHandler:
+    """.env 文件监听防抖测试"""
+
+    def test_burst_triggers_once(self, tmp_path):
+        """测试连续多次修改只触发一次回调"""
+        calls = []
+        handler = EnvFileHandler(lambda: calls.append(1), debounce_seconds=0.05)
+        try:
+            event = FileModifiedEvent(str(tmp_path / ".env"))
+            for _ in range(5):
+                handler.dispatch(event)
+            time.sleep(0.3)
+            assert calls == [1]
+
+            # 静默后再次修改会再触发
+            handler.dispatch(event)
+            time.sleep(0.3)
+            assert calls == [1, 1]
+        finally:
+            handler.close()
+
+    def test_atomic_replace_triggers(self, tmp_path):
+        """测试临时文件重命名覆盖 .env (原子写入) 也会触发"""
+        calls = []
+        env_path = tmp_path / ".env"
+        handler = EnvFileHandler(lambda: calls.append(1), debounce_seconds=0.01, env_path=env_path)
+        try:
+            handler.dispatch(FileMovedEvent(str(tmp_path / ".env.tmp"), str(env_path)))
+            time.sleep(0.1)
+            assert calls == [1]
+        finally:
+            handler.close()
+
+    def test_relative_env_path(self):
+        """测试相对路径 .env: 事件路径为观察目录 "." 拼接文件名"""
+        calls = []
+        handler = EnvFileHandler(lambda: calls.append(1), debounce_seconds=0.01, env_path=Path(".env"))
+        try:
+            handler.dispatch(FileModifiedEvent(os.path.join(".", ".env")))
+            time.sleep(0.1)
+            assert calls == [1]
+        finally:
+            handler.close()
+
+    def test_ignores_other_files(self, tmp_path):
+        """测试忽略其他文件的修改"""
+        calls = []
+        handler = EnvFileHandler(lambda: calls.append(1), debounce_seconds=0.01)
+        try:
+            handler.dispatch(FileModifiedEvent(str(tmp_path / "main.py")))
+            time.sleep(0.1)
+            assert calls == []
+        finally:
+            handler.close()
+
+
+class TestConfigWatcher:
+    """配置文件监听器测试"""
+
+    def test_watchers_share_observer(self, tmp_path):
+        """测试多个监听器共用一个观察者，最后一个停止时才关闭"""
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        (tmp_path / "a" / ".env").write_text("A=1\n", encoding="utf-8")
+        (tmp_path / "b" / ".env").write_text("B=1\n", encoding="utf-8")
+        first = ConfigWatcher(tmp_path / "a" / ".env", lambda: None)
+        second = ConfigWatcher(tmp_path / "b" / ".env", lambda: None)
+
+        first.start()
+        second.start()
+        try:
+            observer = first.observer
+            assert observer is second.observer
+            assert len(observer.emitters) == 2
+
+            first.stop()
+            assert observer.is_alive()
+            assert len(observer.emitters) == 1
+        finally:
+            first.stop()
+            second.stop()
+
+        assert config_watcher._shared_observer is None
+        assert not observer.is_alive()
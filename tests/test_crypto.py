@@ -8,8 +8,10 @@ import os
 
 import pytest
 
+from cryptography.fernet import Fernet
+
 from app.core.crypto import CryptoEngine
-from app.core.config import Settings
+from app.core.config import Config, Settings
 
 
 class TestCryptoEngine:
@@ -81,3 +83,42 @@ class TestCryptoEngine:
         config = Settings()
         CryptoEngine.init_engine()
         assert CryptoEngine.is_enabled() is False
+
+
+class TestAESGCMFormat:
+    """AES-GCM 密文格式测试"""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        """启用加密的引擎 (测试结束后恢复原状态)"""
+        key = Fernet.generate_key().decode()
+        monkeypatch.setattr(Config, "ENCRYPTION_ENABLED", True)
+        monkeypatch.setattr(Config, "ENCRYPTION_KEY", key)
+        monkeypatch.setattr(CryptoEngine, "_cipher", CryptoEngine._cipher)
+        monkeypatch.setattr(CryptoEngine, "_legacy", CryptoEngine._legacy)
+        CryptoEngine.init_engine()
+        return key
+
+    def test_roundtrip_with_version_byte(self, engine):
+        """测试新密文带版本字节且可往返"""
+        encrypted = CryptoEngine.encrypt(b'{"a": 1}')
+
+        assert encrypted[:1] == b"\x01"
+        assert len(encrypted) == len(b'{"a": 1}') + 29
+        assert CryptoEngine.decrypt(encrypted) == b'{"a": 1}'
+        # 随机 nonce: 相同明文密文不同
+        assert CryptoEngine.encrypt(b'{"a": 1}') != encrypted
+
+    def test_decrypt_legacy_fernet(self, engine):
+        """测试兼容解密旧版 Fernet 密文"""
+        legacy = Fernet(engine.encode()).encrypt(b'{"old": true}')
+
+        assert CryptoEngine.decrypt(legacy) == b'{"old": true}'
+
+    def test_tampered_ciphertext(self, engine):
+        """测试篡改密文时解密失败"""
+        encrypted = bytearray(CryptoEngine.encrypt(b'{"a": 1}'))
+        encrypted[-1] ^= 1
+
+        with pytest.raises(Exception):
+            CryptoEngine.decrypt(bytes(encrypted))
@@ -0,0 +1,57 @@
+"""
+=============================================
+🧪 数据库模块测试
+=============================================
+"""
+
+import asyncio
+
+from app import database
+from app.core.config import Config
+from app.database import DatabasePool, init_db, close_db, get_db_connection
+
+
+class TestDatabasePool:
+    """数据库连接池测试"""
+
+    async def test_acquire_waits_when_exhausted(self, tmp_path):
+        """测试并发数超过连接池大小时排队等待而不是报错"""
+        pool = DatabasePool(str(tmp_path / "test.db"), pool_size=2)
+        active = 0
+        peak = 0
+
+        async def use():
+            nonlocal active, peak
+            async with pool.acquire() as conn:
+                active += 1
+                peak = max(peak, active)
+                await conn.execute("SELECT 1")
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        try:
+            await asyncio.gather(*(use() for _ in range(8)))
+            assert peak == 2
+            assert pool._queue.qsize() == 2
+        finally:
+            await pool.close_all()
+
+
+class TestSchema:
+    """数据库结构测试"""
+
+    async def test_expire_cleanup_uses_index(self, tmp_path, monkeypatch):
+        """测试过期清理查询走 idx_expire_at 索引而不是全表扫描"""
+        monkeypatch.setattr(Config, "DB_FILE", str(tmp_path / "test.db"))
+        monkeypatch.setattr(database, "_db_pool", None)
+
+        await init_db()
+        try:
+            async with get_db_connection() as conn:
+                plan = await conn.execute_fetchall(
+                    "EXPLAIN QUERY PLAN SELECT id FROM files WHERE expire_at < ? LIMIT 100",
+                    ("2000-01-01",)
+                )
+            assert any("idx_expire_at" in row["detail"] for row in plan)
+        finally:
+            await close_db()
@@ -0,0 +1,144 @@
+"""
+=============================================
+🧪 OSS 客户端测试
+=============================================
+"""
+
+import base64
+import hashlib
+import hmac
+from types import SimpleNamespace
+
+import httpx
+import oss2
+import pytest
+
+from app.core import oss_client
+from app.core.oss_client import OSSClient
+from app.core.http_client import http_client
+
+
+class FakeBucket:
+    """记录批量删除调用的假 Bucket"""
+
+    def __init__(self, fail_keys=()):
+        self.calls = []
+        self.fail_keys = set(fail_keys)
+
+    def batch_delete_objects(self, keys):
+        self.calls.append(list(keys))
+        return SimpleNamespace(deleted_keys=[k for k in keys if k not in self.fail_keys])
+
+
+class TestBatchDelete:
+    """OSS 批量删除测试"""
+
+    @pytest.fixture
+    def bucket(self, monkeypatch):
+        bucket = FakeBucket(fail_keys={"c.bin"})
+        monkeypatch.setattr(OSSClient, "_bucket", bucket)
+        monkeypatch.setattr(oss_client, "_BATCH_DELETE_LIMIT", 2)
+        return bucket
+
+    async def test_delete_many_chunks(self, bucket):
+        """测试按上限分批请求并汇总结果"""
+        result = await OSSClient.delete_many(["a.bin", "b.bin", "c.bin", "a.bin"])
+
+        assert bucket.calls == [["a.bin", "b.bin"], ["c.bin"]]
+        assert result == {"a.bin": True, "b.bin": True, "c.bin": False}
+
+    async def test_delete_many_by_url(self, bucket):
+        """测试从 URL 提取文件名后批量删除"""
+        result = await OSSClient.delete_many_by_url(["https://b.oss.example.com/a.bin"])
+
+        assert bucket.calls == [["a.bin"]]
+        assert result == {"a.bin": True}
+
+    async def test_disabled(self, monkeypatch):
+        """测试未启用 OSS 时不发请求"""
+        monkeypatch.setattr(OSSClient, "_bucket", None)
+
+        assert await OSSClient.delete_many(["a.bin"]) == {"a.bin": False}
+
+
+class TestProbe:
+    """OSS 连通性检查测试"""
+
+    async def test_bucket_info_cached(self, monkeypatch):
+        """测试 Bucket 信息只请求一次"""
+        calls = []
+
+        def get_bucket_info():
+            calls.append(1)
+            return SimpleNamespace(name="b", location="oss-cn", creation_date="d", storage_class="Standard")
+
+        monkeypatch.setattr(OSSClient, "_bucket", SimpleNamespace(get_bucket_info=get_bucket_info))
+        monkeypatch.setattr(OSSClient, "_bucket_info_cache", None)
+
+        assert await OSSClient.probe() is True
+        assert (await OSSClient.get_bucket_info())["name"] == "b"
+        assert calls == [1]
+
+    async def test_probe_failure_disables(self, monkeypatch):
+        """测试连通性检查失败时禁用 OSS"""
+        def get_bucket_info():
+            raise OSError("unreachable")
+
+        monkeypatch.setattr(OSSClient, "_bucket", SimpleNamespace(get_bucket_info=get_bucket_info))
+        monkeypatch.setattr(OSSClient, "_bucket_info_cache", None)
+
+        assert await OSSClient.probe() is False
+        assert OSSClient.is_enabled() is False
+
+
+class TestAsyncRequests:
+    """OSS 上传/删除经 HTTPX 发送测试"""
+
+    @staticmethod
+    def _use_mock_bucket(monkeypatch, handler):
+        auth = oss2.Auth("ak", "sk")
+        monkeypatch.setattr(OSSClient, "_auth", auth)
+        monkeypatch.setattr(OSSClient, "_bucket", oss2.Bucket(auth, "oss-cn-hangzhou.aliyuncs.com", "bucket-test"))
+        monkeypatch.setattr(OSSClient, "_base_url", "https://cdn.example.com")
+        monkeypatch.setattr(http_client, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    async def test_upload_signed_request(self, monkeypatch):
+        """测试上传请求带 OSS V1 签名 URL 并由 HTTPX 发送 (签名规则变化时失败)"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, headers={"x-oss-hash-crc64ecma": str(OSSClient._crc64(b"{}"))})
+
+        self._use_mock_bucket(monkeypatch, handler)
+
+        assert await OSSClient.upload("a1.json", b"{}") == "https://cdn.example.com/a1.json"
+
+        request = requests[0]
+        assert request.method == "PUT"
+        assert request.url.path == "/a1.json"
+        assert request.url.host == "bucket-test.oss-cn-hangzhou.aliyuncs.com"
+        assert request.headers["content-type"] == "application/json"
+        assert request.content == b"{}"
+
+        # 按 OSS V1 签名规则独立计算: VERB\nContent-MD5\nContent-Type\nExpires\n/bucket/key
+        params = request.url.params
+        assert params["OSSAccessKeyId"] == "ak"
+        string_to_sign = f"PUT\n\napplication/json\n{params['Expires']}\n/bucket-test/a1.json"
+        expected = base64.b64encode(hmac.new(b"sk", string_to_sign.encode(), hashlib.sha1).digest()).decode()
+        assert params["Signature"] == expected
+
+    async def test_upload_crc_mismatch(self, monkeypatch):
+        """测试 CRC64 不一致时上传失败并删除已写入的对象"""
+        methods = []
+
+        def handler(request):
+            methods.append(request.method)
+            if request.method == "PUT":
+                return httpx.Response(200, headers={"x-oss-hash-crc64ecma": "1"})
+            return httpx.Response(204)
+
+        self._use_mock_bucket(monkeypatch, handler)
+
+        assert await OSSClient.upload("a1.json", b"{}") is None
+        assert methods == ["PUT", "DELETE"]
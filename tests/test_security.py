@@ -5,10 +5,12 @@
 """
 
 import pytest
-from fastapi import HTTPException
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
 
-from app.core.security import verify_api_key
-from app.core.config import Config
+from app.core import security
+from app.core.security import APIKeyMiddleware, verify_api_key, _take_local
+from app.core.config import Config, Settings
 
 
 class TestAPIKeyVerification:
@@ -34,6 +36,17 @@ class TestAPIKeyVerification:
 
         assert exc_info.value.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_non_ascii_api_key(self, monkeypatch):
+        """测试非 ASCII 的 API Key 返回 401 而不是 500"""
+        monkeypatch.setattr(Config, "auth_enabled", True)
+        monkeypatch.setattr(Config, "api_key", "correct_key")
+
+        with pytest.raises(HTTPException) as exc_info:
+            await verify_api_key("密钥")
+
+        assert exc_info.value.status_code == 401
+
     @pytest.mark.asyncio
     async def test_auth_disabled(self, monkeypatch):
         """测试鉴权禁用时任何 Key 都通过"""
@@ -51,3 +64,99 @@ class TestAPIKeyVerification:
             await verify_api_key(None)
 
         assert exc_info.value.status_code == 401
+
+
+class TestAPIKeyMiddleware:
+    """API Key 鉴权中间件测试"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(Config, "auth_enabled", True)
+        monkeypatch.setattr(Config, "api_key", "correct_key")
+        app = FastAPI()
+        app.add_middleware(APIKeyMiddleware, paths=("/upload",))
+        app.post("/upload")(lambda: {"ok": True})
+        app.get("/health")(lambda: {"ok": True})
+        return TestClient(app)
+
+    def test_valid_key(self, client):
+        """测试正确的 API Key 进入路由"""
+        assert client.post("/upload", headers={"x-api-key": "correct_key"}).status_code == 200
+
+    def test_rejects_missing_and_wrong_key(self, client):
+        """测试缺少或错误的 API Key 返回统一格式的 401"""
+        missing = client.post("/upload")
+        wrong = client.post("/upload", headers={"x-api-key": "wrong_key"})
+
+        assert missing.status_code == wrong.status_code == 401
+        assert missing.json() == {"code": "HTTP_ERROR", "msg": "⛔ 未提供 API Key", "data": None}
+        assert wrong.json()["msg"] == "⛔ API Key 无效"
+        assert wrong.headers["www-authenticate"] == "ApiKey"
+
+    def test_unprotected_path_and_disabled(self, client, monkeypatch):
+        """测试未保护的路径和鉴权关闭时直接放行"""
+        assert client.get("/health").status_code == 200
+
+        monkeypatch.setattr(Config, "auth_enabled", False)
+        assert client.post("/upload").status_code == 200
+
+    def test_root_path_prefix(self, client):
+        """测试反向代理前缀 (root_path) 下的受保护路径同样需要鉴权"""
+        prefixed = TestClient(client.app, root_path="/api")
+
+        assert prefixed.post("/api/upload").status_code == 401
+        assert prefixed.post("/api/upload", headers={"x-api-key": "correct_key"}).status_code == 200
+
+
+class TestTokenBucket:
+    """令牌桶限流测试 (进程内模式)"""
+
+    def test_parse_rule(self):
+        """测试限流规则在配置加载时解析"""
+        assert Settings(RATE_LIMIT="60/minute").RATE_LIMIT_PARSED == (60, 60)
+        assert Settings(RATE_LIMIT="10 per second").RATE_LIMIT_PARSED == (10, 1)
+        assert Settings(RATE_LIMIT="100/2 hours").RATE_LIMIT_PARSED == (100, 7200)
+
+    def test_invalid_rule(self):
+        """测试无效限流规则在配置加载时报错"""
+        with pytest.raises(ValueError):
+            Settings(RATE_LIMIT="fast")
+
+    def test_local_bucket_exhaust_and_refill(self):
+        """测试令牌耗尽后拒绝，随时间补充后放行"""
+        key = "tb:test:127.0.0.1"
+        results = [_take_local(key, 3, 0.5, 100.0) for _ in range(4)]
+        assert results == [True, True, True, False]
+
+        # 2 秒后补充 1 个令牌
+        assert _take_local(key, 3, 0.5, 102.0) is True
+        assert _take_local(key, 3, 0.5, 102.0) is False
+
+    async def test_redis_failure_cooldown(self, monkeypatch):
+        """测试 Redis 失败后冷却期内不再访问 Redis，恢复后重新使用"""
+        calls = []
+
+        def broken_script():
+            calls.append(1)
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(security, "_get_redis_script", broken_script)
+        monkeypatch.setattr(security, "_redis_down_until", 0.0)
+
+        assert await security._take_redis("tb:test:k", 3, 1.0, 60) is None
+        assert await security._take_redis("tb:test:k", 3, 1.0, 60) is None
+        assert calls == [1]
+
+        # 冷却结束后重试，成功即恢复
+        async def script(keys, args):
+            assert args == [3, 1.0, 60]  # 不再传入本机时间
+            return 1
+
+        monkeypatch.setattr(security, "_get_redis_script", lambda: script)
+        monkeypatch.setattr(security, "_redis_down_until", 1.0)
+        assert await security._take_redis("tb:test:k", 3, 1.0, 60) is True
+        assert security._redis_down_until == 0.0
+
+    def test_lua_uses_server_time(self):
+        """测试令牌桶脚本使用 Redis 服务器时间"""
+        assert "redis.call('TIME')" in security._TOKEN_BUCKET_LUA
@@ -4,12 +4,15 @@
 =============================================
 """
 
+import asyncio
+import gzip
 import os
 
 import pytest
 from fastapi import HTTPException
 
-from app.services import compress_data, decompress_data, calculate_hash, validate_and_minify
+from app import services
+from app.services import compress_data, decompress_data, calculate_hash, validate_and_minify, _gunzip_stream, ttl_cache
 from app.core.config import Settings
 
 
@@ -51,6 +54,18 @@ class TestDataProcessing:
         assert compressed == original
         assert decompressed == original
 
+    def test_gzip_compatible(self, monkeypatch):
+        """测试启用压缩时输出为标准 Gzip 格式，可被 gzip 模块解压"""
+        from app.core.config import Config
+        monkeypatch.setattr(Config, "COMPRESSION_ENABLED", True)
+
+        original = b'{"test": "data"}' * 100
+        compressed = compress_data(original)
+
+        assert compressed.startswith(b'\x1f\x8b')
+        assert gzip.decompress(compressed) == original
+        assert decompress_data(gzip.compress(original)) == original
+
     def test_hash_calculation(self):
         """测试哈希计算"""
         data = b"consistent data"
@@ -62,6 +77,24 @@ class TestDataProcessing:
         assert algo2 == "blake2b"
         assert len(hash1) == 32  # blake2b digest_size=16 输出长度
 
+    def test_blake3_optional(self, monkeypatch):
+        """测试 blake3 可用时优先使用，未安装时回退 blake2b"""
+        data = b"consistent data"
+
+        monkeypatch.setattr(services, "_blake3", None)
+        assert calculate_hash(data, use_blake3=True) == calculate_hash(data)
+
+        class FakeBlake3:
+            def __init__(self, content):
+                self.content = content
+
+            def hexdigest(self, length):
+                return "b3" * length
+
+        monkeypatch.setattr(services, "_blake3", FakeBlake3)
+        assert calculate_hash(data, use_blake3=True) == ("b3" * 16, "blake3")
+        assert calculate_hash(data)[1] == "blake2b"
+
     def test_hash_different_data(self):
         """测试不同数据产生不同哈希"""
         hash1, _ = calculate_hash(b"data1", use_blake2b=True)
@@ -128,3 +161,260 @@ class TestDataProcessing:
         with pytest.raises(HTTPException) as exc_info:
             validate_and_minify(large_json)
         assert exc_info.value.status_code == 413
+
+
+class TestStreamingDecompress:
+    """流式解压测试"""
+
+    @staticmethod
+    def _run(data: bytes, block_size: int) -> list[bytes]:
+        async def blocks():
+            for i in range(0, len(data), block_size):
+                yield data[i:i + block_size]
+
+        async def collect():
+            return [chunk async for chunk in _gunzip_stream(blocks())]
+
+        return asyncio.run(collect())
+
+    def test_roundtrip_in_bounded_chunks(self):
+        """测试分块解压结果与原文一致且每块大小受限"""
+        original = b'{"k":"' + b"x" * (1024 * 1024) + b'"}'
+        chunks = self._run(gzip.compress(original), 4096)
+
+        assert b"".join(chunks) == original
+        assert max(len(c) for c in chunks) <= 64 * 1024
+
+    def test_truncated_data(self):
+        """测试截断的 Gzip 数据抛出异常"""
+        compressed = gzip.compress(b'{"key": "value"}' * 100)
+        with pytest.raises(EOFError):
+            self._run(compressed[:-10], 16)
+
+
+class TestTTLCache:
+    """TTL 缓存装饰器测试"""
+
+    def test_single_flight_and_clear(self):
+        """测试并发请求只执行一次，cache_clear 后重新执行"""
+        calls = []
+
+        @ttl_cache(seconds=60)
+        async def load(days: int) -> dict:
+            calls.append(days)
+            await asyncio.sleep(0.01)
+            return {"days": days}
+
+        async def run():
+            results = await asyncio.gather(*(load(7) for _ in range(5)))
+            assert all(r == {"days": 7} for r in results)
+            assert calls == [7]
+
+            # 不同参数独立缓存
+            await load(30)
+            assert calls == [7, 30]
+
+            load.cache_clear()
+            await load(7)
+            assert calls == [7, 30, 7]
+
+        asyncio.run(run())
+
+
+class TestOSSUploadQueue:
+    """OSS 后台上传队列测试"""
+
+    def test_submit_and_drain(self, monkeypatch):
+        """测试入队后由后台任务上传，drain 等待队列清空；队满时同步上传"""
+        published = []
+
+        async def fake_publish(file_id, save_filename, content=None):
+            await asyncio.sleep(0.01)
+            published.append(file_id)
+
+        monkeypatch.setattr(services, "_publish_to_oss", fake_publish)
+
+        async def run():
+            monkeypatch.setattr(services, "_oss_upload_queue", asyncio.Queue(maxsize=1))
+            await services.submit_oss_upload("a", "a.bin", b"1")
+            # 队列已满，同步上传
+            await services.submit_oss_upload("b", "b.bin", b"2")
+            assert published == ["b"]
+
+            worker = asyncio.create_task(services.oss_upload_task())
+            try:
+                assert await services.drain_oss_uploads(timeout=1) is True
+                assert published == ["b", "a"]
+            finally:
+                worker.cancel()
+
+        asyncio.run(run())
+
+    async def test_publish_after_delete_removes_object(self, tmp_path, monkeypatch):
+        """测试上传期间记录被删除时撤回 OSS 对象，记录仍在时回写 oss_path"""
+        from app import database
+        from app.core.config import Config
+        from app.core.oss_client import OSSClient
+
+        monkeypatch.setattr(Config, "DB_FILE", str(tmp_path / "test.db"))
+        monkeypatch.setattr(Config, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(database, "_db_pool", None)
+        (tmp_path / "a.bin").write_bytes(b"1")
+        (tmp_path / "b.bin").write_bytes(b"2")
+
+        uploaded, deleted = [], []
+
+        async def fake_upload(save_filename, content):
+            uploaded.append((save_filename, content))
+            return f"https://cdn.example.com/{save_filename}"
+
+        async def fake_delete(filename):
+            deleted.append(filename)
+            return True
+
+        monkeypatch.setattr(services, "_upload_to_oss", fake_upload)
+        monkeypatch.setattr(OSSClient, "delete", fake_delete)
+
+        await database.init_db()
+        try:
+            async with database.get_db_connection() as conn:
+                await conn.execute(
+                    "INSERT INTO files (id, file_hash, filename, local_path, expire_at) VALUES (?, ?, ?, ?, ?)",
+                    ("a", "h", "a.json", "a.bin", "2999-01-01")
+                )
+                await conn.commit()
+
+            await services._publish_to_oss("a", "a.bin")
+            await services._publish_to_oss("b", "b.bin")
+            # 本地文件已删除时不上传
+            await services._publish_to_oss("c", "c.bin")
+
+            assert uploaded == [("a.bin", b"1"), ("b.bin", b"2")]
+            assert deleted == ["b.bin"]
+            async with database.get_db_connection() as conn:
+                row = await database.fetch_one(conn, "SELECT oss_path FROM files WHERE id = ?", ("a",))
+            assert row["oss_path"] == "https://cdn.example.com/a.bin"
+        finally:
+            await database.close_db()
+
+
+class TestCleanExpiredTask:
+    """后台过期清理任务测试"""
+
+    async def test_invalidates_stats_cache(self, tmp_path, monkeypatch):
+        """测试后台清理删除过期记录后清除统计缓存"""
+        from app import database
+        from app.core.config import Config
+
+        monkeypatch.setattr(Config, "DB_FILE", str(tmp_path / "test.db"))
+        monkeypatch.setattr(Config, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(database, "_db_pool", None)
+
+        invalidated = []
+        monkeypatch.setattr(services, "invalidate_stats_cache", lambda: invalidated.append(1))
+
+        async def stop_sleep(seconds):
+            # 一轮清理后在每小时的等待处结束任务
+            raise asyncio.CancelledError
+
+        await database.init_db()
+        try:
+            async with database.get_db_connection() as conn:
+                await conn.execute(
+                    "INSERT INTO files (id, file_hash, filename, local_path, expire_at) VALUES (?, ?, ?, ?, ?)",
+                    ("a", "h", "a.json", "a.bin", "2000-01-01 00:00:00")
+                )
+                await conn.commit()
+
+            monkeypatch.setattr(services.asyncio, "sleep", stop_sleep)
+            with pytest.raises(asyncio.CancelledError):
+                await services.clean_expired_task()
+
+            assert invalidated == [1]
+        finally:
+            await database.close_db()
+
+
+class TestUploadCoalescing:
+    """并发相同上传合并测试"""
+
+    def test_concurrent_identical_uploads_store_once(self, monkeypatch):
+        """测试同一内容并发上传只存储一次，其余返回秒传结果"""
+        import io
+        from fastapi import UploadFile
+        from app.models import TimeLimit
+
+        calls = []
+
+        async def fake_store(file, ext, minified_content, file_hash, hash_algorithm, time_limit):
+            calls.append(file_hash)
+            await asyncio.sleep(0.05)
+            return {"url": "http://test.local/f/abcd1234", "filename": file.filename,
+                    "expiry": "永久", "is_duplicate": False}
+
+        monkeypatch.setattr(services, "_store_upload", fake_store)
+
+        async def run():
+            uploads = [
+                UploadFile(io.BytesIO(b'{"a": 1}'), filename=f"{i}.json")
+                for i in range(3)
+            ]
+            results = await asyncio.gather(
+                *(services.process_file_upload(f, TimeLimit.PERMANENT) for f in uploads)
+            )
+            assert len(calls) == 1
+            assert {r["url"] for r in results} == {"http://test.local/f/abcd1234"}
+            assert sorted(r["is_duplicate"] for r in results) == [False, True, True]
+            assert services._inflight_uploads == {}
+
+        asyncio.run(run())
+
+
+class TestBatchUnlink:
+    """批量删除本地文件测试"""
+
+    def test_reports_each_path(self, tmp_path):
+        """测试逐个返回删除结果，不存在的文件计为失败"""
+        present = tmp_path / "a.json"
+        present.write_bytes(b"{}")
+
+        assert services._batch_unlink([present, tmp_path / "missing.json"]) == [True, False]
+        assert not present.exists()
+
+
+class TestFileId:
+    """文件 ID 生成测试"""
+
+    def test_ids_unique_across_pool_refill(self):
+        """测试跨越随机数池补充时 ID 格式正确且不重复"""
+        count = services._RANDOM_POOL_SIZE // services._FILE_ID_BYTES * 2 + 3
+        ids = [services._new_file_id() for _ in range(count)]
+
+        assert all(len(i) == 8 and int(i, 16) >= 0 for i in ids)
+        # 32 位随机数，约 2000 个 ID 的碰撞概率约 0.05%
+        assert len(set(ids)) >= count - 1
+
+
+class TestDeleteOSSUrls:
+    """OSS 批量删除结果上报测试"""
+
+    async def test_reports_failed_keys(self, monkeypatch):
+        """测试部分对象删除失败时逐个记录失败的键"""
+        from app.core.config import Config
+        from app.core.logger import log
+        from app.core.oss_client import OSSClient
+
+        async def fake_delete(urls):
+            return {"a.json": True, "b.json": False}
+
+        monkeypatch.setattr(Config, "ENABLE_OSS", True)
+        monkeypatch.setattr(OSSClient, "delete_many_by_url", fake_delete)
+        messages = []
+        sink = log.add(lambda m: messages.append(m.record["message"]), level="ERROR")
+        try:
+            await services._delete_oss_urls(["https://cdn/a.json", "https://cdn/b.json"])
+        finally:
+            log.remove(sink)
+
+        assert len(messages) == 1
+        assert "b.json" in messages[0] and "a.json" not in messages[0]